@@ -3,12 +3,44 @@ import os
 import uuid
 from datetime import datetime, timezone
 
-from flask import Flask, g, has_request_context, render_template, request
-from flask_login import current_user
+from flask import Flask, g, has_request_context, render_template, request, session
+from jinja2 import FileSystemBytecodeCache
 from werkzeug.middleware.proxy_fix import ProxyFix
 
+from apps.compression import CompressionMiddleware
 from apps.config import get_config
-from apps.extensions import csrf, limiter, login_manager
+from apps.extensions import (
+    csrf,
+    email_outbox,
+    limiter,
+    login_manager,
+    page_cache,
+    password_hasher,
+    static_assets,
+)
+from apps.hashing import HashingPoolBusy
+
+logger = logging.getLogger(__name__)
+
+
+class SafeBytecodeCache(FileSystemBytecodeCache):
+    """Filesystem bytecode cache whose I/O errors never fail a render.
+
+    A full or read-only cache directory just means templates are compiled
+    in memory as if there were no cache.
+    """
+
+    def load_bytecode(self, bucket):
+        try:
+            super().load_bytecode(bucket)
+        except (OSError, EOFError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable template bytecode: {e}")
+
+    def dump_bytecode(self, bucket):
+        try:
+            super().dump_bytecode(bucket)
+        except OSError as e:
+            logger.warning(f"Could not write template bytecode: {e}")
 
 
 class RequestIdFilter(logging.Filter):
@@ -28,11 +60,29 @@ def create_app(config_class=None):
     if os.getenv("FLASK_ENV", "local").lower() == "production":
         app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1)
 
+    # Compress text responses once they leave the app (see apps.compression).
+    if app.config.get("COMPRESSION_ENABLED", False):
+        app.wsgi_app = CompressionMiddleware(
+            app.wsgi_app,
+            min_size=app.config.get("COMPRESSION_MIN_SIZE", 500),
+            level=app.config.get("COMPRESSION_LEVEL", 6),
+            brotli_quality=app.config.get("COMPRESSION_BROTLI_QUALITY", 4),
+        )
+
     configure_logging(app)
+    configure_templates(app)
 
     login_manager.init_app(app)
     csrf.init_app(app)
     limiter.init_app(app)
+    password_hasher.init_app(app)
+    email_outbox.init_app(app)
+
+    from apps.email_service import resend_transport
+
+    resend_transport.init_app(app)
+    static_assets.init_app(app)
+    page_cache.init_app(app)
 
     from apps.auth import bp as auth_bp
 
@@ -44,6 +94,10 @@ def create_app(config_class=None):
 
     register_handlers(app)
 
+    from apps.commands import register_commands
+
+    register_commands(app)
+
     @app.context_processor
     def inject_template_globals():
         return {"current_year": datetime.now(timezone.utc).year}
@@ -51,6 +105,42 @@ def create_app(config_class=None):
     return app
 
 
+def configure_templates(app):
+    """Share compiled templates between workers through a bytecode cache on disk.
+
+    Jinja checks each cached entry against the template source, so edits and
+    deploys never serve stale bytecode. ``JINJA_BYTECODE_CACHE_DIR`` empty uses
+    Jinja's per-user directory under the system temp dir.
+    """
+    if not app.config.get("JINJA_BYTECODE_CACHE", False):
+        return
+    directory = app.config.get("JINJA_BYTECODE_CACHE_DIR") or None
+    try:
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        cache = SafeBytecodeCache(directory, pattern="miminions-%s.cache")
+    except (OSError, RuntimeError) as e:
+        app.logger.warning(f"Jinja bytecode cache disabled: {e}")
+        return
+    app.jinja_env.bytecode_cache = cache
+
+
+def precompile_templates(app):
+    """Load every template so the first visitors don't pay for compilation.
+
+    Returns the number of templates loaded. With the bytecode cache enabled,
+    the first worker compiles and the others load its bytecode.
+    """
+    loaded = 0
+    for name in app.jinja_env.list_templates(extensions=["html"]):
+        try:
+            app.jinja_env.get_template(name)
+            loaded += 1
+        except Exception as e:
+            app.logger.error(f"Template {name} failed to compile: {e}")
+    return loaded
+
+
 def configure_logging(app):
     request_id_filter = RequestIdFilter()
 
@@ -70,6 +160,23 @@ def configure_logging(app):
     app.logger.setLevel(logging.INFO)
 
 
+def has_user_session(app):
+    """Report whether the request carries a login session, without loading the user.
+
+    Flask-Login only hits the user loader (and DynamoDB) when ``current_user``
+    is first touched. Header logic must not be the thing that touches it, so
+    this looks at the session/remember cookie instead, and reuses the loaded
+    user when a view or template already resolved it.
+    """
+    loaded_user = g.get("_login_user")
+    if loaded_user is not None:
+        return loaded_user.is_authenticated
+    if "_user_id" in session:
+        return True
+    remember_cookie = app.config.get("REMEMBER_COOKIE_NAME", "remember_token")
+    return remember_cookie in request.cookies
+
+
 def register_handlers(app):
     @app.before_request
     def assign_request_id():
@@ -95,11 +202,9 @@ def register_handlers(app):
             "object-src 'none'; "
             "base-uri 'self'"
         )
-        try:
-            if current_user.is_authenticated:
-                response.headers["Cache-Control"] = "no-store"
-        except Exception:
-            pass
+        # Static files are the same for everyone; keep them cacheable when logged in.
+        if request.endpoint != "static" and has_user_session(app):
+            response.headers["Cache-Control"] = "no-store"
         return response
 
     @app.errorhandler(404)
@@ -107,6 +212,13 @@ def register_handlers(app):
         app.logger.warning(f"404 error: {request.path}")
         return render_template("404.html"), 404
 
+    @app.errorhandler(HashingPoolBusy)
+    def hashing_busy_error(error):
+        app.logger.warning(f"503 hashing pool busy: {request.path}")
+        response = app.make_response((render_template("503.html"), 503))
+        response.headers["Retry-After"] = str(error.retry_after)
+        return response
+
     @app.errorhandler(500)
     def internal_error(error):
         app.logger.error(f"500 error: {error}")
@@ -0,0 +1,32 @@
+"""Build steps that must run without ``create_app``.
+
+``python -m apps build-assets`` builds ``static/dist`` like ``flask build-assets``
+but never creates the app, so a deploy hook running as root leaves no
+root-owned runtime state (rate-limit shared memory, spool directories)
+behind for the app user to trip over.
+"""
+
+import argparse
+import logging
+
+from apps.assets import build_assets, report_lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m apps")
+    commands = parser.add_subparsers(dest="command", required=True)
+    assets = commands.add_parser("build-assets", help="Build purged, precompressed static/dist.")
+    assets.add_argument("--static", default="static", help="Static folder (default: static)")
+    assets.add_argument(
+        "--templates", default="templates", help="Template folder (default: templates)"
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    for line in report_lines(build_assets(args.static, args.templates)):
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
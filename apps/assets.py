@@ -0,0 +1,500 @@
+"""Build-time CSS purge/minify and serving of precompressed static files.
+
+``build_assets`` (run by ``python -m apps build-assets``) mirrors ``static/`` into
+``static/dist/``: stylesheets keep only the rules whose classes appear in the
+templates or scripts, everything text-based is minified where safe, and
+``.gz`` / ``.br`` siblings are written next to each text file. ``StaticAssets``
+then answers ``/static/...`` from ``dist`` when it exists, picking the
+variant that matches ``Accept-Encoding`` so no compression happens per
+request. The build also copies each file to a content-hashed name listed in
+``manifest.json``; ``url_for`` emits those names and they are served with
+immutable far-future caching. Without a build, the original files are
+served unchanged.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+import shutil
+
+from flask import request, send_from_directory
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # optional: only .gz siblings are written without it
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+DIST_DIR = "dist"
+COMPRESSIBLE_EXTENSIONS = (".css", ".js", ".svg", ".txt", ".json", ".xml")
+# Encodings in server preference order, with the sibling file suffix for each.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+# Skip compressed siblings that save less than this many bytes.
+MIN_SAVING = 64
+# Maps each file under static/ to its content-hashed copy in dist/.
+MANIFEST_NAME = "manifest.json"
+HASH_LENGTH = 12
+# Hashed files never change under the same URL, so caches may keep them for a year.
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Classes toggled at runtime by the Bootstrap bundle rather than written in templates.
+SAFELIST = frozenset(
+    {
+        "active",
+        "collapse",
+        "collapsed",
+        "collapsing",
+        "disabled",
+        "dropdown-menu-end",
+        "fade",
+        "hiding",
+        "is-invalid",
+        "is-valid",
+        "modal-backdrop",
+        "modal-open",
+        "show",
+        "showing",
+        "was-validated",
+    }
+)
+
+CLASS_ATTRIBUTE = re.compile(r"""class\s*=\s*("([^"]*)"|'([^']*)')""", re.IGNORECASE)
+JINJA_EXPRESSION = re.compile(r"{{.*?}}|{%.*?%}", re.DOTALL)
+QUOTED_STRING = re.compile(r"""'([^'\\]*)'|"([^"\\]*)\"""")
+CLASS_TOKEN = re.compile(r"-?[_a-zA-Z][-_a-zA-Z0-9]*")
+SELECTOR_CLASS = re.compile(r"\.(-?[_a-zA-Z][-_a-zA-Z0-9]*)")
+# Attribute selectors, strings and :not(...) never require a class to be present.
+SELECTOR_NOISE = re.compile(r"\[[^\]]*\]|'[^']*'|\"[^\"]*\"|:not\([^()]*\)")
+
+
+def collect_used_classes(paths):
+    """Return ``(classes, prefixes)`` referenced by templates and scripts.
+
+    Literal class attributes contribute their tokens. A token built by Jinja
+    (``alert-{{ category }}``) contributes its literal part as a prefix, so
+    every class starting with it is kept. String literals inside Jinja
+    expressions and scripts (``classList.add('open')``) count as classes.
+    """
+    classes, prefixes = set(SAFELIST), set()
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        if path.endswith(".js"):
+            for match in QUOTED_STRING.finditer(text):
+                classes.update(CLASS_TOKEN.findall(match.group(1) or match.group(2) or ""))
+            continue
+        for match in CLASS_ATTRIBUTE.finditer(text):
+            value = match.group(2) if match.group(2) is not None else match.group(3)
+            for token in value.split():
+                if "{" in token:
+                    literal = token.split("{", 1)[0]
+                    if literal:
+                        prefixes.add(literal)
+                else:
+                    classes.update(CLASS_TOKEN.findall(token))
+            for expression in JINJA_EXPRESSION.findall(value):
+                for literal in QUOTED_STRING.finditer(expression):
+                    classes.update(CLASS_TOKEN.findall(literal.group(1) or literal.group(2) or ""))
+    return classes, prefixes
+
+
+def _split_top_level(text, separator):
+    """Split ``text`` on ``separator`` outside strings, parentheses and brackets."""
+    parts, depth, quote, start = [], 0, None, 0
+    for i, char in enumerate(text):
+        if quote:
+            if char == quote and text[i - 1] != "\\":
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        elif char == separator and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+
+def _strip_comments(css):
+    """Remove comments, returning ``(css, license_comments)`` for ``/*! ... */`` headers."""
+    out, licenses, quote, i, start, length = [], [], None, 0, 0, len(css)
+    while i < length:
+        char = css[i]
+        if quote:
+            if char == "\\":
+                i += 1
+            elif char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif css.startswith("/*", i):
+            end = css.find("*/", i + 2)
+            end = length if end < 0 else end + 2
+            out.append(css[start:i])
+            if css.startswith("/*!", i):
+                licenses.append(css[i:end])
+            i = start = end
+            continue
+        i += 1
+    out.append(css[start:])
+    return "".join(out), licenses
+
+
+def _parse_blocks(css):
+    """Yield ``(prelude, body)`` for each top-level statement; body is None for ``@x ...;``."""
+    i, length = 0, len(css)
+    while i < length:
+        depth, quote, j = 0, None, i
+        while j < length:
+            char = css[j]
+            if quote:
+                if char == quote and css[j - 1] != "\\":
+                    quote = None
+            elif char in "'\"":
+                quote = char
+            elif char == "(":
+                depth += 1
+            elif char == ")":
+                depth -= 1
+            elif depth == 0 and char in "{;":
+                break
+            j += 1
+        prelude = css[i:j].strip()
+        if j >= length:
+            if prelude:
+                yield prelude, None
+            return
+        if css[j] == ";":
+            if prelude:
+                yield prelude, None
+            i = j + 1
+            continue
+        # Find the matching closing brace.
+        depth, quote, k = 1, None, j + 1
+        while k < length and depth:
+            char = css[k]
+            if quote:
+                if char == quote and css[k - 1] != "\\":
+                    quote = None
+            elif char in "'\"":
+                quote = char
+            elif char == "{":
+                depth += 1
+            elif char == "}":
+                depth -= 1
+            k += 1
+        yield prelude, css[j + 1 : k - 1]
+        i = k
+
+
+def _minify_declarations(body):
+    declarations = []
+    for declaration in _split_top_level(body, ";"):
+        name, sep, value = declaration.partition(":")
+        if not sep:
+            continue
+        value = " ".join(value.split())
+        value = re.sub(r"\s*!\s*important$", "!important", value)
+        if "'" not in value and '"' not in value:
+            value = re.sub(r",\s+", ",", value)
+        declarations.append(f"{name.strip()}:{value}")
+    return ";".join(declarations)
+
+
+def _minify_selector(selector):
+    selector = " ".join(selector.split())
+    return re.sub(r"\s*([>,])\s*", r"\1", selector)
+
+
+def _selector_is_used(selector, classes, prefixes):
+    for name in SELECTOR_CLASS.findall(SELECTOR_NOISE.sub("", selector)):
+        if name not in classes and not any(name.startswith(p) for p in prefixes):
+            return False
+    return True
+
+
+def _purge(css, classes, prefixes):
+    out = []
+    for prelude, body in _parse_blocks(css):
+        if body is None:
+            out.append(" ".join(prelude.split()) + ";")
+        elif prelude.startswith("@"):
+            at_rule = prelude.split(None, 1)[0].lower()
+            if at_rule in ("@media", "@supports", "@layer", "@container"):
+                inner = _purge(body, classes, prefixes)
+                if inner:
+                    out.append(f"{' '.join(prelude.split())}{{{inner}}}")
+            elif at_rule.endswith("keyframes"):
+                frames = "".join(
+                    f"{_minify_selector(step)}{{{_minify_declarations(rules)}}}"
+                    for step, rules in _parse_blocks(body)
+                    if rules is not None
+                )
+                out.append(f"{' '.join(prelude.split())}{{{frames}}}")
+            else:
+                out.append(f"{' '.join(prelude.split())}{{{_minify_declarations(body)}}}")
+        else:
+            kept = [
+                _minify_selector(selector)
+                for selector in _split_top_level(prelude, ",")
+                if selector.strip() and _selector_is_used(selector, classes, prefixes)
+            ]
+            declarations = _minify_declarations(body)
+            if kept and declarations:
+                out.append(f"{','.join(kept)}{{{declarations}}}")
+    return "".join(out)
+
+
+def purge_css(css, classes, prefixes=()):
+    """Drop rules whose selectors name unused classes, and minify the rest.
+
+    A selector survives if every class it names is in ``classes`` or starts
+    with one of ``prefixes``; a rule survives if any of its selectors does.
+    Element, id and attribute selectors are always kept, as are
+    ``@font-face``, ``@keyframes`` and other non-conditional at-rules.
+    ``/*!`` license comments are preserved at the top.
+    """
+    css, licenses = _strip_comments(css)
+    purged = _purge(css, set(classes), tuple(prefixes))
+    head = []
+    if purged.startswith("@charset"):
+        # @charset is only honoured as the very first bytes of the file.
+        charset, purged = purged.split(";", 1)
+        head.append(charset + ";")
+    return "\n".join(head + licenses + [purged]) + "\n"
+
+
+def write_precompressed(path):
+    """Write ``.gz`` (and, with brotli installed, ``.br``) siblings of ``path``.
+
+    Returns the list of written paths. A variant is skipped when it would not
+    save at least ``MIN_SAVING`` bytes.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    variants = [(".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", brotli.compress(data, quality=11)))
+    written = []
+    for suffix, compressed in variants:
+        target = path + suffix
+        if len(compressed) + MIN_SAVING > len(data):
+            if os.path.exists(target):
+                os.remove(target)
+            continue
+        with open(target, "wb") as f:
+            f.write(compressed)
+        written.append(target)
+    return written
+
+
+def _file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:HASH_LENGTH]
+
+
+def hashed_name(relative, digest):
+    """Return ``relative`` with ``digest`` before its extension (``css/site.<digest>.css``)."""
+    root, extension = os.path.splitext(relative)
+    return f"{root}.{digest}{extension}"
+
+
+def build_assets(static_folder, template_folder, output=None):
+    """Mirror ``static_folder`` into ``<static_folder>/dist`` with purged, precompressed CSS.
+
+    Every file is also copied to a content-hashed name (with its compressed
+    siblings), and ``manifest.json`` maps each source path to that name.
+
+    Args:
+        static_folder: The app's static directory.
+        template_folder: Directory scanned (recursively) for ``*.html`` templates.
+        output: Destination directory; defaults to ``<static_folder>/dist``.
+
+    Returns:
+        A list of ``(relative_path, original_bytes, built_bytes, gzip_bytes, br_bytes)``
+        tuples for every stylesheet and other compressible file; the
+        compressed sizes are None when that variant was skipped.
+    """
+    output = output or os.path.join(static_folder, DIST_DIR)
+    sources = []
+    for folder, extension in ((template_folder, ".html"), (static_folder, ".js")):
+        for root, dirs, files in os.walk(folder):
+            dirs[:] = [d for d in dirs if os.path.join(root, d) != output]
+            sources.extend(os.path.join(root, name) for name in files if name.endswith(extension))
+    classes, prefixes = collect_used_classes(sorted(sources))
+
+    build_dir = f"{output}.tmp"
+    shutil.rmtree(build_dir, ignore_errors=True)
+    report, manifest = [], {}
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) not in (output, build_dir)]
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            relative = os.path.relpath(source, static_folder)
+            target = os.path.join(build_dir, relative)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            if name.endswith(".css"):
+                with open(source, encoding="utf-8") as f:
+                    css = f.read()
+                with open(target, "w", encoding="utf-8") as f:
+                    f.write(purge_css(css, classes, prefixes))
+            else:
+                shutil.copy2(source, target)
+            hashed = hashed_name(relative, _file_digest(target))
+            manifest[relative.replace(os.sep, "/")] = hashed.replace(os.sep, "/")
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                written = write_precompressed(target)
+                sizes = {suffix: None for _, suffix in ENCODINGS}
+                for path in written:
+                    sizes[os.path.splitext(path)[1]] = os.path.getsize(path)
+                report.append(
+                    (
+                        relative,
+                        os.path.getsize(source),
+                        os.path.getsize(target),
+                        sizes[".gz"],
+                        sizes[".br"],
+                    )
+                )
+            else:
+                written = []
+            for path in [target] + written:
+                shutil.copy2(path, os.path.join(build_dir, hashed) + path[len(target) :])
+
+    with open(os.path.join(build_dir, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    # Swap the finished build in so a running server never sees a half-written tree.
+    previous = f"{output}.old"
+    shutil.rmtree(previous, ignore_errors=True)
+    if os.path.exists(output):
+        os.replace(output, previous)
+    os.replace(build_dir, output)
+    shutil.rmtree(previous, ignore_errors=True)
+    logger.info(f"Built {len(report)} static assets into {output}")
+    return report
+
+
+def report_lines(report):
+    """Format a ``build_assets`` report as one line per file, plus a brotli note."""
+    for relative, original, built, gz, br in report:
+        sizes = " ".join(
+            f"{name}={size}" for name, size in (("gz", gz), ("br", br)) if size is not None
+        )
+        yield f"{relative:<32} {original:>8} -> {built:>8}  {sizes}"
+    if brotli is None:
+        yield "brotli is not installed; only .gz variants were written."
+
+
+def accepted_encodings(header):
+    """Return the content codings a client accepts (q > 0), lower-cased."""
+    accepted = set()
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticAssets:
+    """Serve ``static/`` from the build output, precompressed when the client allows.
+
+    Replaces the app's ``static`` view. For ``/static/<filename>``: if
+    ``static/dist/<filename>`` exists it is served instead of the source file,
+    and if the client accepts ``br`` or ``gzip`` and a matching sibling was
+    built, that file is sent with ``Content-Encoding`` set. Responses always
+    carry ``Vary: Accept-Encoding`` so caches keep the variants apart.
+
+    When the build's manifest is present, ``url_for("static", filename=...)``
+    emits the content-hashed name instead. Hashed files are sent with
+    ``Cache-Control: public, max-age=31536000, immutable`` and a strong ETag
+    derived from their content, so it matches across instances. The manifest
+    is read once at startup; restart after rebuilding.
+    """
+
+    def __init__(self):
+        self.static_folder = None
+        self.manifest = {}
+        self._digests = {}
+
+    def init_app(self, app):
+        if not app.static_folder or "static" not in app.view_functions:
+            return
+        self.static_folder = app.static_folder
+        self.load_manifest()
+        app.view_functions["static"] = self.send_static_file
+        app.url_defaults(self._hashed_url_defaults)
+        app.extensions["static_assets"] = self
+
+    def _dist_folder(self):
+        return os.path.join(self.static_folder, DIST_DIR)
+
+    def load_manifest(self):
+        """(Re)read ``dist/manifest.json``; a missing or broken one disables hashed URLs."""
+        path = os.path.join(self._dist_folder(), MANIFEST_NAME)
+        try:
+            with open(path) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            manifest = {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable asset manifest {path}: {e}")
+            manifest = {}
+        self.manifest = manifest
+        self._digests = {}
+        for source, hashed in manifest.items():
+            start = len(os.path.splitext(source)[0]) + 1
+            self._digests[hashed] = hashed[start : start + HASH_LENGTH]
+
+    def _hashed_url_defaults(self, endpoint, values):
+        if endpoint == "static" and self.manifest:
+            hashed = self.manifest.get(values.get("filename"))
+            if hashed:
+                values["filename"] = hashed
+
+    def send_static_file(self, filename):
+        dist = self._dist_folder()
+        built = safe_join(dist, filename)
+        if built is None or not os.path.isfile(built):
+            return send_from_directory(self.static_folder, filename)
+
+        digest = self._digests.get(filename)
+        options = {"max_age": IMMUTABLE_MAX_AGE} if digest else {}
+        accepted = accepted_encodings(request.headers.get("Accept-Encoding"))
+        response = None
+        for coding, suffix in ENCODINGS:
+            if (coding in accepted or "*" in accepted) and os.path.isfile(built + suffix):
+                if digest:
+                    options["etag"] = f"{digest}-{coding}"
+                mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+                response = send_from_directory(
+                    dist, filename + suffix, mimetype=mimetype, **options
+                )
+                response.headers["Content-Encoding"] = coding
+                break
+        if response is None:
+            if digest:
+                options["etag"] = digest
+            response = send_from_directory(dist, filename, **options)
+        if digest:
+            response.cache_control.public = True
+            response.cache_control.immutable = True
+        response.vary.add("Accept-Encoding")
+        return response
@@ -4,23 +4,15 @@ from types import SimpleNamespace
 
 from flask import current_app, flash, redirect, render_template, request, url_for
 from flask_login import current_user, login_required, login_user, logout_user
-from werkzeug.security import check_password_hash, generate_password_hash
 
 import apps.store as store
 from apps.auth import bp
 from apps.email_service import send_verification_email, verify_token
-from apps.extensions import limiter
+from apps.extensions import limiter, password_hasher
+from apps.hashing import HashingPoolBusy
 from apps.models import User
-from apps.utils import (
-    get_password_validation_errors,
-    normalize_email,
-    validate_date_of_birth,
-    validate_email,
-    validate_max_length,
-    validate_name,
-    validate_password,
-    validate_phone,
-)
+from apps.utils import normalize_email, validate_email
+from apps.validation import PASSWORD_CHANGE_SCHEMA, PROFILE_SCHEMA, SIGNUP_SCHEMA
 
 
 def _email_fingerprint(email):
@@ -39,7 +31,18 @@ def _login_account_key():
 
 
 def _deduct_on_failed_auth(response):
-    return response.status_code >= 400
+    # A 503 from a saturated hashing pool is our fault, not a failed attempt.
+    return response.status_code >= 400 and response.status_code != 503
+
+
+def _upgrade_password_hash(email, password, email_fp):
+    """Re-hash with the configured cost after a successful login; best effort."""
+    try:
+        new_hash = password_hasher.hash(password)
+    except HashingPoolBusy:
+        return
+    if store.update_user(email, {"password": new_hash}):
+        current_app.logger.info("Upgraded password hash for account=%s", email_fp)
 
 
 @bp.route("/signup", methods=["GET", "POST"])
@@ -59,71 +62,39 @@ def signup():
         email_fp = _email_fingerprint(email)
         current_app.logger.info("Signup attempt for account=%s", email_fp)
 
-        # Validate email format
-        if not validate_email(email):
-            flash("Please enter a valid email address.", "danger")
+        errors = SIGNUP_SCHEMA.validate(
+            {
+                **form_data,
+                "password": password,
+                "confirm_password": request.form.get("confirm_password", ""),
+            }
+        )
+        if errors:
+            for err in errors:
+                flash(err, "danger")
             return render_template("signup.html", form_data=form_data), 400
 
-        # Strict fail-fast validation: never auto-correct invalid names.
         first_name = form_data["first_name"]
         last_name = form_data["last_name"]
-
-        if not first_name or not last_name:
-            flash("Please enter your first and last name.", "danger")
-            return render_template("signup.html", form_data=form_data), 400
-
-        if not validate_max_length(first_name, 100) or not validate_max_length(last_name, 100):
-            flash("First and last names must be 100 characters or fewer.", "danger")
-            return render_template("signup.html", form_data=form_data), 400
-
-        if not validate_name(first_name) or not validate_name(last_name):
-            flash("Names may only contain letters, spaces, hyphens, and apostrophes.", "danger")
-            return render_template("signup.html", form_data=form_data), 400
-
-        # Validate password length
-        if not validate_password(password):
-            for err in get_password_validation_errors(password):
-                flash(err, "danger")
-            return render_template("signup.html", form_data=form_data), 400
-
-        # Validate passwords match
-        confirm_password = request.form.get("confirm_password", "")
-        if password != confirm_password:
-            flash("Passwords do not match.", "danger")
-            return render_template("signup.html", form_data=form_data), 400
-
         date_of_birth = form_data["date_of_birth"]
 
-        if not date_of_birth:
-            flash("Please enter your date of birth.", "danger")
-            return render_template("signup.html", form_data=form_data), 400
-
-        if not validate_date_of_birth(date_of_birth):
-            flash(
-                "Enter a valid birth date in YYYY-MM-DD format "
-                "(age must be between 13 and 120).",
-                "danger",
-            )
-            return render_template("signup.html", form_data=form_data), 400
-
-        user_data = store.get_user(email)
-
-        if user_data:
-            current_app.logger.warning("Signup failed - account already exists: %s", email_fp)
-            flash("An account with this email already exists.", "danger")
-            return render_template("signup.html", form_data=form_data)
-
         user_add_data = SimpleNamespace(
             id=str(uuid.uuid4()),
             email=email,
-            password=generate_password_hash(password),
+            password=password_hasher.hash(password),
             first_name=first_name,
             last_name=last_name,
             date_of_birth=date_of_birth,
         )
 
-        # Try to create the user
-        user_created = store.add_user(user_add_data)
+        # The conditional put is the existence check: one round trip, no race.
+        try:
+            user_created = store.add_user(user_add_data)
+        except store.UserExistsError:
+            current_app.logger.warning("Signup failed - account already exists: %s", email_fp)
+            flash("An account with this email already exists.", "danger")
+            return render_template("signup.html", form_data=form_data)
+
         if not user_created:
             current_app.logger.error(
                 "Signup failed - database create error for account=%s", email_fp
@@ -174,7 +145,7 @@ def login():
             flash("Please enter a valid email address.", "danger")
             return render_template("login.html", email=email), 400
 
-        user_data = store.get_user(email)
+        user_data = store.get_user(email) if store.user_may_exist(email) else None
 
         if not user_data:
             current_app.logger.warning("Login failed - account not found: %s", email_fp)
@@ -182,7 +153,7 @@ def login():
             return render_template("login.html", email=email), 401
 
         stored_password_hash = user_data.get("password")
-        if not stored_password_hash or not check_password_hash(stored_password_hash, password):
+        if not stored_password_hash or not password_hasher.verify(stored_password_hash, password):
             current_app.logger.warning("Login failed - incorrect password for account=%s", email_fp)
             flash("Incorrect password.", "danger")
             return render_template("login.html", email=email), 401
@@ -202,6 +173,9 @@ def login():
             )
             return render_template("login.html", email=email, show_resend_verification=True), 403
 
+        if password_hasher.needs_rehash(stored_password_hash):
+            _upgrade_password_hash(email, password, email_fp)
+
         try:
             user = User(user_data)
             login_user(user, remember=remember_me)
@@ -247,32 +221,10 @@ def profile():
             date_of_birth = submitted_profile["date_of_birth"]
             phone = submitted_profile["phone"]
 
-            if not first_name or not last_name:
-                flash("First and last name are required.", "danger")
-                return render_template("profile.html", submitted_profile=submitted_profile), 400
-
-            if not validate_max_length(first_name, 100) or not validate_max_length(last_name, 100):
-                flash("First and last names must be 100 characters or fewer.", "danger")
-                return render_template("profile.html", submitted_profile=submitted_profile), 400
-
-            if not validate_name(first_name) or not validate_name(last_name):
-                flash("Names may only contain letters, spaces, hyphens, and apostrophes.", "danger")
-                return render_template("profile.html", submitted_profile=submitted_profile), 400
-
-            if not validate_date_of_birth(date_of_birth):
-                flash(
-                    "Enter a valid birth date in YYYY-MM-DD format "
-                    "(age must be between 13 and 120).",
-                    "danger",
-                )
-                return render_template("profile.html", submitted_profile=submitted_profile), 400
-
-            if not validate_max_length(phone, 20):
-                flash("Phone number must be 20 characters or fewer.", "danger")
-                return render_template("profile.html", submitted_profile=submitted_profile), 400
-
-            if not validate_phone(phone):
-                flash("Please enter a valid phone number.", "danger")
+            errors = PROFILE_SCHEMA.validate(submitted_profile)
+            if errors:
+                for err in errors:
+                    flash(err, "danger")
                 return render_template("profile.html", submitted_profile=submitted_profile), 400
 
             updated_user = store.update_user(
@@ -307,29 +259,28 @@ def profile():
                 return redirect(url_for("auth.login"))
 
             stored_password_hash = user_data.get("password")
-            if not stored_password_hash or not check_password_hash(
+            if not stored_password_hash or not password_hasher.verify(
                 stored_password_hash, current_password
             ):
                 flash("Current password is incorrect.", "danger")
                 return redirect(url_for("auth.profile"))
 
-            if not validate_password(new_password):
-                for err in get_password_validation_errors(new_password):
+            errors = PASSWORD_CHANGE_SCHEMA.validate(
+                {
+                    "current_password": current_password,
+                    "new_password": new_password,
+                    "confirm_new_password": confirm_new_password,
+                }
+            )
+            if errors:
+                for err in errors:
                     flash(err, "danger")
                 return redirect(url_for("auth.profile"))
 
-            if new_password != confirm_new_password:
-                flash("New passwords do not match.", "danger")
-                return redirect(url_for("auth.profile"))
-
-            if new_password == current_password:
-                flash("New password must be different from your current password.", "danger")
-                return redirect(url_for("auth.profile"))
-
             updated_user = store.update_user(
                 current_user.email,
                 {
-                    "password": generate_password_hash(new_password),
+                    "password": password_hasher.hash(new_password),
                 },
             )
             if not updated_user:
@@ -361,16 +312,19 @@ def verify_email(token):
 
     email = normalize_email(verified_email)
 
-    user_data = store.get_user(email)
-    if not user_data:
+    result = store.verify_user_email(email)
+    if result == store.USER_NOT_FOUND:
         flash("Account not found.", "danger")
         return redirect(url_for("auth.signup"))
 
-    if user_data.get("email_verified"):
+    if result == store.EMAIL_ALREADY_VERIFIED:
         flash("Your email is already verified.", "info")
         return redirect(url_for("auth.login"))
 
-    store.update_user(email, {"email_verified": True})
+    if result != store.EMAIL_VERIFIED:
+        flash("We could not verify your email right now. Please try again shortly.", "danger")
+        return redirect(url_for("auth.login"))
+
     current_app.logger.info(f"Email verified for: {email}")
     flash("Email verified successfully! You can now log in.", "success")
     return redirect(url_for("auth.login"))
@@ -385,7 +339,7 @@ def resend_verification():
         flash("Please provide a valid email address.", "danger")
         return redirect(url_for("auth.login"))
 
-    user_data = store.get_user(email)
+    user_data = store.get_user(email) if store.user_may_exist(email) else None
     if not user_data:
         # Don't reveal whether the account exists
         flash("If an account with that email exists, a verification email has been sent.", "info")
@@ -0,0 +1,63 @@
+import os
+
+import click
+
+import apps.store as store
+from apps.assets import build_assets, report_lines
+from apps.extensions import password_hasher
+from apps.hashing import CALIBRATION_CANDIDATES, calibrate
+from apps.password_blocklist import build_index
+
+
+def register_commands(app):
+    @app.cli.command("calibrate-password-hash")
+    @click.option("--target-ms", default=250.0, show_default=True, help="p95 budget per hash.")
+    @click.option(
+        "--algorithm",
+        type=click.Choice(sorted(CALIBRATION_CANDIDATES)),
+        default="scrypt",
+        show_default=True,
+    )
+    @click.option("--samples", default=20, show_default=True, help="Hashes timed per candidate.")
+    def calibrate_password_hash(target_ms, algorithm, samples):
+        """Benchmark hash settings on this machine and print the strongest within budget."""
+        method, results = calibrate(target_ms, algorithm=algorithm, samples=samples)
+        for candidate, p95 in results:
+            marker = "*" if candidate == method else " "
+            click.echo(f"{marker} {candidate:<28} p95={p95:8.1f}ms")
+        if method is None:
+            raise click.ClickException(
+                f"No {algorithm} setting hashes within {target_ms}ms p95 on this machine."
+            )
+        click.echo(f"\nPASSWORD_HASH_METHOD={method}")
+        if password_hasher.method and password_hasher.method != method:
+            click.echo(f"(currently {password_hasher.method}; logins will upgrade hashes)")
+
+    @app.cli.command("rebuild-user-filter")
+    def rebuild_user_filter():
+        """Rescan the users table into the "definitely not a user" Bloom filter."""
+        if not store.user_filter.bloom_enabled:
+            raise click.ClickException("USER_BLOOM_ENABLED is not set.")
+        loaded = store.rebuild_user_filter(force=True)
+        if loaded is None:
+            raise click.ClickException("Rebuild failed; see the log for details.")
+        stats = store.user_filter.stats()
+        click.echo(
+            f"Loaded {loaded} emails into {stats['bloom_bytes']} bytes "
+            f"(expected false-positive rate {stats['bloom_error_rate']:.4%})"
+        )
+
+    @app.cli.command("build-password-blocklist")
+    @click.argument("source", type=click.Path(exists=True, dir_okay=False))
+    @click.argument("output", type=click.Path(dir_okay=False))
+    def build_password_blocklist(source, output):
+        """Index a one-password-per-line SOURCE file into OUTPUT for PASSWORD_BLOCKLIST_PATH."""
+        count = build_index(source, output)
+        click.echo(f"Wrote {count} entries to {output}")
+
+    @app.cli.command("build-assets")
+    def build_assets_command():
+        """Purge and minify CSS into static/dist and write .gz/.br variants of text assets."""
+        templates = os.path.join(app.root_path, app.template_folder)
+        for line in report_lines(build_assets(app.static_folder, templates)):
+            click.echo(line)
@@ -0,0 +1,269 @@
+"""WSGI middleware that gzip/brotli-compresses text responses on the fly.
+
+Responses are compressed when the client accepts ``br`` (with the optional
+``brotli`` package installed) or ``gzip``, the content type is textual, and
+the body is at least ``min_size`` bytes. Bodies with a ``Content-Length`` are
+compressed whole and get a new length; streamed bodies are compressed chunk
+by chunk with a flush after each, so streaming still streams. ``HEAD`` gets
+the headers the matching ``GET`` would, without a ``Content-Length``.
+
+Strong ETags get a ``-gzip`` / ``-br`` suffix on compressed responses, as the
+bytes differ from the identity representation. ``If-None-Match`` reaches the
+app with each suffixed tag and its unsuffixed form, so the app's own 304
+logic keeps working, and the suffix is put back on a 304's ``ETag`` unless
+the app's tag is one the client sent as-is (precompressed static files
+already carry ``"<digest>-gzip"``-style tags of their own). Responses that are already
+encoded (precompressed static files), partial, ``no-transform`` or not text
+pass through untouched apart from ``Vary``.
+"""
+
+import zlib
+
+from apps.assets import accepted_encodings, brotli
+
+COMPRESSIBLE_TYPES = frozenset(
+    {
+        "application/javascript",
+        "application/json",
+        "application/manifest+json",
+        "application/xml",
+        "image/svg+xml",
+        "text/css",
+        "text/csv",
+        "text/html",
+        "text/javascript",
+        "text/plain",
+        "text/xml",
+    }
+)
+
+
+def _header(headers, name):
+    name = name.lower()
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _without(headers, *names):
+    names = {name.lower() for name in names}
+    return [(key, value) for key, value in headers if key.lower() not in names]
+
+
+def _add_vary(headers):
+    vary = _header(headers, "Vary")
+    if vary is None:
+        return headers + [("Vary", "Accept-Encoding")]
+    tokens = {token.strip().lower() for token in vary.split(",")}
+    if "accept-encoding" in tokens or "*" in tokens:
+        return headers
+    return _without(headers, "Vary") + [("Vary", f"{vary}, Accept-Encoding")]
+
+
+def _suffix_etag(etag, coding):
+    if not etag or etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{coding}"'
+
+
+class _GzipCompressor:
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data, flush=False):
+        out = self._compressor.compress(data)
+        if flush:
+            out += self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        return out
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _BrotliCompressor:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data, flush=False):
+        out = self._compressor.process(data)
+        if flush:
+            out += self._compressor.flush()
+        return out
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class CompressionMiddleware:
+    """Compress eligible responses of the wrapped WSGI app.
+
+    Args:
+        app: The WSGI application to wrap (``flask_app.wsgi_app``).
+        min_size: Bodies smaller than this many bytes are sent as-is.
+        level: gzip compression level (1-9).
+        brotli_quality: brotli quality (0-11) when the package is installed.
+    """
+
+    def __init__(self, app, min_size=500, level=6, brotli_quality=4):
+        self.app = app
+        self.min_size = max(0, int(min_size))
+        self.level = min(9, max(1, int(level)))
+        self.brotli_quality = min(11, max(0, int(brotli_quality)))
+
+    def _choose_coding(self, environ):
+        accepted = accepted_encodings(environ.get("HTTP_ACCEPT_ENCODING"))
+        if brotli is not None and ("br" in accepted or "*" in accepted):
+            return "br"
+        if "gzip" in accepted or "*" in accepted:
+            return "gzip"
+        return None
+
+    def _compressor(self, coding):
+        if coding == "br":
+            return _BrotliCompressor(self.brotli_quality)
+        return _GzipCompressor(self.level)
+
+    @staticmethod
+    def _unsuffix_if_none_match(environ, coding):
+        """Add the app's form of every suffixed client ETag to ``If-None-Match``.
+
+        The client's tags are kept too: a ``-gzip`` tag may be the app's own
+        (a precompressed static file) rather than one this middleware made.
+
+        Returns:
+            The client's original tags, or None if none carried the suffix.
+        """
+        header = environ.get("HTTP_IF_NONE_MATCH")
+        suffix = f'-{coding}"'
+        if not header or suffix not in header:
+            return None
+        tags = [tag.strip() for tag in header.split(",")]
+        unsuffixed = [tag[: -len(suffix)] + '"' for tag in tags if tag.endswith(suffix)]
+        environ["HTTP_IF_NONE_MATCH"] = ", ".join(tags + unsuffixed)
+        return set(tags)
+
+    @staticmethod
+    def _eligible(status, headers):
+        code = int(status.split(None, 1)[0])
+        if code < 200 or code in (204, 206, 304):
+            return False
+        if _header(headers, "Content-Encoding") or _header(headers, "Content-Range"):
+            return False
+        if "no-transform" in (_header(headers, "Cache-Control") or "").lower():
+            return False
+        content_type = (_header(headers, "Content-Type") or "").split(";", 1)[0].strip().lower()
+        return content_type in COMPRESSIBLE_TYPES
+
+    def __call__(self, environ, start_response):
+        coding = self._choose_coding(environ)
+        client_tags = self._unsuffix_if_none_match(environ, coding) if coding else None
+        captured = {}
+        written = []
+
+        def capture(status, headers, exc_info=None):
+            if exc_info and captured.get("sent"):
+                raise exc_info[1].with_traceback(exc_info[2])
+            captured.update(status=status, headers=list(headers), exc_info=exc_info)
+            return written.append
+
+        app_iter = self.app(environ, capture)
+        return self._respond(
+            environ, start_response, app_iter, coding, client_tags, captured, written
+        )
+
+    def _respond(self, environ, start_response, app_iter, coding, client_tags, captured, written):
+        iterator = iter(app_iter)
+        try:
+            pending = list(written)
+            written.clear()
+            if "status" not in captured:
+                # Apps may call start_response lazily, on their first chunk.
+                for chunk in iterator:
+                    pending.append(chunk)
+                    if "status" in captured:
+                        break
+            status, headers = captured["status"], captured["headers"]
+            pending.extend(written)
+            written.clear()
+
+            code = int(status.split(None, 1)[0])
+            if code == 304:
+                etag = _header(headers, "ETag")
+                if client_tags is not None and etag and etag not in client_tags:
+                    headers = _without(headers, "ETag") + [("ETag", _suffix_etag(etag, coding))]
+                start_response(status, _add_vary(headers), captured["exc_info"])
+                captured["sent"] = True
+                yield from pending
+                yield from iterator
+                return
+
+            eligible = self._eligible(status, headers)
+            if eligible:
+                headers = _add_vary(headers)
+            length = _header(headers, "Content-Length")
+            if (
+                not eligible
+                or coding is None
+                or (length is not None and int(length) < self.min_size)
+            ):
+                start_response(status, headers, captured["exc_info"])
+                captured["sent"] = True
+                yield from pending
+                yield from iterator
+                return
+
+            head = environ.get("REQUEST_METHOD") == "HEAD"
+            # Without a length, buffer up to min_size to decide whether it is worth it.
+            if length is None and not head:
+                size = sum(len(chunk) for chunk in pending)
+                for chunk in iterator:
+                    pending.append(chunk)
+                    size += len(chunk)
+                    if size >= self.min_size:
+                        break
+                else:
+                    body = b"".join(pending)
+                    headers = headers + [("Content-Length", str(len(body)))]
+                    start_response(status, headers, captured["exc_info"])
+                    captured["sent"] = True
+                    yield body
+                    return
+
+            compressor = self._compressor(coding)
+            etag = _header(headers, "ETag")
+            headers = _without(headers, "Content-Length", "ETag", "Content-MD5")
+            headers.append(("Content-Encoding", coding))
+            if etag:
+                headers.append(("ETag", _suffix_etag(etag, coding)))
+
+            if head:
+                # Same representation headers as GET; the compressed length is unknown.
+                start_response(status, headers, captured["exc_info"])
+                captured["sent"] = True
+                return
+
+            if length is not None:
+                # Known, bounded length: compress whole for the best ratio and a real length.
+                body = b"".join(compressor.compress(chunk) for chunk in pending)
+                body += b"".join(compressor.compress(chunk) for chunk in iterator)
+                body += compressor.finish()
+                headers.append(("Content-Length", str(len(body))))
+                start_response(status, headers, captured["exc_info"])
+                captured["sent"] = True
+                yield body
+                return
+
+            start_response(status, headers, captured["exc_info"])
+            captured["sent"] = True
+            data = compressor.compress(b"".join(pending), flush=True)
+            if data:
+                yield data
+            for chunk in iterator:
+                data = compressor.compress(chunk, flush=True)
+                if data:
+                    yield data
+            yield compressor.finish()
+        finally:
+            if hasattr(app_iter, "close"):
+                app_iter.close()
@@ -35,6 +35,58 @@ class Config:
     RESEND_API_KEY = os.getenv("RESEND_API_KEY")
     MAIL_FROM = os.getenv("MAIL_FROM", "info@miminions.ai")
     CONTACT_EMAIL = os.getenv("CONTACT_EMAIL", "info@miminions.ai")
+    # Email outbox: sender threads per worker (0 sends on the request thread),
+    # queued messages before new ones are refused, delivery attempts per
+    # message, first retry delay in seconds, and an optional spool directory
+    # that keeps queued mail across restarts.
+    EMAIL_OUTBOX_WORKERS = int(os.getenv("EMAIL_OUTBOX_WORKERS", "2"))
+    EMAIL_OUTBOX_MAX_QUEUE = int(os.getenv("EMAIL_OUTBOX_MAX_QUEUE", "1000"))
+    EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "5"))
+    EMAIL_OUTBOX_RETRY_BASE_DELAY = float(os.getenv("EMAIL_OUTBOX_RETRY_BASE_DELAY", "1"))
+    EMAIL_OUTBOX_SPOOL_DIR = os.getenv("EMAIL_OUTBOX_SPOOL_DIR", "")
+    # Due messages sent with one Resend batch request (1 disables batching; max 100).
+    EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "50"))
+    # Keep-alive connections to Resend per worker, and connect/read timeouts in seconds.
+    EMAIL_HTTP_POOL_SIZE = int(os.getenv("EMAIL_HTTP_POOL_SIZE", "4"))
+    EMAIL_HTTP_CONNECT_TIMEOUT = float(os.getenv("EMAIL_HTTP_CONNECT_TIMEOUT", "3"))
+    EMAIL_HTTP_READ_TIMEOUT = float(os.getenv("EMAIL_HTTP_READ_TIMEOUT", "10"))
+
+    # werkzeug hash method, e.g. "scrypt:65536:8:1"; pick it with
+    # `flask calibrate-password-hash`. Empty uses werkzeug's default.
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "")
+    # Password hashing pool: worker processes (0 hashes on the request thread),
+    # jobs allowed to queue behind them, and seconds a job may wait before 503.
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "16"))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+    PASSWORD_HASH_RETRY_AFTER = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "5"))
+
+    # Rendered marketing pages kept per worker for anonymous visitors (0 disables),
+    # plus an optional Redis tier shared by all workers and its TTL in seconds.
+    PAGE_CACHE_MAX_ENTRIES = int(os.getenv("PAGE_CACHE_MAX_ENTRIES", "64"))
+    PAGE_CACHE_REDIS_URL = os.getenv("PAGE_CACHE_REDIS_URL", "")
+    PAGE_CACHE_REDIS_TTL = int(os.getenv("PAGE_CACHE_REDIS_TTL", "3600"))
+
+    # Compiled templates shared by workers on disk ("" = Jinja's temp dir), and
+    # whether each gunicorn worker loads every template before serving.
+    JINJA_BYTECODE_CACHE = os.getenv("JINJA_BYTECODE_CACHE", "true").lower() == "true"
+    JINJA_BYTECODE_CACHE_DIR = os.getenv("JINJA_BYTECODE_CACHE_DIR", "")
+    JINJA_PRECOMPILE = os.getenv("JINJA_PRECOMPILE", "true").lower() == "true"
+
+    # On-the-fly gzip/brotli for text responses: on/off, smallest body worth
+    # compressing in bytes, gzip level (1-9) and brotli quality (0-11).
+    COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "500"))
+    COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+    # DynamoDB client tuning (read once when apps.database creates the client)
+    DYNAMODB_MAX_POOL_CONNECTIONS = int(os.getenv("DYNAMODB_MAX_POOL_CONNECTIONS", "25"))
+    DYNAMODB_CONNECT_TIMEOUT = float(os.getenv("DYNAMODB_CONNECT_TIMEOUT", "2"))
+    DYNAMODB_READ_TIMEOUT = float(os.getenv("DYNAMODB_READ_TIMEOUT", "5"))
+    DYNAMODB_TCP_KEEPALIVE = os.getenv("DYNAMODB_TCP_KEEPALIVE", "true").lower() == "true"
+    # Connections opened per worker before it accepts traffic; 0 disables warm-up.
+    DYNAMODB_WARMUP_CONNECTIONS = int(os.getenv("DYNAMODB_WARMUP_CONNECTIONS", "4"))
 
     @staticmethod
     def init_app(app):
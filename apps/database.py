@@ -1,47 +1,111 @@
-import json
+import asyncio
 import logging
 import os
+import re
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import boto3
+from botocore.config import Config as BotoConfig
 from botocore.exceptions import BotoCoreError, ClientError
 from dotenv import load_dotenv
 
+from apps.config import Config
+from apps.mock_storage import (
+    InMemoryStorage,
+    JsonFileStorage,
+    LogStructuredStorage,
+    ShardedJsonFileStorage,
+)
+from apps.retry import RetryPolicy
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
 
+def _env_flag(name, default="false"):
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
+def _mock_storage(file_path):
+    """Pick the MockTable storage engine from ``MOCK_DB_ENGINE``."""
+    engine = os.getenv("MOCK_DB_ENGINE", "file").strip().lower()
+    if engine == "memory":
+        return InMemoryStorage(
+            file_path,
+            flush_interval=float(os.getenv("MOCK_DB_FLUSH_INTERVAL", "1.0")),
+            flush_batch=int(os.getenv("MOCK_DB_FLUSH_BATCH", "100")),
+            fsync=_env_flag("MOCK_DB_FSYNC"),
+        )
+    if engine == "log":
+        return LogStructuredStorage(
+            file_path,
+            compact_every=int(os.getenv("MOCK_DB_COMPACT_EVERY", "10000")),
+            fsync=_env_flag("MOCK_DB_FSYNC"),
+        )
+    if engine != "file":
+        logger.warning(f"Unknown MOCK_DB_ENGINE '{engine}', falling back to 'file'")
+    shards = int(os.getenv("MOCK_DB_SHARDS", "0"))
+    if shards > 1:
+        return ShardedJsonFileStorage(file_path, shards=shards)
+    return JsonFileStorage(file_path)
+
+
 class MockTable:
-    def __init__(self, table_name):
+    def __init__(self, table_name, storage=None):
         self.table_name = table_name
         self.file_path = f"{table_name}_local_db.json"
-        if not os.path.exists(self.file_path):
-            with open(self.file_path, "w") as f:
-                json.dump({}, f)
-
-    def _read_db(self):
-        try:
-            with open(self.file_path, "r") as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            return {}
-
-    def _write_db(self, data):
-        with open(self.file_path, "w") as f:
-            json.dump(data, f, indent=2)
-
-    def _client_error(self, code, message):
-        raise ClientError(
-            {
-                "Error": {
-                    "Code": code,
-                    "Message": message,
-                }
-            },
-            "MockDynamoDBOperation",
-        )
+        self.storage = storage if storage is not None else _mock_storage(self.file_path)
+
+    def _client_error(self, code, message, item=None):
+        error_response = {
+            "Error": {
+                "Code": code,
+                "Message": message,
+            }
+        }
+        if item is not None:
+            error_response["Item"] = item
+        raise ClientError(error_response, "MockDynamoDBOperation")
+
+    def _check_condition(
+        self,
+        current,
+        ConditionExpression,
+        ExpressionAttributeNames=None,
+        ExpressionAttributeValues=None,
+        ReturnValuesOnConditionCheckFailure=None,
+    ):
+        """Evaluate ``AND``-joined attribute_exists / attribute_not_exists / ``=`` clauses."""
+        if not ConditionExpression:
+            return
+        names = ExpressionAttributeNames or {}
+        values = ExpressionAttributeValues or {}
+        item = current or {}
+
+        for clause in re.split(r"\s+AND\s+", ConditionExpression.strip()):
+            function = re.fullmatch(r"(attribute_exists|attribute_not_exists)\((.+)\)", clause)
+            if function:
+                attr = names.get(function.group(2).strip(), function.group(2).strip())
+                passed = (attr in item) == (function.group(1) == "attribute_exists")
+            elif "=" in clause:
+                left, right = (part.strip() for part in clause.split("=", 1))
+                if right not in values:
+                    self._client_error("ValidationException", f"Missing value for token: {right}")
+                attr = names.get(left, left)
+                passed = attr in item and item[attr] == values[right]
+            else:
+                self._client_error(
+                    "ValidationException", f"Unsupported condition in mock: {clause}"
+                )
+            if not passed:
+                old_item = current if ReturnValuesOnConditionCheckFailure == "ALL_OLD" else None
+                self._client_error(
+                    "ConditionalCheckFailedException", "The conditional request failed", old_item
+                )
 
     def _extract_email_key(self, key_dict):
         if not isinstance(key_dict, dict) or "email" not in key_dict:
@@ -51,26 +115,46 @@ class MockTable:
             self._client_error("ValidationException", "Partition key 'email' must be non-empty")
         return str(email)
 
-    def get_item(self, Key):
-        db_data = self._read_db()
+    def _project(self, item, ProjectionExpression=None, ExpressionAttributeNames=None):
+        if not ProjectionExpression:
+            return item
+        names = ExpressionAttributeNames or {}
+        attrs = [
+            names.get(token.strip(), token.strip()) for token in ProjectionExpression.split(",")
+        ]
+        for attr in attrs:
+            if attr.startswith("#"):
+                self._client_error("ValidationException", f"Missing attribute name for {attr}")
+        return {attr: item[attr] for attr in attrs if attr in item}
+
+    def get_item(self, Key, ProjectionExpression=None, ExpressionAttributeNames=None):
         key_val = self._extract_email_key(Key)
-        item = db_data.get(key_val)
+        item = self.storage.get(key_val)
         if item:
-            return {"Item": item}
+            return {"Item": self._project(item, ProjectionExpression, ExpressionAttributeNames)}
         return {}
 
-    def put_item(self, Item, ConditionExpression=None):
-        db_data = self._read_db()
+    def put_item(
+        self,
+        Item,
+        ConditionExpression=None,
+        ExpressionAttributeNames=None,
+        ExpressionAttributeValues=None,
+    ):
         key_val = Item.get("email")
         if not key_val:
             self._client_error("ValidationException", "Item must include 'email' partition key")
 
         key_val = str(key_val)
-        if ConditionExpression == "attribute_not_exists(email)" and key_val in db_data:
-            self._client_error("ConditionalCheckFailedException", "The conditional request failed")
+        with self.storage.transaction(key_val) as txn:
+            self._check_condition(
+                txn.get(key_val),
+                ConditionExpression,
+                ExpressionAttributeNames,
+                ExpressionAttributeValues,
+            )
 
-        db_data[key_val] = Item
-        self._write_db(db_data)
+            txn.put(key_val, Item)
         return {"ResponseMetadata": {"HTTPStatusCode": 200}}
 
     def update_item(
@@ -81,94 +165,240 @@ class MockTable:
         ExpressionAttributeValues=None,
         ConditionExpression=None,
         ReturnValues=None,
+        ReturnValuesOnConditionCheckFailure=None,
     ):
-        db_data = self._read_db()
         key_val = self._extract_email_key(Key)
 
-        if ConditionExpression == "attribute_exists(email)" and key_val not in db_data:
-            self._client_error("ConditionalCheckFailedException", "The conditional request failed")
-
-        current = db_data.get(key_val)
-        if not current:
-            self._client_error("ResourceNotFoundException", "Item not found")
+        with self.storage.transaction(key_val) as txn:
+            current = txn.get(key_val)
 
-        if not UpdateExpression or not UpdateExpression.startswith("SET "):
-            self._client_error(
-                "ValidationException", "Only SET UpdateExpression is supported in mock"
+            self._check_condition(
+                current,
+                ConditionExpression,
+                ExpressionAttributeNames,
+                ExpressionAttributeValues,
+                ReturnValuesOnConditionCheckFailure,
             )
 
-        expression_names = ExpressionAttributeNames or {}
-        expression_values = ExpressionAttributeValues or {}
+            if not current:
+                self._client_error("ResourceNotFoundException", "Item not found")
+
+            if not UpdateExpression or not UpdateExpression.startswith("SET "):
+                self._client_error(
+                    "ValidationException", "Only SET UpdateExpression is supported in mock"
+                )
+
+            expression_names = ExpressionAttributeNames or {}
+            expression_values = ExpressionAttributeValues or {}
 
-        assignments = UpdateExpression[4:].split(",")
-        for assignment in assignments:
-            left, right = assignment.strip().split("=", 1)
-            left = left.strip()
-            right = right.strip()
+            assignments = UpdateExpression[4:].split(",")
+            for assignment in assignments:
+                left, right = assignment.strip().split("=", 1)
+                left = left.strip()
+                right = right.strip()
 
-            attr_name = expression_names.get(left, left.lstrip("#"))
-            if right not in expression_values:
-                self._client_error("ValidationException", f"Missing value for token: {right}")
-            current[attr_name] = expression_values[right]
+                attr_name = expression_names.get(left, left.lstrip("#"))
+                if right not in expression_values:
+                    self._client_error("ValidationException", f"Missing value for token: {right}")
+                current[attr_name] = expression_values[right]
 
-        db_data[key_val] = current
-        self._write_db(db_data)
+            txn.put(key_val, current)
 
         response = {"ResponseMetadata": {"HTTPStatusCode": 200}}
         if ReturnValues == "ALL_NEW":
             response["Attributes"] = current
         return response
 
+    def scan(
+        self,
+        ProjectionExpression=None,
+        ExpressionAttributeNames=None,
+        ExclusiveStartKey=None,
+        Limit=1000,
+    ):
+        """Page through items in key order; ``Limit`` stands in for the 1 MB page cap."""
+        keys = self.storage.keys()
+        if ExclusiveStartKey:
+            start = self._extract_email_key(ExclusiveStartKey)
+            keys = [key for key in keys if key > start]
+        page = keys[:Limit]
+        items = []
+        for key in page:
+            item = self.storage.get(key)
+            if item:
+                items.append(self._project(item, ProjectionExpression, ExpressionAttributeNames))
+        response = {"Items": items, "Count": len(items)}
+        if len(keys) > Limit:
+            response["LastEvaluatedKey"] = {"email": page[-1]}
+        return response
+
+    def batch_get(self, Keys, ProjectionExpression=None, ExpressionAttributeNames=None):
+        """Fetch many items; backs ``FakeDynamoDB.batch_get_item``."""
+        items = []
+        for key in Keys:
+            item = self.storage.get(self._extract_email_key(key))
+            if item:
+                items.append(self._project(item, ProjectionExpression, ExpressionAttributeNames))
+        return items
+
+    def batch_write(self, WriteRequests):
+        """Apply many PutRequests atomically; backs ``FakeDynamoDB.batch_write_item``."""
+        puts = {}
+        for request in WriteRequests:
+            if "PutRequest" not in request:
+                self._client_error("ValidationException", "Only PutRequest is supported in mock")
+            item = request["PutRequest"].get("Item") or {}
+            key_val = item.get("email")
+            if not key_val:
+                self._client_error("ValidationException", "Item must include 'email' partition key")
+            key_val = str(key_val)
+            if key_val in puts:
+                self._client_error(
+                    "ValidationException", "Provided list of item keys contains duplicates"
+                )
+            puts[key_val] = item
+
+        with self.storage.transaction(*puts) as txn:
+            for key_val, item in puts.items():
+                txn.put(key_val, item)
+
 
 class FakeDynamoDB:
     def __init__(self):
-        pass
+        self._tables = {}
 
     def Table(self, name):
-        return MockTable(name)
+        # Engines that keep state in memory must be shared per table name.
+        if name not in self._tables:
+            self._tables[name] = MockTable(name)
+        return self._tables[name]
+
+    def batch_get_item(self, RequestItems):
+        responses = {}
+        for name, request in RequestItems.items():
+            keys = request.get("Keys") or []
+            if len(keys) > 100:
+                raise ClientError(
+                    {"Error": {"Code": "ValidationException", "Message": "Too many keys"}},
+                    "BatchGetItem",
+                )
+            responses[name] = self.Table(name).batch_get(
+                keys,
+                ProjectionExpression=request.get("ProjectionExpression"),
+                ExpressionAttributeNames=request.get("ExpressionAttributeNames"),
+            )
+        return {"Responses": responses, "UnprocessedKeys": {}}
+
+    def batch_write_item(self, RequestItems):
+        if sum(len(requests) for requests in RequestItems.values()) > 25:
+            raise ClientError(
+                {"Error": {"Code": "ValidationException", "Message": "Too many items"}},
+                "BatchWriteItem",
+            )
+        for name, requests in RequestItems.items():
+            self.Table(name).batch_write(requests)
+        return {"UnprocessedItems": {}}
+
+
+default_retry_policy = RetryPolicy.from_env()
+
 
+def retry_dynamodb_operation(func, max_retries=None, base_delay=None, policy=None):
+    """Retry DynamoDB operations with jittered exponential backoff.
 
-def retry_dynamodb_operation(func, max_retries=3, base_delay=0.1):
-    """Retry DynamoDB operations with exponential backoff."""
+    Args:
+        func: Zero-argument callable performing one DynamoDB request.
+        max_retries: Total attempts; defaults to the policy's setting.
+        base_delay: Backoff base in seconds; defaults to the policy's setting.
+        policy: A ``RetryPolicy``; defaults to the process-wide policy, which
+            also enforces the retry budget and circuit breaker.
+    """
+    policy = policy or default_retry_policy
+    max_retries = policy.max_retries if max_retries is None else max_retries
+    policy.before_call()
+    retry_cost = None
     for attempt in range(max_retries):
         try:
-            return func()
-        except ClientError as e:
-            error_code = e.response["Error"]["Code"]
-
-            # Don't retry on user errors
-            if error_code in ["ValidationException", "ResourceNotFoundException"]:
+            result = func()
+        except (ClientError, BotoCoreError) as e:
+            decision = policy.on_failure(e, attempt, max_retries, base_delay)
+            if decision is None:
                 raise
-
-            # Retry on throttling and server errors
-            if error_code in [
-                "ProvisionedThroughputExceededException",
-                "InternalServerError",
-                "ServiceUnavailable",
-            ]:
-                if attempt < max_retries - 1:
-                    delay = base_delay * (2**attempt)
-                    logger.warning(
-                        f"DynamoDB operation failed ({error_code}), "
-                        f"retrying in {delay}s (attempt {attempt + 1}/{max_retries})"
-                    )
-                    time.sleep(delay)
-                    continue
+            delay, retry_cost = decision
+            time.sleep(delay)
+            continue
+        except BaseException as e:
+            # Anything else must still end a half-open probe, or the breaker stays open.
+            policy.on_unexpected_error(e)
             raise
-        except BotoCoreError as e:
-            if attempt < max_retries - 1:
-                delay = base_delay * (2**attempt)
-                logger.warning(
-                    f"DynamoDB network error, retrying in {delay}s "
-                    f"(attempt {attempt + 1}/{max_retries}): {e}"
+        policy.on_success(retry_cost)
+        return result
+
+    return None
+
+
+_async_executor = None
+_async_executor_lock = threading.Lock()
+
+
+def get_async_executor():
+    """Bounded thread pool that runs blocking boto3 calls for the async store API."""
+    global _async_executor
+    if _async_executor is None:
+        with _async_executor_lock:
+            if _async_executor is None:
+                _async_executor = ThreadPoolExecutor(
+                    max_workers=int(os.getenv("DYNAMODB_ASYNC_MAX_WORKERS", "16")),
+                    thread_name_prefix="dynamodb-async",
                 )
-                time.sleep(delay)
-                continue
+    return _async_executor
+
+
+async def async_retry_dynamodb_operation(func, max_retries=None, base_delay=None, policy=None):
+    """Async ``retry_dynamodb_operation``.
+
+    Each attempt runs ``func`` on ``get_async_executor()`` and backoff uses
+    ``asyncio.sleep``, so neither the event loop nor an executor thread is
+    parked while waiting to retry.
+    """
+    policy = policy or default_retry_policy
+    max_retries = policy.max_retries if max_retries is None else max_retries
+    policy.before_call()
+    loop = asyncio.get_running_loop()
+    retry_cost = None
+    for attempt in range(max_retries):
+        try:
+            result = await loop.run_in_executor(get_async_executor(), func)
+        except (ClientError, BotoCoreError) as e:
+            decision = policy.on_failure(e, attempt, max_retries, base_delay)
+            if decision is None:
+                raise
+            delay, retry_cost = decision
+            await asyncio.sleep(delay)
+            continue
+        except BaseException as e:
+            # Anything else must still end a half-open probe, or the breaker stays open.
+            policy.on_unexpected_error(e)
             raise
+        policy.on_success(retry_cost)
+        return result
 
     return None
 
 
+def _client_config(config=Config):
+    """botocore client settings for the DynamoDB connection pool."""
+    return BotoConfig(
+        max_pool_connections=config.DYNAMODB_MAX_POOL_CONNECTIONS,
+        connect_timeout=config.DYNAMODB_CONNECT_TIMEOUT,
+        read_timeout=config.DYNAMODB_READ_TIMEOUT,
+        tcp_keepalive=config.DYNAMODB_TCP_KEEPALIVE,
+        # retry_dynamodb_operation owns retries; botocore's own retry loop
+        # would multiply attempts and bypass the retry budget.
+        retries={"mode": "standard", "total_max_attempts": 1},
+    )
+
+
 def _connect_dynamodb():
     """Establish connection to DynamoDB."""
     # Check environment - use local DB if not in production
@@ -185,11 +415,53 @@ def _connect_dynamodb():
 
     region = os.getenv("AWS_REGION", "us-east-2")
 
-    # boto3 is lazy — the actual connection is made on the first operation.
+    # boto3 is lazy — the actual connection is made on the first operation,
+    # or by warm_up_dynamodb() when the gunicorn worker boots.
     # Do NOT fall back to FakeDynamoDB here: a silent fallback in production
     # would write data to the instance's ephemeral disk and lose it silently.
     logger.info(f"Using AWS DynamoDB in region {region}")
-    return boto3.resource("dynamodb", region_name=region)
+    return boto3.resource("dynamodb", region_name=region, config=_client_config())
+
+
+def warm_up_dynamodb(table_names=("users",), connections=None):
+    """Resolve credentials and fill the connection pool before serving traffic.
+
+    Issues ``connections`` concurrent ``DescribeTable`` calls so that many
+    pooled TLS connections are open by the time the first request arrives.
+    Failures are logged, never raised: a cold pool is slower, not broken.
+
+    Returns:
+        The number of warm-up calls that succeeded.
+    """
+    if isinstance(db, FakeDynamoDB):
+        return 0
+
+    if connections is None:
+        connections = Config.DYNAMODB_WARMUP_CONNECTIONS
+    connections = min(connections, Config.DYNAMODB_MAX_POOL_CONNECTIONS)
+    if connections <= 0:
+        return 0
+
+    client = db.meta.client
+    started = time.monotonic()
+
+    def _describe(n):
+        table_name = table_names[n % len(table_names)]
+        try:
+            client.describe_table(TableName=table_name)
+            return True
+        except (ClientError, BotoCoreError) as e:
+            logger.warning(f"DynamoDB warm-up call for {table_name} failed: {e}")
+            return False
+
+    with ThreadPoolExecutor(max_workers=connections) as executor:
+        succeeded = sum(executor.map(_describe, range(connections)))
+
+    elapsed_ms = (time.monotonic() - started) * 1000
+    logger.info(
+        f"DynamoDB warm-up opened {succeeded}/{connections} connections in {elapsed_ms:.0f}ms"
+    )
+    return succeeded
 
 
 db = _connect_dynamodb()
@@ -1,21 +1,129 @@
+import hashlib
 import html
 import logging
+import os
+import threading
 from datetime import datetime, timedelta, timezone
 
 import jwt
+import requests
 import resend
 from flask import current_app, url_for
+from requests.adapters import HTTPAdapter
+
+from apps.extensions import email_outbox
+from apps.outbox import PermanentDeliveryError
 
 logger = logging.getLogger(__name__)
 
+# Resend accepts at most this many emails per batch request.
+MAX_BATCH_SIZE = 100
+
+
+class EmailDeliveryError(Exception):
+    """Raised when the email provider answers with a retryable error."""
+
+
+class ResendTransport:
+    """Keep-alive HTTP client for the Resend API, configured once per worker.
+
+    The Resend SDK opens a new connection (and TLS session) for every email
+    and reads the module-global ``resend.api_key``. This transport keeps one
+    pooled ``requests.Session`` per process instead, so consecutive emails
+    reuse warm connections, and sends each message's idempotency key as the
+    ``Idempotency-Key`` header so a retried request is not delivered twice.
+
+    Failures that cannot succeed on retry (4xx other than 429) raise
+    ``PermanentDeliveryError``; 429, 5xx and network errors raise
+    ``EmailDeliveryError`` or the underlying ``requests`` exception.
+    """
+
+    def __init__(self):
+        self.api_key = None
+        self.api_url = resend.api_url
+        self.pool_size = 4
+        self.timeout = (3.0, 10.0)
+        self._session = None
+        self._session_pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.api_key = app.config.get("RESEND_API_KEY") or None
+        self.api_url = (app.config.get("RESEND_API_URL") or resend.api_url).rstrip("/")
+        self.pool_size = max(1, int(app.config.get("EMAIL_HTTP_POOL_SIZE", 4)))
+        self.timeout = (
+            float(app.config.get("EMAIL_HTTP_CONNECT_TIMEOUT", 3)),
+            float(app.config.get("EMAIL_HTTP_READ_TIMEOUT", 10)),
+        )
+        self.close()
+        app.extensions["resend_transport"] = self
+
+    @property
+    def session(self):
+        # Pooled sockets must not be shared with a forked child, so each
+        # process builds its own session on first use.
+        if self._session_pid != os.getpid():
+            with self._lock:
+                if self._session_pid != os.getpid():
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    session.headers.update(
+                        {
+                            "Accept": "application/json",
+                            "Authorization": f"Bearer {self.api_key}",
+                            "User-Agent": f"miminions resend/{resend.version.get_version()}",
+                        }
+                    )
+                    self._session, self._session_pid = session, os.getpid()
+        return self._session
+
+    def close(self):
+        with self._lock:
+            if self._session is not None and self._session_pid == os.getpid():
+                self._session.close()
+            self._session, self._session_pid = None, None
+
+    def _post(self, path, body, idempotency_key):
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else {}
+        response = self.session.post(
+            f"{self.api_url}{path}", json=body, headers=headers, timeout=self.timeout
+        )
+        if response.status_code < 300:
+            return response.json() if response.content else {}
+        try:
+            message = response.json().get("message") or response.text
+        except ValueError:
+            message = response.text
+        error = f"Resend {path} returned {response.status_code}: {message}"
+        if 400 <= response.status_code < 500 and response.status_code != 429:
+            raise PermanentDeliveryError(error)
+        raise EmailDeliveryError(error)
+
+    def send(self, payload, idempotency_key=None):
+        """Send one email; returns the provider response (``{"id": ...}``)."""
+        return self._post("/emails", payload, idempotency_key)
+
+    def send_batch(self, payloads, idempotency_key=None):
+        """Send up to ``MAX_BATCH_SIZE`` emails in one request.
 
-def _get_resend_client():
-    """Configure and return the Resend API key."""
-    api_key = current_app.config.get("RESEND_API_KEY")
-    if not api_key:
+        Resend validates a batch as a whole, so one rejected message fails
+        every message in it.
+        """
+        if len(payloads) > MAX_BATCH_SIZE:
+            raise ValueError(f"a batch holds at most {MAX_BATCH_SIZE} emails")
+        return self._post("/emails/batch", list(payloads), idempotency_key)
+
+
+resend_transport = ResendTransport()
+
+
+def _email_enabled():
+    """Report whether a Resend API key is configured for this worker."""
+    if not resend_transport.api_key:
         logger.warning("RESEND_API_KEY is not set — emails will not be sent")
-        return None
-    resend.api_key = api_key
+        return False
     return True
 
 
@@ -65,6 +173,12 @@ def verify_token(token):
         return None
 
 
+def _message_key(kind, *parts):
+    """Idempotency key derived from a message's content."""
+    digest = hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+    return f"{kind}-{digest[:32]}"
+
+
 def send_verification_email(email):
     """Send an email-verification link to a new user.
 
@@ -72,39 +186,40 @@ def send_verification_email(email):
         email: The recipient's email address.
 
     Returns:
-        True if the email was sent (or skipped in dev), False on error.
+        True if the email was queued (or skipped in dev), False if it could
+        not be queued.
     """
-    if not _get_resend_client():
+    if not _email_enabled():
         logger.info(f"[DEV] Skipping verification email to {email}")
         return True
 
     token = generate_verification_token(email)
     verification_url = url_for("auth.verify_email", token=token, _external=True)
 
-    try:
-        resend.Emails.send(
-            {
-                "from": current_app.config["MAIL_FROM"],
-                "to": [email],
-                "subject": "Verify your email — miminions.ai",
-                "html": (
-                    f"<h2>Welcome to miminions.ai!</h2>"
-                    f"<p>Thanks for signing up. Please verify your email address "
-                    f"by clicking the link below:</p>"
-                    f'<p><a href="{verification_url}" '
-                    f'style="display:inline-block;padding:12px 24px;background:#0d6efd;color:#fff;'
-                    f'text-decoration:none;border-radius:6px;">Verify Email</a></p>'
-                    f"<p>This link will expire in 24 hours.</p>"
-                    f"<p>If you didn't create an account, you can safely ignore this email.</p>"
-                    f"<br><p>— The miminions.ai Team</p>"
-                ),
-            }
-        )
-        logger.info(f"Verification email sent to {email}")
-        return True
-    except Exception as exc:
-        logger.error(f"Failed to send verification email to {email}: {exc}")
-        return False
+    queued = email_outbox.enqueue(
+        {
+            "from": current_app.config["MAIL_FROM"],
+            "to": [email],
+            "subject": "Verify your email — miminions.ai",
+            "html": (
+                f"<h2>Welcome to miminions.ai!</h2>"
+                f"<p>Thanks for signing up. Please verify your email address "
+                f"by clicking the link below:</p>"
+                f'<p><a href="{verification_url}" '
+                f'style="display:inline-block;padding:12px 24px;background:#0d6efd;color:#fff;'
+                f'text-decoration:none;border-radius:6px;">Verify Email</a></p>'
+                f"<p>This link will expire in 24 hours.</p>"
+                f"<p>If you didn't create an account, you can safely ignore this email.</p>"
+                f"<br><p>— The miminions.ai Team</p>"
+            ),
+        },
+        idempotency_key=_message_key("verify", token),
+    )
+    if queued:
+        logger.info(f"Verification email queued for {email}")
+    else:
+        logger.error(f"Failed to queue verification email to {email}")
+    return queued
 
 
 def send_contact_email(name, email, phone, message):
@@ -117,9 +232,10 @@ def send_contact_email(name, email, phone, message):
         message: The message body.
 
     Returns:
-        True if the email was sent (or skipped in dev), False on error.
+        True if the email was queued (or skipped in dev), False if it could
+        not be queued.
     """
-    if not _get_resend_client():
+    if not _email_enabled():
         logger.info(f"[DEV] Skipping contact email from {email}")
         return True
 
@@ -128,25 +244,25 @@ def send_contact_email(name, email, phone, message):
     safe_phone = html.escape(phone) if phone else "N/A"
     safe_message = html.escape(message).replace("\n", "<br>")
 
-    try:
-        resend.Emails.send(
-            {
-                "from": current_app.config["MAIL_FROM"],
-                "to": [current_app.config["CONTACT_EMAIL"]],
-                "reply_to": email,
-                "subject": f"Contact Form — {name}",
-                "html": (
-                    f"<h2>New Contact Form Submission</h2>"
-                    f"<p><strong>Name:</strong> {safe_name}</p>"
-                    f"<p><strong>Email:</strong> {safe_email}</p>"
-                    f"<p><strong>Phone:</strong> {safe_phone}</p>"
-                    f"<hr>"
-                    f"<p>{safe_message}</p>"
-                ),
-            }
-        )
-        logger.info(f"Contact email forwarded from {email}")
-        return True
-    except Exception as exc:
-        logger.error(f"Failed to send contact email from {email}: {exc}")
-        return False
+    queued = email_outbox.enqueue(
+        {
+            "from": current_app.config["MAIL_FROM"],
+            "to": [current_app.config["CONTACT_EMAIL"]],
+            "reply_to": email,
+            "subject": f"Contact Form — {name}",
+            "html": (
+                f"<h2>New Contact Form Submission</h2>"
+                f"<p><strong>Name:</strong> {safe_name}</p>"
+                f"<p><strong>Email:</strong> {safe_email}</p>"
+                f"<p><strong>Phone:</strong> {safe_phone}</p>"
+                f"<hr>"
+                f"<p>{safe_message}</p>"
+            ),
+        },
+        idempotency_key=_message_key("contact", name, email, phone or "", message),
+    )
+    if queued:
+        logger.info(f"Contact email from {email} queued")
+    else:
+        logger.error(f"Failed to queue contact email from {email}")
+    return queued
@@ -5,6 +5,14 @@ from flask_limiter import Limiter
 from flask_login import LoginManager
 from flask_wtf.csrf import CSRFProtect
 
+from apps.assets import StaticAssets
+from apps.hashing import PasswordHasher
+from apps.outbox import EmailOutbox
+from apps.page_cache import PageCache
+
+# Importing apps.rate_limit also registers the tiered+redis:// and shm:// schemes.
+from apps.rate_limit import default_shared_memory_path
+
 
 def _client_ip_for_rate_limit():
     """Resolve a stable client IP for limiter keys.
@@ -18,19 +26,53 @@ def _client_ip_for_rate_limit():
     return request.remote_addr or "127.0.0.1"
 
 
+def _env_flag(name, default="false"):
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
 def _limiter_storage_uri():
     env = os.getenv("FLASK_ENV", "local").lower()
     redis_url = os.getenv("REDIS_URL", "").strip()
     if env == "production" and redis_url:
+        if _env_flag("RATELIMIT_LOCAL_TIER", "true") and redis_url.startswith("redis"):
+            # Served by apps.rate_limit.TieredRedisStorage.
+            return f"tiered+{redis_url}"
         return redis_url
+    if env == "production" and _env_flag("RATELIMIT_SHARED_MEMORY", "true"):
+        # Served by apps.rate_limit.SharedMemoryStorage: one table for all workers.
+        path = os.getenv("RATELIMIT_SHM_PATH", "").strip() or default_shared_memory_path()
+        return f"shm://{path}"
     return "memory://"
 
 
+def _limiter_storage_options():
+    uri = _limiter_storage_uri()
+    if uri.startswith("tiered+"):
+        return {
+            "sync_interval": float(os.getenv("RATELIMIT_SYNC_INTERVAL", "1.0")),
+            "local_fraction": float(os.getenv("RATELIMIT_LOCAL_FRACTION", "0.1")),
+        }
+    if uri.startswith("shm://"):
+        return {"buckets": int(os.getenv("RATELIMIT_SHM_BUCKETS", "8192"))}
+    return {}
+
+
 login_manager = LoginManager()
 login_manager.login_view = "auth.login"  # Updated to use blueprint endpoint
 
 csrf = CSRFProtect()
 
+password_hasher = PasswordHasher()
+
+email_outbox = EmailOutbox()
+
+static_assets = StaticAssets()
+
+page_cache = PageCache()
+
 limiter = Limiter(
-    key_func=_client_ip_for_rate_limit, storage_uri=_limiter_storage_uri(), default_limits=[]
+    key_func=_client_ip_for_rate_limit,
+    storage_uri=_limiter_storage_uri(),
+    storage_options=_limiter_storage_options(),
+    default_limits=[],
 )
@@ -0,0 +1,228 @@
+import atexit
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from werkzeug.security import (
+    DEFAULT_PBKDF2_ITERATIONS,
+    check_password_hash,
+    generate_password_hash,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class HashingPoolBusy(Exception):
+    """Raised when the password hashing pool is saturated; map to a 503."""
+
+    def __init__(self, retry_after):
+        super().__init__("Password hashing pool is saturated")
+        self.retry_after = retry_after
+
+
+# Candidate settings for calibrate(), weakest first per algorithm.
+CALIBRATION_CANDIDATES = {
+    "scrypt": [f"scrypt:{2**exp}:8:1" for exp in range(14, 19)],
+    "pbkdf2": [f"pbkdf2:sha256:{n}" for n in (300_000, 600_000, 1_000_000, 2_000_000)],
+}
+
+
+def _method_prefix(pwhash):
+    return pwhash.split("$", 1)[0]
+
+
+def _canonical_method(method):
+    """Expand a werkzeug method string the way ``generate_password_hash`` does.
+
+    ``"scrypt"`` becomes ``"scrypt:32768:8:1"`` and ``"pbkdf2"`` becomes
+    ``"pbkdf2:sha256:<werkzeug default iterations>"``, which is the prefix
+    stored hashes carry. None means werkzeug's default method.
+    """
+    name, *args = (method or "scrypt").split(":")
+    if name == "scrypt":
+        if not args:
+            args = [str(2**15), "8", "1"]
+        if len(args) != 3:
+            raise ValueError("'scrypt' takes 3 arguments.")
+        return "scrypt:" + ":".join(str(int(arg)) for arg in args)
+    if name == "pbkdf2":
+        if len(args) > 2:
+            raise ValueError("'pbkdf2' takes 2 arguments.")
+        hash_name = args[0] if args else "sha256"
+        iterations = int(args[1]) if len(args) == 2 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{hash_name}:{iterations}"
+    raise ValueError(f"Invalid hash method '{name}'.")
+
+
+def calibrate(target_ms, algorithm="scrypt", samples=20, candidates=None):
+    """Pick the strongest hash setting whose p95 stays under ``target_ms`` here.
+
+    Each candidate is timed ``samples`` times on the current machine, on one
+    core; stronger candidates are skipped once one exceeds the target.
+
+    Returns:
+        ``(method, results)`` where ``method`` is the chosen werkzeug method
+        string (None if even the weakest is too slow) and ``results`` is a
+        list of ``(method, p95_ms)`` tuples for every candidate measured.
+    """
+    if candidates is None:
+        candidates = CALIBRATION_CANDIDATES[algorithm]
+    samples = max(1, samples)
+    p95_index = int(round(0.95 * (samples - 1)))
+    chosen = None
+    results = []
+    for method in candidates:
+        timings = []
+        for _ in range(samples):
+            timings.append(_timed_generate("calibration-probe", method)[1] * 1000)
+            # Enough slow samples already guarantee p95 > target; stop early.
+            if sum(t > target_ms for t in timings) >= samples - p95_index:
+                break
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, p95_index)]
+        results.append((method, p95))
+        if p95 > target_ms:
+            break
+        chosen = method
+    return chosen, results
+
+
+def _timed_generate(password, method):
+    started = time.perf_counter()
+    if method:
+        pwhash = generate_password_hash(password, method=method)
+    else:
+        pwhash = generate_password_hash(password)
+    return pwhash, time.perf_counter() - started
+
+
+def _timed_check(pwhash, password):
+    started = time.perf_counter()
+    matches = check_password_hash(pwhash, password)
+    return matches, time.perf_counter() - started
+
+
+class PasswordHasher:
+    """Runs password hashing off the request thread with backpressure.
+
+    Hashes run in a process pool of ``PASSWORD_HASH_WORKERS`` processes, so a
+    burst of logins uses every core instead of serialising on the GIL while
+    cheap page views keep their request threads. At most
+    ``PASSWORD_HASH_MAX_QUEUE`` jobs may wait behind the running ones; beyond
+    that, and when a job waits longer than ``PASSWORD_HASH_TIMEOUT`` seconds,
+    ``HashingPoolBusy`` is raised so the request fails fast with a 503.
+    With ``PASSWORD_HASH_WORKERS = 0`` hashing runs inline on the request
+    thread, still subject to the same admission limit.
+    """
+
+    def __init__(self):
+        self.method = None
+        self._method_prefix = None
+        self.workers = 0
+        self.max_queue = 16
+        self.timeout = 10.0
+        self.retry_after = 5
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_queue + 1)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "jobs": 0,
+            "rejected": 0,
+            "timeouts": 0,
+            "queue_wait_seconds": 0.0,
+            "queue_wait_max": 0.0,
+            "hash_seconds": 0.0,
+            "hash_max": 0.0,
+        }
+
+    def init_app(self, app):
+        self.method = app.config.get("PASSWORD_HASH_METHOD") or None
+        self._method_prefix = _canonical_method(self.method)
+        self.workers = max(0, int(app.config.get("PASSWORD_HASH_WORKERS", 0)))
+        self.max_queue = max(0, int(app.config.get("PASSWORD_HASH_MAX_QUEUE", 16)))
+        self.timeout = float(app.config.get("PASSWORD_HASH_TIMEOUT", 10.0))
+        self.retry_after = int(app.config.get("PASSWORD_HASH_RETRY_AFTER", 5))
+        self._slots = threading.BoundedSemaphore(max(1, self.workers) + self.max_queue)
+        app.extensions["password_hasher"] = self
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    # spawn: forking a threaded gunicorn worker can deadlock.
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                    atexit.register(self._executor.shutdown, wait=False, cancel_futures=True)
+        return self._executor
+
+    def _record(self, queue_wait, hash_time):
+        with self._stats_lock:
+            self._stats["jobs"] += 1
+            self._stats["queue_wait_seconds"] += queue_wait
+            self._stats["queue_wait_max"] = max(self._stats["queue_wait_max"], queue_wait)
+            self._stats["hash_seconds"] += hash_time
+            self._stats["hash_max"] = max(self._stats["hash_max"], hash_time)
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            self._count("rejected")
+            logger.warning("Password hashing pool saturated; rejecting request")
+            raise HashingPoolBusy(self.retry_after)
+
+        submitted = time.perf_counter()
+        if self.workers == 0:
+            try:
+                result, hash_time = func(*args)
+            finally:
+                self._slots.release()
+        else:
+            try:
+                future = self._get_executor().submit(func, *args)
+            except Exception:
+                self._slots.release()
+                raise
+            # The slot is held until the job really finishes, even if this
+            # request gives up waiting, so a timeout cannot over-admit work.
+            future.add_done_callback(lambda _: self._slots.release())
+            try:
+                result, hash_time = future.result(timeout=self.timeout)
+            except FutureTimeoutError:
+                self._count("timeouts")
+                logger.warning(f"Password hashing exceeded {self.timeout}s; rejecting request")
+                raise HashingPoolBusy(self.retry_after) from None
+
+        self._record(max(0.0, time.perf_counter() - submitted - hash_time), hash_time)
+        return result
+
+    def hash(self, password, method=None):
+        """Hash ``password``; ``method`` defaults to ``PASSWORD_HASH_METHOD``."""
+        return self._run(_timed_generate, password, method or self.method)
+
+    def needs_rehash(self, pwhash):
+        """True when ``pwhash`` was made with different parameters than configured."""
+        if self._method_prefix is None:
+            self._method_prefix = _canonical_method(self.method)
+        return _method_prefix(pwhash) != self._method_prefix
+
+    def verify(self, pwhash, password):
+        """Check ``password`` against a stored werkzeug hash."""
+        return self._run(_timed_check, pwhash, password)
+
+    def stats(self):
+        """Return job, rejection and queue-wait / hash-time counters."""
+        with self._stats_lock:
+            snapshot = dict(self._stats)
+        jobs = snapshot["jobs"]
+        snapshot["queue_wait_avg"] = snapshot["queue_wait_seconds"] / jobs if jobs else 0.0
+        snapshot["hash_avg"] = snapshot["hash_seconds"] / jobs if jobs else 0.0
+        return snapshot
@@ -2,13 +2,14 @@ from flask import current_app, flash, jsonify, redirect, render_template, reques
 
 from apps.database import retry_dynamodb_operation
 from apps.email_service import send_contact_email
-from apps.extensions import limiter
+from apps.extensions import limiter, page_cache
 from apps.main import bp
 from apps.store import users_table
-from apps.utils import validate_email, validate_max_length, validate_name, validate_phone
+from apps.validation import CONTACT_SCHEMA
 
 
 @bp.route("/")
+@page_cache.cached
 def home():
     return render_template("landing.html")
 
@@ -19,7 +20,9 @@ def health():
     try:
         # Test DynamoDB connection with a health check item
         def _health_check():
-            return users_table.get_item(Key={"email": "__healthcheck__"})
+            return users_table.get_item(
+                Key={"email": "__healthcheck__"}, ProjectionExpression="email"
+            )
 
         retry_dynamodb_operation(_health_check)
         return jsonify({"status": "healthy", "database": "connected"}), 200
@@ -29,16 +32,19 @@ def health():
 
 
 @bp.route("/about")
+@page_cache.cached
 def about():
     return render_template("about.html")
 
 
 @bp.route("/use-cases")
+@page_cache.cached
 def use_cases():
     return render_template("use-cases.html")
 
 
 @bp.route("/documentation")
+@page_cache.cached
 def documentation():
     return render_template("documentation.html")
 
@@ -59,32 +65,10 @@ def contact():
         phone = form_data["phone"]
         message = form_data["message"]
 
-        if not name or not email or not message:
-            flash("Please fill in all required fields.", "danger")
-            return render_template("contact.html", form_data=form_data), 400
-
-        if not validate_name(name):
-            flash("Name may only contain letters, spaces, hyphens, and apostrophes.", "danger")
-            return render_template("contact.html", form_data=form_data), 400
-
-        if not validate_email(email):
-            flash("Please enter a valid email address.", "danger")
-            return render_template("contact.html", form_data=form_data), 400
-
-        if phone and not validate_phone(phone):
-            flash("Please enter a valid phone number.", "danger")
-            return render_template("contact.html", form_data=form_data), 400
-
-        if not validate_max_length(name, 100):
-            flash("Name is too long.", "danger")
-            return render_template("contact.html", form_data=form_data), 400
-
-        if not validate_max_length(phone, 20):
-            flash("Phone number is too long.", "danger")
-            return render_template("contact.html", form_data=form_data), 400
-
-        if not validate_max_length(message, 3000):
-            flash("Message is too long (maximum 3000 characters).", "danger")
+        errors = CONTACT_SCHEMA.validate(form_data)
+        if errors:
+            for err in errors:
+                flash(err, "danger")
             return render_template("contact.html", form_data=form_data), 400
 
         success = send_contact_email(name, email, phone, message)
@@ -99,5 +83,6 @@ def contact():
 
 
 @bp.route("/faqs")
+@page_cache.cached
 def faq():
     return render_template("faqs.html")
@@ -0,0 +1,461 @@
+"""Storage engines behind ``apps.database.MockTable``.
+
+Every engine exposes the same small surface:
+
+- ``get(key)`` returns a private copy of an item, or None.
+- ``keys()`` returns every stored key, sorted.
+- ``transaction(*keys)`` is a context manager yielding a ``Transaction``;
+  writes made through it are committed together when the block exits
+  cleanly. ``keys`` names every key the block may write so engines that lock
+  per shard know what to lock up front.
+- ``flush()`` / ``close()`` persist anything still buffered.
+"""
+
+import atexit
+import copy
+import hashlib
+import json
+import logging
+import mmap
+import os
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, single worker only.
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class CorruptStorageError(Exception):
+    """Raised when a storage file exists but cannot be parsed."""
+
+
+@contextmanager
+def _file_lock(lock_path):
+    # A fresh open file description per acquisition: flock locks are shared by
+    # descriptors inherited across fork, so a cached fd would not exclude
+    # sibling gunicorn workers.
+    with open(lock_path, "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+class Transaction:
+    """Read-your-writes view over a storage engine's items."""
+
+    def __init__(self, read):
+        self._read = read
+        self.writes = {}
+
+    def get(self, key):
+        if key in self.writes:
+            return copy.deepcopy(self.writes[key])
+        return self._read(key)
+
+    def put(self, key, item):
+        self.writes[key] = copy.deepcopy(item)
+
+
+def _write_json_atomic(file_path, data, indent=None, fsync=False):
+    tmp_path = f"{file_path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    with open(tmp_path, "w") as f:
+        if indent is None:
+            json.dump(data, f, separators=(",", ":"))
+        else:
+            json.dump(data, f, indent=indent)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, file_path)
+
+
+class JsonFileStorage:
+    """Whole-document JSON file, re-read and re-written per operation.
+
+    Safe to share between processes: transactions hold an exclusive
+    ``flock`` on ``<file>.lock`` across the read-modify-write, and writes go
+    to a temporary file that is renamed over the original, so readers never
+    see a half-written document and need no lock at all.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.lock_path = f"{file_path}.lock"
+        if not os.path.exists(self.file_path):
+            with _file_lock(self.lock_path):
+                if not os.path.exists(self.file_path):
+                    _write_json_atomic(self.file_path, {}, indent=2)
+
+    def _read_db(self):
+        try:
+            with open(self.file_path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError as e:
+            # Treating this as {} would let the next write wipe the table.
+            logger.error(f"Refusing to use corrupt mock database {self.file_path}: {e}")
+            raise CorruptStorageError(f"{self.file_path} is not valid JSON") from e
+
+    def _write_db(self, data):
+        _write_json_atomic(self.file_path, data, indent=2)
+
+    def get(self, key):
+        return self._read_db().get(key)
+
+    def keys(self):
+        return sorted(self._read_db())
+
+    @contextmanager
+    def transaction(self, *keys):
+        with _file_lock(self.lock_path):
+            db_data = self._read_db()
+            txn = Transaction(db_data.get)
+            yield txn
+            if txn.writes:
+                db_data.update(txn.writes)
+                self._write_db(db_data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class ShardedJsonFileStorage:
+    """``JsonFileStorage`` split into ``shards`` files by a hash of the key.
+
+    Shards live in ``<table>_local_db.shards/shard-NNN.json``; workers only
+    contend when they write keys in the same shard. A legacy single-file
+    database is split into shards the first time the layout is created.
+    """
+
+    def __init__(self, file_path, shards=16):
+        self.file_path = file_path
+        self.shard_count = max(1, int(shards))
+        base = file_path[:-5] if file_path.endswith(".json") else file_path
+        self.shard_dir = f"{base}.shards"
+        os.makedirs(self.shard_dir, exist_ok=True)
+        with _file_lock(os.path.join(self.shard_dir, "layout.lock")):
+            first_run = not any(
+                name.startswith("shard-") and name.endswith(".json")
+                for name in os.listdir(self.shard_dir)
+            )
+            self.shards = [
+                JsonFileStorage(os.path.join(self.shard_dir, f"shard-{n:03d}.json"))
+                for n in range(self.shard_count)
+            ]
+            if first_run and os.path.exists(file_path):
+                self._import_legacy(file_path)
+
+    def _import_legacy(self, file_path):
+        legacy = JsonFileStorage(file_path)._read_db()
+        buckets = {}
+        for key, item in legacy.items():
+            buckets.setdefault(self._shard_index(key), {})[key] = item
+        for index, items in buckets.items():
+            self.shards[index]._write_db(items)
+        logger.info(f"Split {len(legacy)} items from {file_path} into {self.shard_dir}")
+
+    def _shard_index(self, key):
+        digest = hashlib.blake2b(str(key).encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "big") % self.shard_count
+
+    def _shard_for(self, key):
+        return self.shards[self._shard_index(key)]
+
+    def get(self, key):
+        return self._shard_for(key).get(key)
+
+    def keys(self):
+        return sorted(key for shard in self.shards for key in shard.keys())
+
+    @contextmanager
+    def transaction(self, *keys):
+        indexes = sorted({self._shard_index(key) for key in keys})
+        with ExitStack() as stack:
+            # Sorted acquisition keeps multi-shard transactions deadlock-free.
+            shard_txns = {
+                index: stack.enter_context(self.shards[index].transaction()) for index in indexes
+            }
+
+            def _read(key):
+                index = self._shard_index(key)
+                if index in shard_txns:
+                    return shard_txns[index].get(key)
+                return self.shards[index].get(key)
+
+            txn = Transaction(_read)
+            yield txn
+            for key, item in txn.writes.items():
+                index = self._shard_index(key)
+                if index not in shard_txns:
+                    raise ValueError(f"Key {key!r} was not declared for this transaction")
+                shard_txns[index].put(key, item)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class InMemoryStorage:
+    """Dict-indexed engine with write-behind persistence.
+
+    The JSON document is parsed once at startup. Reads and writes then touch
+    only the in-memory index; a background thread rewrites the file once
+    ``flush_batch`` writes have accumulated or ``flush_interval`` seconds have
+    passed, whichever comes first. Set ``flush_interval`` to 0 to write
+    through on every commit. Only safe for a single process per file.
+    """
+
+    def __init__(self, file_path, flush_interval=1.0, flush_batch=100, fsync=False):
+        self.file_path = file_path
+        self.flush_interval = max(0.0, float(flush_interval))
+        self.flush_batch = max(1, int(flush_batch))
+        self.fsync = fsync
+        self._items = self._load()
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._dirty = 0
+        self._closed = False
+        self._flusher = None
+        if self.flush_interval > 0:
+            self._flusher = threading.Thread(
+                target=self._run_flusher, name=f"mock-db-flusher:{file_path}", daemon=True
+            )
+            self._flusher.start()
+        atexit.register(self.close)
+
+    def _load(self):
+        try:
+            with open(self.file_path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        if not isinstance(data, dict):
+            raise ValueError(f"{self.file_path} does not contain a JSON object")
+        return data
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            return copy.deepcopy(item) if item is not None else None
+
+    def keys(self):
+        with self._lock:
+            return sorted(self._items)
+
+    @contextmanager
+    def transaction(self, *keys):
+        with self._lock:
+            txn = Transaction(self.get)
+            yield txn
+            if not txn.writes:
+                return
+            self._items.update(txn.writes)
+            self._dirty += len(txn.writes)
+            if self._flusher is not None and self._dirty >= self.flush_batch:
+                self._wakeup.notify()
+        # flush() takes _flush_lock before _lock, so write through only once
+        # _lock is released; holding it here would invert that order.
+        if self._flusher is None:
+            self.flush()
+
+    def _run_flusher(self):
+        while True:
+            with self._lock:
+                if not self._closed and self._dirty < self.flush_batch:
+                    self._wakeup.wait(self.flush_interval)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Write-behind flush of {self.file_path} failed: {e}")
+                time.sleep(self.flush_interval)
+
+    def flush(self):
+        """Persist the current index if there are unflushed writes."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                snapshot = dict(self._items)
+                pending = self._dirty
+                self._dirty = 0
+            try:
+                _write_json_atomic(self.file_path, snapshot, fsync=self.fsync)
+            except Exception:
+                with self._lock:
+                    self._dirty += pending
+                raise
+            logger.debug(f"Flushed {pending} buffered writes to {self.file_path}")
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wakeup.notify_all()
+        if self._flusher is not None:
+            self._flusher.join(timeout=5)
+        self.flush()
+
+
+class LogStructuredStorage:
+    """Append-only operation log plus periodically compacted snapshots.
+
+    Layout next to ``file_path`` (``users_local_db.json`` for the users table):
+
+    - ``users_local_db.snapshot.jsonl``: one ``{"k": key, "v": item}`` line per
+      item, written atomically by ``compact()`` and memory-mapped on load.
+    - ``users_local_db.oplog.jsonl``: one ``{"op": "put", "k": key, "v": item}``
+      line per committed write since the last snapshot.
+
+    Commits append to the log, so a write costs O(item) rather than O(table);
+    every ``compact_every`` log entries the index is rewritten as a snapshot and
+    the log truncated. Startup loads the snapshot (or the legacy JSON document
+    when no snapshot exists yet) and replays the log, discarding a torn final
+    line left by a crash. Only safe for a single process per file.
+    """
+
+    def __init__(self, file_path, compact_every=10000, fsync=False):
+        self.file_path = file_path
+        base = file_path[:-5] if file_path.endswith(".json") else file_path
+        self.snapshot_path = f"{base}.snapshot.jsonl"
+        self.log_path = f"{base}.oplog.jsonl"
+        self.compact_every = max(1, int(compact_every))
+        self.fsync = fsync
+        self._lock = threading.RLock()
+        self._items = self._load_snapshot()
+        self._log_entries = self._replay_log()
+        self._log = open(self.log_path, "ab")
+        atexit.register(self.close)
+
+    def _load_snapshot(self):
+        if not os.path.exists(self.snapshot_path):
+            try:
+                with open(self.file_path, "r") as f:
+                    data = json.load(f)
+            except FileNotFoundError:
+                return {}
+            if not isinstance(data, dict):
+                raise ValueError(f"{self.file_path} does not contain a JSON object")
+            logger.info(f"Seeding log-structured store from legacy {self.file_path}")
+            return data
+
+        items = {}
+        with open(self.snapshot_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return items
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for line in iter(mapped.readline, b""):
+                    if line.strip():
+                        record = json.loads(line)
+                        items[record["k"]] = record["v"]
+        return items
+
+    def _replay_log(self):
+        if not os.path.exists(self.log_path):
+            return 0
+
+        replayed = 0
+        good_offset = 0
+        with open(self.log_path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    if record["op"] != "put":
+                        raise ValueError(f"unknown op {record['op']!r}")
+                    self._items[record["k"]] = record["v"]
+                except (ValueError, KeyError) as e:
+                    logger.warning(
+                        f"Discarding operation log tail of {self.log_path} "
+                        f"after {replayed} entries: {e}"
+                    )
+                    break
+                replayed += 1
+                good_offset += len(line)
+
+        if good_offset != os.path.getsize(self.log_path):
+            with open(self.log_path, "r+b") as f:
+                f.truncate(good_offset)
+        if replayed:
+            logger.info(f"Replayed {replayed} logged writes from {self.log_path}")
+        return replayed
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            return copy.deepcopy(item) if item is not None else None
+
+    def keys(self):
+        with self._lock:
+            return sorted(self._items)
+
+    @contextmanager
+    def transaction(self, *keys):
+        with self._lock:
+            txn = Transaction(self.get)
+            yield txn
+            if not txn.writes:
+                return
+            payload = b"".join(
+                json.dumps({"op": "put", "k": key, "v": item}, separators=(",", ":")).encode()
+                + b"\n"
+                for key, item in txn.writes.items()
+            )
+            self._log.write(payload)
+            self._log.flush()
+            if self.fsync:
+                os.fsync(self._log.fileno())
+            self._items.update(txn.writes)
+            self._log_entries += len(txn.writes)
+            if self._log_entries >= self.compact_every:
+                self.compact()
+
+    def compact(self):
+        """Write the index as a fresh snapshot and truncate the operation log."""
+        with self._lock:
+            tmp_path = f"{self.snapshot_path}.tmp.{os.getpid()}"
+            with open(tmp_path, "wb") as f:
+                for key, item in self._items.items():
+                    f.write(
+                        json.dumps({"k": key, "v": item}, separators=(",", ":")).encode() + b"\n"
+                    )
+                f.flush()
+                os.fsync(f.fileno())
+            # The snapshot already contains every logged write, so a crash
+            # between these two steps only replays idempotent puts.
+            os.replace(tmp_path, self.snapshot_path)
+            self._log.truncate(0)
+            self._log.seek(0)
+            self._log_entries = 0
+            logger.debug(f"Compacted {len(self._items)} items into {self.snapshot_path}")
+
+    def flush(self):
+        with self._lock:
+            if not self._log.closed:
+                self._log.flush()
+                if self.fsync:
+                    os.fsync(self._log.fileno())
+
+    def close(self):
+        with self._lock:
+            if self._log.closed:
+                return
+            self.flush()
+            self._log.close()
@@ -3,6 +3,9 @@ from flask_login import UserMixin
 import apps.store as store
 from apps.extensions import login_manager
 
+# Attributes a session user needs; keeps the password hash off every request.
+SESSION_USER_FIELDS = ("id", "email", "first_name", "last_name", "date_of_birth", "phone")
+
 
 class User(UserMixin):
     def __init__(self, user_data):
@@ -15,7 +18,6 @@ class User(UserMixin):
 
         self.user_id = user_data.get("id")
         self.email = user_data.get("email")
-        self.password = user_data.get("password")
         self.first_name = user_data.get("first_name", "")
         self.last_name = user_data.get("last_name", "")
         self.date_of_birth = user_data.get("date_of_birth", "")
@@ -41,7 +43,7 @@ def load_user(user_id):
         User object if found and valid, None otherwise
     """
     try:
-        user_data = store.get_user(user_id)
+        user_data = store.get_user(user_id, fields=SESSION_USER_FIELDS, cached=True)
         if user_data:
             return User(user_data)
     except Exception as e:
@@ -0,0 +1,458 @@
+"""Background delivery queue for outbound email.
+
+Requests hand a ready-to-send Resend payload to ``EmailOutbox.enqueue`` and
+return; worker threads deliver it. See ``EmailOutbox`` for retry, spool and
+idempotency behaviour.
+"""
+
+import hashlib
+import heapq
+import itertools
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class PermanentDeliveryError(Exception):
+    """Raised by a sender when retrying the message cannot succeed."""
+
+
+def resend_sender(payload, idempotency_key):
+    """Send one payload through the worker's pooled Resend transport."""
+    # Imported here: apps.email_service imports this module's outbox instance.
+    from apps.email_service import resend_transport
+
+    resend_transport.send(payload, idempotency_key)
+
+
+def resend_batch_sender(payloads, idempotency_key):
+    """Send several payloads with one Resend batch request."""
+    from apps.email_service import resend_transport
+
+    resend_transport.send_batch(payloads, idempotency_key)
+
+
+def _batch_key(keys):
+    digest = hashlib.sha256("\n".join(sorted(keys)).encode("utf-8")).hexdigest()
+    return f"batch-{digest[:32]}"
+
+
+class EmailOutbox:
+    """Queue outbound email and deliver it from background threads.
+
+    ``enqueue`` returns as soon as the message is queued (and spooled), so a
+    slow mail provider no longer slows the request that triggered the mail.
+    ``EMAIL_OUTBOX_WORKERS`` threads per process send messages, retrying
+    failures with jittered exponential backoff up to
+    ``EMAIL_OUTBOX_MAX_ATTEMPTS`` times. Every message carries an idempotency
+    key that is passed to the sender and remembered after delivery, so a
+    message is never sent twice by this process.
+
+    When several messages are due at once, a worker sends up to
+    ``EMAIL_OUTBOX_BATCH_SIZE`` of them with one ``batch_sender`` call. If the
+    provider rejects the batch (``PermanentDeliveryError``), each message falls
+    back to its own send and retry schedule, so one bad address does not hold
+    back the rest. Other failures (timeouts, 429, 5xx) may mean the batch was
+    accepted anyway, so the whole batch is retried with backoff under the same
+    batch idempotency key rather than re-sent message by message. The batch
+    key and member ids are spooled with each message before it is sent, so a
+    worker that adopts them after a restart retries exactly that group under
+    that key.
+
+    With ``EMAIL_OUTBOX_SPOOL_DIR`` set, each queued message is also written to
+    ``<spool>/<pid>/<id>.json`` until delivered. ``start`` (called from the
+    gunicorn ``post_worker_init`` hook) adopts the spool directories of
+    processes that are no longer running, so a restart does not lose queued
+    mail and it goes out without waiting for the next enqueue. Each orphaned
+    directory is claimed whole by one worker, which resends spooled batches
+    under the batch key they last went out with. With
+    ``EMAIL_OUTBOX_WORKERS = 0`` messages are sent inline on the request
+    thread, one attempt each.
+    """
+
+    def __init__(self, sender=None, batch_sender=None):
+        if sender is None:
+            sender, batch_sender = resend_sender, batch_sender or resend_batch_sender
+        self.sender = sender
+        self.batch_sender = batch_sender
+        self.workers = 0
+        self.batch_size = 1
+        self.max_queue = 1000
+        self.max_attempts = 5
+        self.base_delay = 1.0
+        self.max_delay = 300.0
+        self.spool_dir = None
+        # (due time, FIFO sequence, message); the sequence keeps ties in arrival order.
+        self._heap = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._threads = []
+        self._started_pid = None
+        self._closed = False
+        self._delivered_keys = OrderedDict()
+        self._in_flight = 0
+        self._stats = {
+            "enqueued": 0,
+            "sent": 0,
+            "retries": 0,
+            "failed": 0,
+            "rejected": 0,
+            "duplicates": 0,
+            "batches": 0,
+            "latency_seconds": 0.0,
+            "latency_max": 0.0,
+        }
+
+    def init_app(self, app):
+        self.workers = max(0, int(app.config.get("EMAIL_OUTBOX_WORKERS", 0)))
+        self.max_queue = max(1, int(app.config.get("EMAIL_OUTBOX_MAX_QUEUE", 1000)))
+        self.max_attempts = max(1, int(app.config.get("EMAIL_OUTBOX_MAX_ATTEMPTS", 5)))
+        self.base_delay = float(app.config.get("EMAIL_OUTBOX_RETRY_BASE_DELAY", 1.0))
+        self.spool_dir = app.config.get("EMAIL_OUTBOX_SPOOL_DIR") or None
+        self.batch_size = max(1, int(app.config.get("EMAIL_OUTBOX_BATCH_SIZE", 1)))
+        app.extensions["email_outbox"] = self
+
+    # -- spool -----------------------------------------------------------
+
+    def _own_spool(self):
+        return os.path.join(self.spool_dir, str(os.getpid()))
+
+    def _spool_path(self, message):
+        return os.path.join(self._own_spool(), f"{message['id']}.json")
+
+    def _spool_write(self, message):
+        if not self.spool_dir:
+            return
+        path = self._spool_path(message)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(message, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    def _spool_remove(self, message, dead=False):
+        if not self.spool_dir:
+            return
+        path = self._spool_path(message)
+        try:
+            if dead:
+                dead_dir = os.path.join(self.spool_dir, "dead")
+                os.makedirs(dead_dir, exist_ok=True)
+                os.replace(path, os.path.join(dead_dir, os.path.basename(path)))
+            else:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _pid_alive(pid):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def _adopt_spool(self):
+        """Queue messages left behind by processes that are no longer running."""
+        own = self._own_spool()
+        os.makedirs(own, exist_ok=True)
+        adopted = []
+        for name in os.listdir(self.spool_dir):
+            # "<pid>" is a worker's spool, "<pid>-<orphan>" one it was adopting.
+            match = re.fullmatch(r"(\d+)(-\d+)?", name)
+            if not match or int(match[1]) == os.getpid() or self._pid_alive(int(match[1])):
+                continue
+            owner = match[1]
+            # Claim the whole directory with one atomic rename, so a batch's
+            # members are never split between workers booting at the same time.
+            orphan_dir = os.path.join(self.spool_dir, f"{os.getpid()}-{owner}")
+            try:
+                os.rename(os.path.join(self.spool_dir, name), orphan_dir)
+            except OSError:
+                continue
+            for filename in os.listdir(orphan_dir):
+                if not filename.endswith(".json"):
+                    continue
+                target = os.path.join(own, filename)
+                try:
+                    os.replace(os.path.join(orphan_dir, filename), target)
+                    with open(target) as f:
+                        message = json.load(f)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Skipping unreadable spooled email {filename}: {e}")
+                    continue
+                adopted.append(message)
+            try:
+                os.rmdir(orphan_dir)
+            except OSError:
+                pass
+        batches = {}
+        for message in adopted:
+            if "batch_key" in message:
+                batches.setdefault(message["batch_key"], []).append(message)
+            else:
+                heapq.heappush(self._heap, (0.0, next(self._sequence), message))
+        for batch_key, members in batches.items():
+            by_id = {message["id"]: message for message in members}
+            if set(by_id) != set(members[0]["batch_ids"]):
+                # Part of the batch is gone, so it was delivered or given up on;
+                # resending the rest under any key could duplicate mail.
+                logger.warning(f"Batch {batch_key} was partly finished; moving the rest to dead")
+                for message in members:
+                    self._spool_remove(message, dead=True)
+                continue
+            retry = {
+                "batch": [by_id[message_id] for message_id in members[0]["batch_ids"]],
+                "batch_key": batch_key,
+                "attempts": max(message["batch_attempts"] for message in members),
+            }
+            heapq.heappush(self._heap, (0.0, next(self._sequence), retry))
+        if adopted:
+            logger.info(f"Adopted {len(adopted)} spooled emails from stopped workers")
+
+    # -- queue -----------------------------------------------------------
+
+    def _ensure_started(self):
+        # Threads do not survive fork, so start them in the process that sends.
+        if self._started_pid == os.getpid():
+            return
+        with self._condition:
+            if self._started_pid == os.getpid():
+                return
+            self._threads = []
+            self._closed = False
+            if self.spool_dir:
+                self._adopt_spool()
+            for n in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"email-outbox-{n}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            self._started_pid = os.getpid()
+
+    def start(self):
+        """Start the sender threads and adopt orphaned spool files in this process."""
+        if self.workers > 0:
+            self._ensure_started()
+
+    def enqueue(self, payload, idempotency_key=None):
+        """Queue an email for delivery.
+
+        Args:
+            payload: Provider request body (from, to, subject, html, ...).
+            idempotency_key: Stable key for this logical message, derived
+                from its content so a re-enqueue is recognised; a random one
+                is generated if omitted.
+
+        Returns:
+            True if the message was queued (or, inline, sent), False if the
+            queue is full or inline delivery failed.
+        """
+        message = {
+            "id": uuid.uuid4().hex,
+            "idempotency_key": idempotency_key or uuid.uuid4().hex,
+            "payload": payload,
+            "attempts": 0,
+            "enqueued_at": time.time(),
+        }
+
+        if self.workers == 0:
+            self._count("enqueued")
+            return self._attempt(message, inline=True)
+
+        self._ensure_started()
+        with self._condition:
+            if len(self._heap) >= self.max_queue:
+                self._stats["rejected"] += 1
+                logger.error("Email outbox is full; rejecting message")
+                return False
+            try:
+                self._spool_write(message)
+            except OSError as e:
+                logger.error(f"Could not spool email {message['id']}: {e}")
+            heapq.heappush(self._heap, (0.0, next(self._sequence), message))
+            self._stats["enqueued"] += 1
+            self._condition.notify()
+        return True
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._closed:
+                    if self._heap:
+                        due = self._heap[0][0] - time.time()
+                        if due <= 0:
+                            break
+                        self._condition.wait(due)
+                    else:
+                        self._condition.wait()
+                if self._closed:
+                    return
+                first = heapq.heappop(self._heap)[2]
+                batch = first.get("batch") or [first]
+                if "batch" not in first and self.batch_sender is not None:
+                    now = time.time()
+                    while (
+                        self._heap
+                        and self._heap[0][0] <= now
+                        and "batch" not in self._heap[0][2]
+                        and len(batch) < self.batch_size
+                    ):
+                        batch.append(heapq.heappop(self._heap)[2])
+                self._in_flight += len(batch)
+            try:
+                if "batch" in first:
+                    self._attempt_batch(batch, first["attempts"], first["batch_key"])
+                elif len(batch) == 1:
+                    self._attempt(batch[0])
+                else:
+                    self._attempt_batch(batch)
+            finally:
+                with self._condition:
+                    self._in_flight -= len(batch)
+
+    def _backoff(self, attempts):
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempts - 1))))
+
+    def _is_duplicate(self, message):
+        with self._condition:
+            if message["idempotency_key"] not in self._delivered_keys:
+                return False
+            self._stats["duplicates"] += 1
+        self._spool_remove(message)
+        return True
+
+    def _attempt_batch(self, batch, attempts=0, batch_key=None):
+        if batch_key is None:
+            batch = [message for message in batch if not self._is_duplicate(message)]
+            if len(batch) < 2:
+                for message in batch:
+                    self._attempt(message)
+                return
+            batch_key = _batch_key([message["idempotency_key"] for message in batch])
+            batch_ids = [message["id"] for message in batch]
+            for message in batch:
+                message["batch_key"], message["batch_ids"] = batch_key, batch_ids
+        attempts += 1
+        # Spool the group before sending so a restart resends it under the same key.
+        for message in batch:
+            message["batch_attempts"] = attempts
+            try:
+                self._spool_write(message)
+            except OSError as e:
+                logger.error(f"Could not spool email {message['id']}: {e}")
+        try:
+            self.batch_sender([message["payload"] for message in batch], batch_key)
+        except PermanentDeliveryError as exc:
+            logger.warning(f"Batch of {len(batch)} emails rejected, sending one by one: {exc}")
+            for message in batch:
+                for field in ("batch_key", "batch_ids", "batch_attempts"):
+                    message.pop(field, None)
+                self._attempt(message)
+            return
+        except Exception as exc:
+            # The provider may have accepted it; only the same batch key is safe to resend.
+            if attempts >= self.max_attempts:
+                with self._condition:
+                    self._stats["failed"] += len(batch)
+                for message in batch:
+                    self._spool_remove(message, dead=True)
+                logger.error(
+                    f"Batch of {len(batch)} emails failed after {attempts} attempt(s): {exc}"
+                )
+                return
+            delay = self._backoff(attempts)
+            logger.warning(f"Batch of {len(batch)} emails failed, retrying in {delay:.1f}s: {exc}")
+            retry = {"batch": batch, "batch_key": batch_key, "attempts": attempts}
+            with self._condition:
+                self._stats["retries"] += 1
+                heapq.heappush(self._heap, (time.time() + delay, next(self._sequence), retry))
+                self._condition.notify()
+            return
+        self._count("batches")
+        for message in batch:
+            message["attempts"] += attempts
+            self._delivered(message)
+
+    def _attempt(self, message, inline=False):
+        if self._is_duplicate(message):
+            return True
+        key = message["idempotency_key"]
+        message["attempts"] += 1
+        try:
+            self.sender(message["payload"], key)
+        except Exception as exc:
+            permanent = isinstance(exc, PermanentDeliveryError)
+            if inline or permanent or message["attempts"] >= self.max_attempts:
+                self._count("failed")
+                self._spool_remove(message, dead=True)
+                logger.error(
+                    f"Email {message['id']} failed after {message['attempts']} attempt(s): {exc}"
+                )
+                return False
+            delay = self._backoff(message["attempts"])
+            logger.warning(f"Email {message['id']} failed, retrying in {delay:.1f}s: {exc}")
+            with self._condition:
+                self._stats["retries"] += 1
+                try:
+                    self._spool_write(message)
+                except OSError:
+                    pass
+                heapq.heappush(self._heap, (time.time() + delay, next(self._sequence), message))
+                self._condition.notify()
+            return False
+
+        self._delivered(message)
+        return True
+
+    def _delivered(self, message):
+        latency = max(0.0, time.time() - message["enqueued_at"])
+        with self._condition:
+            self._delivered_keys[message["idempotency_key"]] = True
+            while len(self._delivered_keys) > 10000:
+                self._delivered_keys.popitem(last=False)
+            self._stats["sent"] += 1
+            self._stats["latency_seconds"] += latency
+            self._stats["latency_max"] = max(self._stats["latency_max"], latency)
+        self._spool_remove(message)
+
+    def _count(self, name):
+        with self._condition:
+            self._stats[name] += 1
+
+    def flush(self, timeout=None):
+        """Wait until every queued message is delivered or given up; True if drained."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._in_flight or self._heap:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(0.05 if remaining is None else min(0.05, remaining))
+        return True
+
+    def close(self):
+        """Stop the worker threads; spooled messages are picked up on restart."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+    def stats(self):
+        """Return queue depth, delivery counters and enqueue-to-delivery latency."""
+        with self._condition:
+            snapshot = dict(self._stats)
+            snapshot["queue_depth"] = len(self._heap)
+            snapshot["in_flight"] = self._in_flight
+        sent = snapshot["sent"]
+        snapshot["latency_avg"] = snapshot["latency_seconds"] / sent if sent else 0.0
+        return snapshot
@@ -0,0 +1,201 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from flask import current_app, request, session
+
+logger = logging.getLogger(__name__)
+
+
+class PageCache:
+    """Cache rendered marketing pages for anonymous visitors.
+
+    ``@page_cache.cached`` wraps a view that renders the same HTML for every
+    anonymous visitor. The first render is stored under (endpoint, path,
+    template version, asset version, current year). The template version is
+    the newest mtime in the template folder and the asset version hashes the
+    static manifest, so edited templates, rebuilt assets and the new year
+    all produce a fresh page. Later requests skip Jinja entirely.
+
+    Tiers: a process-local LRU of ``PAGE_CACHE_MAX_ENTRIES`` pages, then an
+    optional Redis tier (``PAGE_CACHE_REDIS_URL``) shared by all workers.
+    Every cached response carries a strong ETag of its body and answers a
+    matching ``If-None-Match`` with 304.
+
+    Requests with a login session or pending flash messages bypass the cache,
+    since the nav and alerts differ. ``PAGE_CACHE_MAX_ENTRIES = 0`` without a
+    Redis URL disables caching.
+    """
+
+    # Seconds between checks of the template folder for edits.
+    version_check_interval = 2.0
+
+    def __init__(self):
+        self.max_entries = 0
+        self.redis_client = None
+        self.redis_ttl = 3600
+        self.template_folder = None
+        self.asset_version = ""
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self._version_checked = 0.0
+        self._stats = dict.fromkeys(
+            ("hits", "shared_hits", "misses", "bypassed", "not_modified", "shared_errors"), 0
+        )
+
+    def init_app(self, app):
+        self.max_entries = max(0, int(app.config.get("PAGE_CACHE_MAX_ENTRIES", 0)))
+        self.redis_ttl = max(1, int(app.config.get("PAGE_CACHE_REDIS_TTL", 3600)))
+        redis_url = (app.config.get("PAGE_CACHE_REDIS_URL") or "").strip()
+        self.redis_client = None
+        if redis_url:
+            try:
+                import redis
+
+                self.redis_client = redis.Redis.from_url(
+                    redis_url, socket_timeout=0.2, socket_connect_timeout=0.2
+                )
+            except Exception as e:
+                logger.error(f"Page cache Redis tier disabled: {e}")
+        if app.template_folder:
+            self.template_folder = os.path.join(app.root_path, app.template_folder)
+        # Pages embed hashed static URLs, so a new asset build must not reuse them.
+        assets = app.extensions.get("static_assets")
+        manifest = json.dumps(assets.manifest if assets else {}, sort_keys=True)
+        self.asset_version = hashlib.sha256(manifest.encode("utf-8")).hexdigest()[:12]
+        self.clear()
+        app.extensions["page_cache"] = self
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 or self.redis_client is not None
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def template_version(self):
+        """Return the newest template mtime (nanoseconds), rechecked every couple of seconds."""
+        now = time.monotonic()
+        if self._version is not None and now - self._version_checked < self.version_check_interval:
+            return self._version
+        newest = 0
+        if self.template_folder:
+            for root, _, files in os.walk(self.template_folder):
+                for name in files:
+                    try:
+                        newest = max(newest, os.stat(os.path.join(root, name)).st_mtime_ns)
+                    except OSError:
+                        pass
+        self._version, self._version_checked = newest, now
+        return newest
+
+    def _key(self):
+        year = datetime.now(timezone.utc).year
+        version = f"{self.template_version()}:{self.asset_version}:{year}"
+        return f"{request.endpoint}:{request.path}:{version}"
+
+    @staticmethod
+    def _bypass():
+        from apps import has_user_session
+
+        if request.method not in ("GET", "HEAD"):
+            return True
+        return "_flashes" in session or has_user_session(current_app)
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry
+        if self.redis_client is None:
+            return None
+        try:
+            body = self.redis_client.get(f"page-cache:v1:{key}")
+        except Exception as e:
+            self._count("shared_errors")
+            logger.warning(f"Page cache Redis read failed: {e}")
+            return None
+        if body is None:
+            return None
+        self._count("shared_hits")
+        entry = self._entry(body)
+        self._store_local(key, entry)
+        return entry
+
+    @staticmethod
+    def _entry(body):
+        return {"body": body, "etag": hashlib.sha256(body).hexdigest()[:32]}
+
+    def _store_local(self, key, entry):
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _set(self, key, body):
+        entry = self._entry(body)
+        self._store_local(key, entry)
+        if self.redis_client is not None:
+            try:
+                self.redis_client.set(f"page-cache:v1:{key}", body, ex=self.redis_ttl)
+            except Exception as e:
+                self._count("shared_errors")
+                logger.warning(f"Page cache Redis write failed: {e}")
+        return entry
+
+    def _respond(self, entry):
+        response = current_app.response_class(entry["body"], mimetype="text/html")
+        response.set_etag(entry["etag"])
+        # Browsers may keep the page but must revalidate, which costs a 304.
+        response.cache_control.no_cache = True
+        response.make_conditional(request)
+        if response.status_code == 304:
+            self._count("not_modified")
+        return response
+
+    def cached(self, view):
+        """Decorate a view whose HTML is the same for every anonymous visitor."""
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not self.enabled or self._bypass():
+                if self.enabled:
+                    self._count("bypassed")
+                return view(*args, **kwargs)
+
+            key = self._key()
+            entry = self._get(key)
+            if entry is None:
+                response = current_app.make_response(view(*args, **kwargs))
+                # Only plain successful HTML is stored; anything else passes through.
+                if response.status_code != 200 or response.mimetype != "text/html":
+                    return response
+                self._count("misses")
+                entry = self._set(key, response.get_data())
+            return self._respond(entry)
+
+        return wrapper
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        self._version = None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        return stats
@@ -0,0 +1,141 @@
+"""Breached-password blocklist stored as a sorted, memory-mapped hash array.
+
+Index layout: an 8-byte magic, a big-endian uint64 entry count, then that
+many sorted big-endian uint64 values, each the first 8 bytes of the BLAKE2b
+digest of a lower-cased password. Ten million passwords take 80 MB on disk;
+lookups binary-search the mapping (about 24 probes), and every gunicorn
+worker shares the same page-cache pages instead of holding its own copy.
+With 64-bit keys the chance of a false match is around ``entries / 2**64``.
+"""
+
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PWBL0001"
+HEADER = struct.Struct(">8sQ")
+ENTRY = struct.Struct(">Q")
+
+
+def password_key(password):
+    """Return the 64-bit index key for ``password`` (case-insensitive)."""
+    digest = hashlib.blake2b(password.lower().encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def build_index(source_path, output_path):
+    """Turn a newline-separated password list into a blocklist index.
+
+    Args:
+        source_path: Plain-text file with one password per line.
+        output_path: Where to write the index; replaced atomically.
+
+    Returns:
+        The number of distinct entries written.
+    """
+    keys = array("Q")
+    with open(source_path, "rb") as source:
+        for line in source:
+            password = line.rstrip(b"\r\n").decode("utf-8", errors="ignore")
+            if password:
+                keys.append(password_key(password))
+
+    if keys.itemsize != ENTRY.size:
+        raise RuntimeError("array('Q') is not 8 bytes on this platform")
+    unique = array("Q")
+    previous = None
+    for key in sorted(keys):
+        if key != previous:
+            unique.append(key)
+            previous = key
+    del keys
+    if sys.byteorder == "little":
+        unique.byteswap()
+
+    tmp_path = f"{output_path}.tmp.{os.getpid()}"
+    with open(tmp_path, "wb") as output:
+        output.write(HEADER.pack(MAGIC, len(unique)))
+        unique.tofile(output)
+    os.replace(tmp_path, output_path)
+    logger.info(f"Wrote {len(unique)} blocklist entries to {output_path}")
+    return len(unique)
+
+
+class PasswordBlocklist:
+    """Read-only view over an index written by ``build_index``.
+
+    The file is opened lazily on first lookup, so each gunicorn worker maps
+    it after forking. A missing or malformed index disables the check (with
+    one logged warning) rather than breaking signups.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._map = None
+        self._count = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Build from ``PASSWORD_BLOCKLIST_PATH``; empty disables the check."""
+        return cls(os.getenv("PASSWORD_BLOCKLIST_PATH", "").strip() or None)
+
+    def __len__(self):
+        self._load()
+        return self._count
+
+    def _load(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            if self.path:
+                try:
+                    self._open()
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Password blocklist disabled ({self.path}): {e}")
+            self._loaded = True
+
+    def _open(self):
+        with open(self.path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER.size:
+                raise ValueError("index is truncated")
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count = HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC or size != HEADER.size + count * ENTRY.size:
+            mapped.close()
+            raise ValueError("not a password blocklist index")
+        if hasattr(mapped, "madvise"):
+            mapped.madvise(mmap.MADV_RANDOM)
+        self._map, self._count = mapped, count
+        logger.info(f"Loaded password blocklist with {count} entries from {self.path}")
+
+    def __contains__(self, password):
+        self._load()
+        if not self._count or not password:
+            return False
+        key = password_key(password)
+        low, high = 0, self._count
+        while low < high:
+            mid = (low + high) // 2
+            value = ENTRY.unpack_from(self._map, HEADER.size + mid * ENTRY.size)[0]
+            if value < key:
+                low = mid + 1
+            elif value > key:
+                high = mid
+            else:
+                return True
+        return False
+
+
+blocklist = PasswordBlocklist.from_env()
@@ -0,0 +1,381 @@
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from limits.storage import RedisStorage, Storage
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, single worker only.
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class _Counter:
+    __slots__ = ("limit", "expiry", "remote", "pending", "synced_at", "window_ends_at")
+
+    def __init__(self, limit, expiry):
+        self.limit = limit
+        self.expiry = expiry
+        self.remote = 0
+        self.pending = 0
+        self.synced_at = None
+        self.window_ends_at = None
+
+
+def _limit_amount(key):
+    # limits builds keys as ".../<amount>/<multiples>/<granularity>".
+    try:
+        return int(key.rsplit("/", 3)[1])
+    except (IndexError, ValueError):
+        return None
+
+
+class TieredRedisStorage(Storage):
+    """Fixed-window limiter storage with a process-local tier in front of Redis.
+
+    Registered for ``tiered+redis://`` URIs. Each worker counts hits locally
+    and only talks to Redis when a counter nears its limit or has not been
+    synced for ``sync_interval`` seconds. A worker absorbs at most
+    ``local_fraction`` of a limit's remaining headroom between syncs, so with
+    ``N`` workers a limit can overshoot by at most ``N * local_fraction`` of
+    the headroom; small limits (headroom below ``1 / local_fraction``) always
+    go to Redis and stay exact.
+
+    Every Redis round trip flushes all unsynced counters in one pipeline, so
+    several limits on one route usually cost a single round trip.
+    """
+
+    STORAGE_SCHEME = ["tiered+redis", "tiered+rediss", "tiered+redis+unix"]
+
+    def __init__(
+        self,
+        uri,
+        sync_interval=1.0,
+        local_fraction=0.1,
+        max_keys=10000,
+        remote=None,
+        wrap_exceptions=False,
+        **options,
+    ):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.sync_interval = max(0.0, float(sync_interval))
+        self.local_fraction = min(1.0, max(0.0, float(local_fraction)))
+        self.max_keys = max(1, int(max_keys))
+        self._remote = remote or RedisStorage(uri.replace("tiered+", "", 1), **options)
+        self._counters = OrderedDict()
+        self._evicted = {}
+        self._lock = threading.Lock()
+        self._stats = {"local_hits": 0, "round_trips": 0, "flushed_keys": 0}
+
+    @property
+    def base_exceptions(self):
+        return self._remote.base_exceptions
+
+    def stats(self):
+        """Return how many hits were absorbed locally versus Redis round trips."""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["keys"] = len(self._counters)
+        return snapshot
+
+    def _counter(self, key, expiry, now):
+        counter = self._counters.get(key)
+        if counter is not None and counter.window_ends_at is not None:
+            if counter.window_ends_at <= now:
+                del self._counters[key]
+                counter = None
+        if counter is None:
+            counter = self._counters[key] = _Counter(_limit_amount(key), expiry)
+            while len(self._counters) > self.max_keys:
+                old_key, old = self._counters.popitem(last=False)
+                if old.pending:
+                    self._evicted[old_key] = (old.pending, old.expiry)
+        else:
+            self._counters.move_to_end(key)
+        return counter
+
+    def _can_absorb(self, counter, amount, now):
+        if counter.limit is None or counter.synced_at is None:
+            return False
+        if now - counter.synced_at >= self.sync_interval:
+            return False
+        if counter.window_ends_at is not None and counter.window_ends_at <= now:
+            return False
+        budget = int((counter.limit - counter.remote) * self.local_fraction)
+        return counter.pending + amount <= budget
+
+    def _sync(self, read_key=None):
+        """Push every pending increment (and read ``read_key``) in one pipeline."""
+        with self._lock:
+            flushes = [
+                (key, counter.pending, counter.expiry)
+                for key, counter in self._counters.items()
+                if counter.pending
+            ]
+            flushes.extend(
+                (key, pending, expiry) for key, (pending, expiry) in self._evicted.items()
+            )
+            for counter in self._counters.values():
+                counter.pending = 0
+            evicted, self._evicted = self._evicted, {}
+            self._stats["round_trips"] += 1
+            self._stats["flushed_keys"] += len(flushes)
+
+        remote = self._remote
+        # get_connection / prefixed_key / lua_incr_expire are limits internals
+        # (pinned in requirements.txt); the public API has no pipelining.
+        pipe = remote.get_connection().pipeline(transaction=False)
+        for key, pending, expiry in flushes:
+            prefixed = remote.prefixed_key(key)
+            remote.lua_incr_expire([prefixed], [expiry, pending], client=pipe)
+            pipe.pttl(prefixed)
+        flushed = {key for key, _, _ in flushes}
+        if read_key is not None and read_key not in flushed:
+            prefixed = remote.prefixed_key(read_key)
+            pipe.get(prefixed)
+            pipe.pttl(prefixed)
+        try:
+            results = pipe.execute()
+        except Exception:
+            # Put the increments back so the next sync retries them.
+            with self._lock:
+                for key, pending, expiry in flushes:
+                    counter = self._counters.get(key)
+                    if counter is not None:
+                        counter.pending += pending
+                    else:
+                        self._evicted[key] = (pending, expiry)
+                self._evicted.update(evicted)
+            raise
+
+        now = time.monotonic()
+        keys = [key for key, _, _ in flushes]
+        if read_key is not None and read_key not in flushed:
+            keys.append(read_key)
+        with self._lock:
+            for index, key in enumerate(keys):
+                counter = self._counters.get(key)
+                if counter is None:
+                    continue
+                count, ttl_ms = results[2 * index], results[2 * index + 1]
+                counter.remote = int(count or 0)
+                counter.synced_at = now
+                counter.window_ends_at = now + ttl_ms / 1000 if ttl_ms and ttl_ms > 0 else None
+
+    def incr(self, key, expiry, amount=1):
+        now = time.monotonic()
+        with self._lock:
+            counter = self._counter(key, expiry, now)
+            counter.expiry = expiry
+            absorb = self._can_absorb(counter, amount, now)
+            counter.pending += amount
+            if absorb:
+                self._stats["local_hits"] += 1
+                return counter.remote + counter.pending
+        self._sync()
+        with self._lock:
+            counter = self._counters.get(key)
+            return (counter.remote + counter.pending) if counter is not None else amount
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is not None and self._can_absorb(counter, 1, now):
+                self._stats["local_hits"] += 1
+                return counter.remote + counter.pending
+            if counter is None:
+                # Reads register the key so the answer is cached until the next sync.
+                counter = self._counter(key, 0, now)
+        self._sync(read_key=key)
+        with self._lock:
+            counter = self._counters.get(key)
+            return (counter.remote + counter.pending) if counter is not None else 0
+
+    def get_expiry(self, key):
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is not None and counter.window_ends_at is not None:
+                return time.time() + max(0.0, counter.window_ends_at - time.monotonic())
+        return self._remote.get_expiry(key)
+
+    def check(self):
+        return self._remote.check()
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._evicted.clear()
+        return self._remote.reset()
+
+    def clear(self, key):
+        with self._lock:
+            self._counters.pop(key, None)
+            self._evicted.pop(key, None)
+        self._remote.clear(key)
+
+
+def default_shared_memory_path():
+    """``/dev/shm`` where available so the counters never touch disk."""
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "miminions-ratelimit")
+
+
+class SharedMemoryStorage(Storage):
+    """Fixed-window limiter storage in a memory-mapped file shared by every worker.
+
+    Registered for ``shm://<path>`` URIs. The file is a hash table of
+    ``buckets`` x ``BUCKET_SLOTS`` fixed-size slots; a key hashes to one bucket
+    and lives in one of its slots. Each bucket is guarded by a byte-range
+    ``lockf`` on ``<path>.lock`` (between processes) plus a striped thread lock
+    (within one), so workers only contend when they touch the same bucket.
+
+    Keys are hashed with a random salt stored in the file header when the
+    table is created, so bucket placement cannot be predicted offline.
+    Windows are evicted lazily: an expired slot is reused by the next key that
+    needs room in its bucket. A live window is never evicted: if every slot in
+    a bucket is live, a new key fails closed and reads as over any limit
+    until a slot expires, so filling a bucket cannot reset another key's count.
+    """
+
+    STORAGE_SCHEME = ["shm"]
+
+    MAGIC = b"MMRL0002"
+    HEADER = struct.Struct("<8sII16s")  # magic, buckets, slots per bucket, hash salt
+    SLOT = struct.Struct("<Qdq8x")  # key hash (0 = empty), expires at (epoch), count
+    BUCKET_SLOTS = 8
+    THREAD_LOCK_STRIPES = 256
+    # Reported for keys that find no free slot; above any configured limit.
+    OVERFLOW_COUNT = 2**62
+
+    def __init__(self, uri, buckets=8192, wrap_exceptions=False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.buckets = max(1, int(buckets))
+        # The layout is part of the name, so a deploy that resizes the table
+        # never truncates a file that workers still running have mapped.
+        base = uri.split("://", 1)[1] or default_shared_memory_path()
+        self.path = f"{base}.{self.MAGIC[-4:].decode()}.{self.buckets}x{self.BUCKET_SLOTS}"
+        self._bucket_bytes = self.SLOT.size * self.BUCKET_SLOTS
+        self._size = self.HEADER.size + self.buckets * self._bucket_bytes
+        self._thread_locks = [threading.Lock() for _ in range(self.THREAD_LOCK_STRIPES)]
+        self._lock_file = open(f"{self.path}.lock", "a+b")
+        self._file = open(self.path, "a+b")
+        with self._bucket_lock(self.buckets):
+            self._initialize()
+        self._map = mmap.mmap(self._file.fileno(), self._size)
+
+    @property
+    def base_exceptions(self):
+        return (OSError, ValueError)
+
+    def _initialize(self):
+        self._file.seek(0)
+        header = self._file.read(self.HEADER.size)
+        if len(header) == self.HEADER.size and os.fstat(self._file.fileno()).st_size == self._size:
+            magic, buckets, slots, salt = self.HEADER.unpack(header)
+            if (magic, buckets, slots) == (self.MAGIC, self.buckets, self.BUCKET_SLOTS):
+                self._salt = salt
+                return
+        self._salt = os.urandom(16)
+        self._file.truncate(0)
+        self._file.truncate(self._size)
+        with open(self.path, "r+b") as f:
+            f.write(self.HEADER.pack(self.MAGIC, self.buckets, self.BUCKET_SLOTS, self._salt))
+        logger.info(f"Initialized shared rate-limit table at {self.path} ({self._size} bytes)")
+
+    @contextmanager
+    def _bucket_lock(self, bucket):
+        with self._thread_locks[bucket % self.THREAD_LOCK_STRIPES]:
+            if fcntl is not None:
+                fcntl.lockf(self._lock_file.fileno(), fcntl.LOCK_EX, 1, bucket)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.lockf(self._lock_file.fileno(), fcntl.LOCK_UN, 1, bucket)
+
+    def _locate(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=8, key=self._salt).digest()
+        key_hash = int.from_bytes(digest, "little") or 1
+        bucket = key_hash % self.buckets
+        return key_hash, bucket, self.HEADER.size + bucket * self._bucket_bytes
+
+    def _slots(self, offset):
+        for n in range(self.BUCKET_SLOTS):
+            slot_offset = offset + n * self.SLOT.size
+            yield (slot_offset, *self.SLOT.unpack_from(self._map, slot_offset))
+
+    def _find(self, key_hash, offset, now):
+        for slot_offset, slot_hash, expires_at, count in self._slots(offset):
+            if slot_hash == key_hash and expires_at > now:
+                return slot_offset, expires_at, count
+        return None
+
+    def _free_slot(self, offset, now):
+        """Offset of an empty or expired slot in the bucket, or None if all are live."""
+        for slot_offset, slot_hash, expires_at, _ in self._slots(offset):
+            if slot_hash == 0 or expires_at <= now:
+                return slot_offset
+        return None
+
+    def incr(self, key, expiry, amount=1):
+        key_hash, bucket, offset = self._locate(key)
+        now = time.time()
+        with self._bucket_lock(bucket):
+            found = self._find(key_hash, offset, now)
+            if found is not None:
+                slot_offset, expires_at, count = found
+                count += amount
+            else:
+                slot_offset = self._free_slot(offset, now)
+                if slot_offset is None:
+                    logger.warning(f"Rate-limit bucket {bucket} full; failing closed")
+                    return self.OVERFLOW_COUNT
+                expires_at, count = now + expiry, amount
+            self.SLOT.pack_into(self._map, slot_offset, key_hash, expires_at, count)
+        return count
+
+    def get(self, key):
+        key_hash, bucket, offset = self._locate(key)
+        now = time.time()
+        with self._bucket_lock(bucket):
+            found = self._find(key_hash, offset, now)
+            if found is None and self._free_slot(offset, now) is None:
+                # incr would fail closed, so pre-checks (deduct_when limits) must too.
+                return self.OVERFLOW_COUNT
+        return found[2] if found is not None else 0
+
+    def get_expiry(self, key):
+        key_hash, bucket, offset = self._locate(key)
+        now = time.time()
+        with self._bucket_lock(bucket):
+            found = self._find(key_hash, offset, now)
+        return found[1] if found is not None else now
+
+    def check(self):
+        return not self._map.closed
+
+    def reset(self):
+        cleared = 0
+        for bucket in range(self.buckets):
+            offset = self.HEADER.size + bucket * self._bucket_bytes
+            with self._bucket_lock(bucket):
+                cleared += sum(1 for slot in self._slots(offset) if slot[1])
+                self._map[offset : offset + self._bucket_bytes] = bytes(self._bucket_bytes)
+        return cleared
+
+    def clear(self, key):
+        key_hash, bucket, offset = self._locate(key)
+        with self._bucket_lock(bucket):
+            found = self._find(key_hash, offset, time.time())
+            if found is not None:
+                self.SLOT.pack_into(self._map, found[0], 0, 0.0, 0)
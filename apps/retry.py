@@ -0,0 +1,250 @@
+import logging
+import os
+import random
+import threading
+import time
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+logger = logging.getLogger(__name__)
+
+THROTTLING_ERRORS = {"ProvisionedThroughputExceededException", "ThrottlingException"}
+SERVER_ERRORS = {"InternalServerError", "ServiceUnavailable"}
+
+
+class CircuitOpenError(BotoCoreError):
+    """Raised instead of calling DynamoDB while the circuit breaker is open."""
+
+    fmt = "DynamoDB circuit breaker is open; failing fast for {remaining:.1f}s"
+
+
+class RetryBudget:
+    """Process-wide token bucket that caps retry traffic.
+
+    Each retry spends ``retry_cost`` tokens (``timeout_cost`` for network
+    errors). Successful calls refund tokens, so the budget only drains when
+    most calls fail, which is exactly when extra retries make things worse.
+    """
+
+    def __init__(self, capacity=500, retry_cost=5, timeout_cost=10, success_refund=1):
+        self.capacity = capacity
+        self.retry_cost = retry_cost
+        self.timeout_cost = timeout_cost
+        self.success_refund = success_refund
+        self._tokens = capacity
+        self._lock = threading.Lock()
+
+    @property
+    def tokens(self):
+        return self._tokens
+
+    def acquire(self, error):
+        cost = self.timeout_cost if isinstance(error, BotoCoreError) else self.retry_cost
+        with self._lock:
+            if self._tokens < cost:
+                return None
+            self._tokens -= cost
+            return cost
+
+    def refund(self, amount):
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    After ``failure_threshold`` consecutive server/network failures the
+    breaker opens and calls fail fast for ``cooldown`` seconds. The first call
+    after the cooldown is let through as a probe: success closes the breaker,
+    failure re-opens it for another cooldown.
+    """
+
+    def __init__(self, failure_threshold=5, cooldown=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._clock = clock
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
+
+    def before_call(self):
+        """Raise ``CircuitOpenError`` unless a call may go through right now."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self._opened_at + self.cooldown - self._clock()
+            if remaining > 0 or self._probing:
+                raise CircuitOpenError(remaining=max(0.0, remaining))
+            self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_inconclusive(self):
+        """A call DynamoDB answered with a throttle or client error.
+
+        That ends a run of consecutive failures, but is no proof of health:
+        while open it only releases the probe, so the breaker stays open
+        until a real success.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                self._failures = 0
+            self._probing = False
+
+    def release_probe(self):
+        """End a probe that neither succeeded nor failed, so the next call probes again."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        """Count a failure; return True if this failure tripped the breaker."""
+        with self._lock:
+            self._failures += 1
+            if self._probing or (
+                self._opened_at is None and self._failures >= self.failure_threshold
+            ):
+                self._opened_at = self._clock()
+                self._probing = False
+                return True
+            return False
+
+
+class RetryPolicy:
+    """Decides whether and how long to back off after a failed DynamoDB call.
+
+    Uses capped exponential backoff with full jitter so workers that fail
+    together do not retry together, spends from an optional ``RetryBudget``
+    and feeds an optional ``CircuitBreaker``. Subclass and override
+    ``is_retryable`` or ``backoff`` to change the strategy.
+    """
+
+    def __init__(self, max_retries=3, base_delay=0.1, max_delay=2.0, budget=None, breaker=None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.breaker = breaker
+        self._lock = threading.Lock()
+        self._stats = {
+            "calls": 0,
+            "retries": 0,
+            "breaker_trips": 0,
+            "short_circuits": 0,
+            "budget_exhausted": 0,
+            "sleep_seconds": 0.0,
+        }
+
+    @classmethod
+    def from_env(cls):
+        """Build the process-wide policy from ``DYNAMODB_RETRY_*`` / ``DYNAMODB_BREAKER_*``."""
+        return cls(
+            max_retries=int(os.getenv("DYNAMODB_RETRY_MAX_ATTEMPTS", "3")),
+            base_delay=float(os.getenv("DYNAMODB_RETRY_BASE_DELAY", "0.1")),
+            max_delay=float(os.getenv("DYNAMODB_RETRY_MAX_DELAY", "2.0")),
+            budget=RetryBudget(capacity=int(os.getenv("DYNAMODB_RETRY_BUDGET", "500"))),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv("DYNAMODB_BREAKER_THRESHOLD", "5")),
+                cooldown=float(os.getenv("DYNAMODB_BREAKER_COOLDOWN", "30")),
+            ),
+        )
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def stats(self):
+        """Return a snapshot of retry, breaker and sleep counters."""
+        with self._lock:
+            snapshot = dict(self._stats)
+        if self.budget is not None:
+            snapshot["budget_tokens"] = self.budget.tokens
+        if self.breaker is not None:
+            snapshot["breaker_open"] = self.breaker.is_open
+        return snapshot
+
+    def is_retryable(self, error):
+        if isinstance(error, ClientError):
+            code = error.response.get("Error", {}).get("Code")
+            return code in THROTTLING_ERRORS or code in SERVER_ERRORS
+        return isinstance(error, BotoCoreError)
+
+    def is_service_failure(self, error):
+        """Failures that suggest DynamoDB is down, as opposed to busy or a bad request."""
+        if isinstance(error, ClientError):
+            return error.response.get("Error", {}).get("Code") in SERVER_ERRORS
+        return isinstance(error, BotoCoreError)
+
+    def backoff(self, attempt, base_delay=None):
+        base = self.base_delay if base_delay is None else base_delay
+        return random.uniform(0, min(self.max_delay, base * (2**attempt)))
+
+    def before_call(self):
+        self._count("calls")
+        if self.breaker is None:
+            return
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self._count("short_circuits")
+            raise
+
+    def on_success(self, retry_cost=None):
+        if self.breaker is not None:
+            self.breaker.record_success()
+        if self.budget is not None:
+            self.budget.refund(retry_cost or self.budget.success_refund)
+
+    def on_unexpected_error(self, error):
+        """Called for errors that say nothing about DynamoDB's health (bugs, cancellation)."""
+        if self.breaker is not None:
+            self.breaker.release_probe()
+        logger.debug(f"DynamoDB call aborted by non-DynamoDB error: {error!r}")
+
+    def on_failure(self, error, attempt, max_retries=None, base_delay=None):
+        """Return (delay, retry_cost) for the next attempt, or None to re-raise ``error``."""
+        if self.breaker is not None:
+            if self.is_service_failure(error):
+                if self.breaker.record_failure():
+                    self._count("breaker_trips")
+                    logger.error(f"DynamoDB circuit breaker opened after: {error}")
+            else:
+                self.breaker.record_inconclusive()
+
+        max_retries = self.max_retries if max_retries is None else max_retries
+        if attempt >= max_retries - 1 or not self.is_retryable(error):
+            return None
+        if self.breaker is not None and self.breaker.is_open:
+            return None
+
+        retry_cost = None
+        if self.budget is not None:
+            retry_cost = self.budget.acquire(error)
+            if retry_cost is None:
+                self._count("budget_exhausted")
+                logger.warning(f"DynamoDB retry budget exhausted, not retrying: {error}")
+                return None
+
+        delay = self.backoff(attempt, base_delay)
+        self._count("retries")
+        self._count("sleep_seconds", delay)
+        if isinstance(error, ClientError):
+            logger.warning(
+                f"DynamoDB operation failed ({error.response['Error']['Code']}), "
+                f"retrying in {delay:.3f}s (attempt {attempt + 1}/{max_retries})"
+            )
+        else:
+            logger.warning(
+                f"DynamoDB network error, retrying in {delay:.3f}s "
+                f"(attempt {attempt + 1}/{max_retries}): {error}"
+            )
+        return delay, retry_cost
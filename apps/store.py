@@ -1,46 +1,282 @@
 import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from botocore.exceptions import ClientError
 
-from apps.database import db, retry_dynamodb_operation
+from apps.database import async_retry_dynamodb_operation, db, retry_dynamodb_operation
+from apps.user_cache import UserCache
+from apps.user_filter import UserExistenceFilter
 from apps.utils import normalize_email, validate_email
 
 logger = logging.getLogger(__name__)
-users_table = db.Table("users")
+USERS_TABLE_NAME = "users"
+users_table = db.Table(USERS_TABLE_NAME)
+user_cache = UserCache.from_env()
+user_filter = UserExistenceFilter.from_env(redis_client=user_cache.redis_client)
+
+# DynamoDB hard limits per BatchGetItem / BatchWriteItem call.
+BATCH_GET_LIMIT = 100
+BATCH_WRITE_LIMIT = 25
+BATCH_MAX_ATTEMPTS = 5
+BATCH_RETRY_BASE_DELAY = 0.05
+BATCH_MAX_WORKERS = int(os.getenv("DYNAMODB_BATCH_MAX_WORKERS", "4"))
+
+
+# Outcomes of verify_user_email().
+EMAIL_VERIFIED = "verified"
+EMAIL_ALREADY_VERIFIED = "already_verified"
+USER_NOT_FOUND = "not_found"
+
+
+class UserExistsError(Exception):
+    """Raised by add_user when an account with the email already exists."""
 
 
 def _is_conditional_check_failed(error):
     return error.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException"
 
 
-def get_user(email):
+def _lookup_email(email):
+    normalized_email = normalize_email(email)
+    if not normalized_email or not validate_email(normalized_email):
+        logger.warning(f"Invalid email format for user lookup: {email}")
+        return None
+    return normalized_email
+
+
+def _get_request(normalized_email, fields):
+    """Build ``get_item`` kwargs, projecting to ``fields`` (plus the key) if given."""
+    request = {"Key": {"email": normalized_email}}
+    if fields is not None:
+        names = {f"#p{i}": name for i, name in enumerate(dict.fromkeys(("email", *fields)))}
+        request["ProjectionExpression"] = ", ".join(names)
+        request["ExpressionAttributeNames"] = names
+    return request
+
+
+def _found_user(normalized_email, response, cached, fields):
+    item = response.get("Item") if response else None
+
+    if item:
+        logger.debug(f"User found: {normalized_email}")
+    else:
+        logger.debug(f"User not found: {normalized_email}")
+
+    if item and cached and user_cache.enabled:
+        user_cache.set(normalized_email, item, fields=fields)
+    if not item:
+        user_filter.record_missing(normalized_email)
+
+    return item
+
+
+def _new_user_item(data):
+    normalized_email = normalize_email(getattr(data, "email", ""))
+
+    # Validate required fields
+    if not normalized_email or not validate_email(normalized_email):
+        logger.warning(f"Invalid email for new user: {getattr(data, 'email', '')}")
+        return None
+
+    if not getattr(data, "password", None):
+        logger.warning("Missing password for new user")
+        return None
+
+    if not getattr(data, "id", None):
+        logger.warning("Missing user ID for new user")
+        return None
+
+    return {
+        "id": data.id,
+        "email": normalized_email,
+        "password": data.password,
+        "first_name": getattr(data, "first_name", ""),
+        "last_name": getattr(data, "last_name", ""),
+        "date_of_birth": getattr(data, "date_of_birth", ""),
+        "phone": getattr(data, "phone", ""),
+        "user_type": "user",
+        "is_active": True,
+        "email_verified": False,
+    }
+
+
+def _user_created(normalized_email, response):
+    if response and response.get("ResponseMetadata", {}).get("HTTPStatusCode") == 200:
+        logger.info(f"User created successfully: {normalized_email}")
+        return True
+    logger.error(f"Failed to create user: {normalized_email}")
+    return False
+
+
+def _add_user_failed(normalized_email, error):
+    if isinstance(error, ClientError):
+        if _is_conditional_check_failed(error):
+            logger.warning(f"User already exists (conditional write): {normalized_email}")
+            raise UserExistsError(normalized_email) from error
+        logger.error(f"DynamoDB error creating user {normalized_email}: {error}")
+    else:
+        logger.error(f"Unexpected error creating user {normalized_email}: {error}")
+    return False
+
+
+def _update_request(email, updates):
+    """Build ``update_item`` kwargs, or return None if the update is invalid."""
+    normalized_email = normalize_email(email)
+    if not normalized_email or not validate_email(normalized_email):
+        logger.warning(f"Invalid email for user update: {email}")
+        return None
+
+    if not updates:
+        logger.warning("No updates provided")
+        return None
+
+    safe_updates = dict(updates)
+    # Primary key changes should be handled with a dedicated migration flow.
+    if "email" in safe_updates:
+        logger.warning("Email updates are not supported via update_user")
+        return None
+
+    update_keys = [k for k in safe_updates.keys() if k]
+    if not update_keys:
+        logger.warning("No valid update keys provided")
+        return None
+
+    expr_names = {}
+    expr_values = {}
+    set_clauses = []
+    for key in update_keys:
+        name_ref = f"#{key}"
+        value_ref = f":{key}"
+        expr_names[name_ref] = key
+        expr_values[value_ref] = safe_updates[key]
+        set_clauses.append(f"{name_ref} = {value_ref}")
+
+    return {
+        "Key": {"email": normalized_email},
+        "UpdateExpression": "SET " + ", ".join(set_clauses),
+        "ExpressionAttributeNames": expr_names,
+        "ExpressionAttributeValues": expr_values,
+        "ConditionExpression": "attribute_exists(email)",
+        "ReturnValues": "ALL_NEW",
+    }
+
+
+def _updated_user(normalized_email, response, updates):
+    logger.info(f"User updated successfully: {normalized_email}")
+    updated_item = response.get("Attributes") if response else None
+    if updated_item:
+        return updated_item
+    # The conditional write succeeded, so the user exists; rather than paying
+    # for another GetItem, report what we know was written.
+    return {**updates, "email": normalized_email}
+
+
+def _update_user_failed(normalized_email, error):
+    if isinstance(error, ClientError):
+        if _is_conditional_check_failed(error):
+            logger.warning(f"User not found for update (conditional write): {normalized_email}")
+        else:
+            logger.error(f"DynamoDB error updating user {normalized_email}: {error}")
+    else:
+        logger.error(f"Unexpected error updating user {normalized_email}: {error}")
+    return None
+
+
+def user_may_exist(email):
+    """Cheap pre-check before ``get_user`` on paths hammered by unknown emails.
+
+    Returns:
+        False only if ``user_filter`` is certain no such account exists; no
+        DynamoDB read is made either way.
+    """
+    normalized_email = _lookup_email(email)
+    return bool(normalized_email) and user_filter.may_exist(normalized_email)
+
+
+def scan_user_emails():
+    """Yield every email in the users table, one paginated ``Scan`` page at a time."""
+    request = {"ProjectionExpression": "#email", "ExpressionAttributeNames": {"#email": "email"}}
+    while True:
+
+        def _scan_operation():
+            return users_table.scan(**request)
+
+        response = retry_dynamodb_operation(_scan_operation)
+        for item in response.get("Items", []):
+            yield item["email"]
+        last_key = response.get("LastEvaluatedKey")
+        if not last_key:
+            return
+        request["ExclusiveStartKey"] = last_key
+
+
+def rebuild_user_filter(force=False):
+    """Build the Bloom filter behind ``user_may_exist`` from a table scan.
+
+    Args:
+        force: Scan even if workers already share a filter through Redis.
+
+    Returns:
+        The number of emails loaded, or None if the filter is disabled,
+        was attached without a scan, or the scan failed.
+    """
+    if not user_filter.bloom_enabled:
+        return None
+    if not force and user_filter.attach():
+        logger.info("Attached to shared user filter")
+        return None
+    try:
+        return user_filter.rebuild(scan_user_emails())
+    except Exception as e:
+        logger.error(f"Failed to rebuild user filter: {e}")
+        return None
+
+
+def start_user_filter_rebuild():
+    """Run ``rebuild_user_filter`` on a daemon thread and return the thread.
+
+    A full-table scan can outlast a request or worker-boot timeout; until it
+    finishes the Bloom filter simply has no opinion.
+    """
+    thread = threading.Thread(target=rebuild_user_filter, name="user-filter-rebuild", daemon=True)
+    thread.start()
+    return thread
+
+
+def get_user(email, fields=None, cached=False):
     """Retrieve a user record by email.
 
     Args:
         email: The user's email address (partition key).
+        fields: Attribute names to fetch via ``ProjectionExpression``; the
+            ``email`` key is always included. None fetches the whole item.
+        cached: Serve from (and populate) ``user_cache``. Use this on hot read
+            paths such as session loading, not when verifying credentials.
 
     Returns:
         A dict with user attributes, or None if not found.
     """
-    normalized_email = normalize_email(email)
-    if not normalized_email or not validate_email(normalized_email):
-        logger.warning(f"Invalid email format for user lookup: {email}")
+    normalized_email = _lookup_email(email)
+    if not normalized_email:
         return None
 
+    if cached and user_cache.enabled:
+        item = user_cache.get(normalized_email, fields=fields)
+        if item:
+            return item
+
+    request = _get_request(normalized_email, fields)
     try:
 
         def _get_operation():
-            return users_table.get_item(Key={"email": normalized_email})
+            return users_table.get_item(**request)
 
         response = retry_dynamodb_operation(_get_operation)
-        item = response.get("Item") if response else None
-
-        if item:
-            logger.debug(f"User found: {normalized_email}")
-        else:
-            logger.debug(f"User not found: {normalized_email}")
-
-        return item
+        return _found_user(normalized_email, response, cached, fields)
 
     except ClientError as e:
         logger.error(f"DynamoDB error getting user {normalized_email}: {e}")
@@ -58,35 +294,18 @@ def add_user(data):
 
     Returns:
         True if successful, False otherwise.
-    """
-    normalized_email = normalize_email(getattr(data, "email", ""))
-
-    # Validate required fields
-    if not normalized_email or not validate_email(normalized_email):
-        logger.warning(f"Invalid email for new user: {getattr(data, 'email', '')}")
-        return False
-
-    if not getattr(data, "password", None):
-        logger.warning("Missing password for new user")
-        return False
 
-    if not getattr(data, "id", None):
-        logger.warning("Missing user ID for new user")
+    Raises:
+        UserExistsError: An account with this email already exists.
+    """
+    item = _new_user_item(data)
+    if not item:
         return False
+    normalized_email = item["email"]
+    # Before the write: a timed-out put may still have landed.
+    user_filter.add(normalized_email)
 
     try:
-        item = {
-            "id": data.id,
-            "email": normalized_email,
-            "password": data.password,
-            "first_name": getattr(data, "first_name", ""),
-            "last_name": getattr(data, "last_name", ""),
-            "date_of_birth": getattr(data, "date_of_birth", ""),
-            "phone": getattr(data, "phone", ""),
-            "user_type": "user",
-            "is_active": True,
-            "email_verified": False,
-        }
 
         def _put_operation():
             return users_table.put_item(
@@ -95,23 +314,11 @@ def add_user(data):
             )
 
         response = retry_dynamodb_operation(_put_operation)
+        user_cache.invalidate(normalized_email)
+        return _user_created(normalized_email, response)
 
-        if response and response.get("ResponseMetadata", {}).get("HTTPStatusCode") == 200:
-            logger.info(f"User created successfully: {normalized_email}")
-            return True
-        else:
-            logger.error(f"Failed to create user: {normalized_email}")
-            return False
-
-    except ClientError as e:
-        if _is_conditional_check_failed(e):
-            logger.warning(f"User already exists (conditional write): {normalized_email}")
-            return False
-        logger.error(f"DynamoDB error creating user {normalized_email}: {e}")
-        return False
     except Exception as e:
-        logger.error(f"Unexpected error creating user {normalized_email}: {e}")
-        return False
+        return _add_user_failed(normalized_email, e)
 
 
 def update_user(email, updates):
@@ -124,65 +331,305 @@ def update_user(email, updates):
     Returns:
         Updated user dict if successful, None otherwise.
     """
-    normalized_email = normalize_email(email)
-    if not normalized_email or not validate_email(normalized_email):
-        logger.warning(f"Invalid email for user update: {email}")
+    request = _update_request(email, updates)
+    if not request:
         return None
+    normalized_email = request["Key"]["email"]
 
-    if not updates:
-        logger.warning("No updates provided")
+    try:
+
+        def _update_operation():
+            return users_table.update_item(**request)
+
+        response = retry_dynamodb_operation(_update_operation)
+        user_cache.invalidate(normalized_email)
+
+        return _updated_user(normalized_email, response, updates)
+
+    except Exception as e:
+        return _update_user_failed(normalized_email, e)
+
+
+def verify_user_email(email):
+    """Mark a user's email as verified in a single conditional UpdateItem.
+
+    The write is conditioned on ``email_verified = false``, so concurrent
+    clicks on the same link cannot both "win", and the old item returned on a
+    failed condition tells "already verified" apart from "no such user"
+    without a second read. Accounts that predate verification (no attribute)
+    count as already verified, matching the login check.
+
+    Args:
+        email: The user's email address (partition key).
+
+    Returns:
+        EMAIL_VERIFIED, EMAIL_ALREADY_VERIFIED or USER_NOT_FOUND; None on error.
+    """
+    normalized_email = _lookup_email(email)
+    if not normalized_email:
         return None
 
     try:
-        safe_updates = dict(updates)
-        # Primary key changes should be handled with a dedicated migration flow.
-        if "email" in safe_updates:
-            logger.warning("Email updates are not supported via update_user")
-            return None
-
-        update_keys = [k for k in safe_updates.keys() if k]
-        if not update_keys:
-            logger.warning("No valid update keys provided")
-            return None
-
-        expr_names = {}
-        expr_values = {}
-        set_clauses = []
-        for key in update_keys:
-            name_ref = f"#{key}"
-            value_ref = f":{key}"
-            expr_names[name_ref] = key
-            expr_values[value_ref] = safe_updates[key]
-            set_clauses.append(f"{name_ref} = {value_ref}")
-
-        update_expression = "SET " + ", ".join(set_clauses)
 
-        def _update_operation():
+        def _verify_operation():
             return users_table.update_item(
                 Key={"email": normalized_email},
-                UpdateExpression=update_expression,
-                ExpressionAttributeNames=expr_names,
-                ExpressionAttributeValues=expr_values,
-                ConditionExpression="attribute_exists(email)",
-                ReturnValues="ALL_NEW",
+                UpdateExpression="SET #email_verified = :true",
+                ExpressionAttributeNames={"#email_verified": "email_verified"},
+                ExpressionAttributeValues={":true": True, ":false": False},
+                ConditionExpression="attribute_exists(email) AND #email_verified = :false",
+                ReturnValuesOnConditionCheckFailure="ALL_OLD",
             )
 
-        response = retry_dynamodb_operation(_update_operation)
+        retry_dynamodb_operation(_verify_operation)
+        user_cache.invalidate(normalized_email)
+        logger.info(f"Email verified for: {normalized_email}")
+        return EMAIL_VERIFIED
 
-        updated_item = response.get("Attributes") if response else None
-        if updated_item:
-            logger.info(f"User updated successfully: {normalized_email}")
-            return updated_item
+    except ClientError as e:
+        if _is_conditional_check_failed(e):
+            if e.response.get("Item"):
+                return EMAIL_ALREADY_VERIFIED
+            logger.warning(f"User not found for verification: {normalized_email}")
+            return USER_NOT_FOUND
+        logger.error(f"DynamoDB error verifying user {normalized_email}: {e}")
+        return None
+    except Exception as e:
+        logger.error(f"Unexpected error verifying user {normalized_email}: {e}")
+        return None
 
-        # Fallback for clients/tables that do not return attributes as expected.
-        return get_user(normalized_email)
+
+async def aget_user(email, fields=None, cached=False):
+    """Async ``get_user``: the DynamoDB call runs on the bounded executor.
+
+    Args:
+        email: The user's email address (partition key).
+        fields: Attribute names to fetch; None fetches the whole item.
+        cached: Serve from (and populate) ``user_cache``.
+
+    Returns:
+        A dict with user attributes, or None if not found.
+    """
+    normalized_email = _lookup_email(email)
+    if not normalized_email:
+        return None
+
+    if cached and user_cache.enabled:
+        item = user_cache.get(normalized_email, fields=fields)
+        if item:
+            return item
+
+    request = _get_request(normalized_email, fields)
+    try:
+
+        def _get_operation():
+            return users_table.get_item(**request)
+
+        response = await async_retry_dynamodb_operation(_get_operation)
+        return _found_user(normalized_email, response, cached, fields)
 
     except ClientError as e:
-        if _is_conditional_check_failed(e):
-            logger.warning(f"User not found for update (conditional write): {normalized_email}")
-            return None
-        logger.error(f"DynamoDB error updating user {normalized_email}: {e}")
+        logger.error(f"DynamoDB error getting user {normalized_email}: {e}")
         return None
     except Exception as e:
-        logger.error(f"Unexpected error updating user {normalized_email}: {e}")
+        logger.error(f"Unexpected error getting user {normalized_email}: {e}")
         return None
+
+
+async def aadd_user(data):
+    """Async ``add_user``.
+
+    Args:
+        data: A namespace/object with id, email, and password attributes.
+
+    Returns:
+        True if successful, False otherwise.
+
+    Raises:
+        UserExistsError: An account with this email already exists.
+    """
+    item = _new_user_item(data)
+    if not item:
+        return False
+    normalized_email = item["email"]
+    # Before the write: a timed-out put may still have landed.
+    user_filter.add(normalized_email)
+
+    try:
+
+        def _put_operation():
+            return users_table.put_item(
+                Item=item,
+                ConditionExpression="attribute_not_exists(email)",
+            )
+
+        response = await async_retry_dynamodb_operation(_put_operation)
+        user_cache.invalidate(normalized_email)
+        return _user_created(normalized_email, response)
+
+    except Exception as e:
+        return _add_user_failed(normalized_email, e)
+
+
+async def aupdate_user(email, updates):
+    """Async ``update_user``.
+
+    Args:
+        email: The user's email address (partition key).
+        updates: A dict of field names to new values.
+
+    Returns:
+        Updated user dict if successful, None otherwise.
+    """
+    request = _update_request(email, updates)
+    if not request:
+        return None
+    normalized_email = request["Key"]["email"]
+
+    try:
+
+        def _update_operation():
+            return users_table.update_item(**request)
+
+        response = await async_retry_dynamodb_operation(_update_operation)
+        user_cache.invalidate(normalized_email)
+
+        return _updated_user(normalized_email, response, updates)
+
+    except Exception as e:
+        return _update_user_failed(normalized_email, e)
+
+
+def _chunks(values, size):
+    return [values[i : i + size] for i in range(0, len(values), size)]
+
+
+def _run_chunks(func, chunks):
+    if len(chunks) <= 1 or BATCH_MAX_WORKERS <= 1:
+        return [func(chunk) for chunk in chunks]
+    with ThreadPoolExecutor(max_workers=min(BATCH_MAX_WORKERS, len(chunks))) as executor:
+        return list(executor.map(func, chunks))
+
+
+def _unprocessed_backoff(attempt):
+    # Full jitter so concurrent chunks do not retry in lockstep.
+    time.sleep(random.uniform(0, BATCH_RETRY_BASE_DELAY * (2**attempt)))
+
+
+def _batch_get_chunk(keys):
+    request_items = {USERS_TABLE_NAME: {"Keys": keys}}
+    found = []
+    for attempt in range(BATCH_MAX_ATTEMPTS):
+
+        def _batch_get_operation():
+            return db.batch_get_item(RequestItems=request_items)
+
+        response = retry_dynamodb_operation(_batch_get_operation) or {}
+        found.extend(response.get("Responses", {}).get(USERS_TABLE_NAME, []))
+        request_items = response.get("UnprocessedKeys") or {}
+        if not request_items:
+            return found
+        _unprocessed_backoff(attempt)
+
+    missing = len(request_items.get(USERS_TABLE_NAME, {}).get("Keys", []))
+    logger.error(f"Batch get gave up on {missing} unprocessed keys")
+    return found
+
+
+def _batch_write_chunk(items):
+    request_items = {USERS_TABLE_NAME: [{"PutRequest": {"Item": item}} for item in items]}
+    for attempt in range(BATCH_MAX_ATTEMPTS):
+
+        def _batch_write_operation():
+            return db.batch_write_item(RequestItems=request_items)
+
+        response = retry_dynamodb_operation(_batch_write_operation) or {}
+        request_items = response.get("UnprocessedItems") or {}
+        if not request_items:
+            return []
+        _unprocessed_backoff(attempt)
+
+    unwritten = [r["PutRequest"]["Item"]["email"] for r in request_items.get(USERS_TABLE_NAME, [])]
+    logger.error(f"Batch write gave up on {len(unwritten)} unprocessed items")
+    return unwritten
+
+
+def get_users(emails):
+    """Retrieve many user records with as few round trips as possible.
+
+    Keys are deduplicated, split into ``BatchGetItem`` chunks of 100 and the
+    chunks fetched concurrently; ``UnprocessedKeys`` are retried with backoff.
+
+    Args:
+        emails: An iterable of email addresses.
+
+    Returns:
+        A dict mapping normalized email to user record. Emails that are invalid,
+        missing, or could not be fetched are absent.
+    """
+    normalized = []
+    for email in emails:
+        normalized_email = normalize_email(email)
+        if not normalized_email or not validate_email(normalized_email):
+            logger.warning(f"Invalid email format for batch user lookup: {email}")
+            continue
+        normalized.append(normalized_email)
+    keys = [{"email": email} for email in dict.fromkeys(normalized)]
+    if not keys:
+        return {}
+
+    try:
+        results = _run_chunks(_batch_get_chunk, _chunks(keys, BATCH_GET_LIMIT))
+    except ClientError as e:
+        logger.error(f"DynamoDB error batch getting {len(keys)} users: {e}")
+        return {}
+    except Exception as e:
+        logger.error(f"Unexpected error batch getting {len(keys)} users: {e}")
+        return {}
+
+    return {item["email"]: item for chunk in results for item in chunk}
+
+
+def put_users(items):
+    """Create or overwrite many user records via ``BatchWriteItem``.
+
+    Unlike ``add_user`` this is an unconditional upsert: batch writes cannot
+    carry a ConditionExpression. Items are chunked into groups of 25 and the
+    chunks written concurrently; ``UnprocessedItems`` are retried with backoff.
+
+    Args:
+        items: An iterable of user dicts, each with an ``email`` key.
+
+    Returns:
+        True if every item was written, False otherwise.
+    """
+    by_email = {}
+    all_valid = True
+    for item in items:
+        normalized_email = normalize_email(item.get("email", ""))
+        if not normalized_email or not validate_email(normalized_email):
+            logger.warning(f"Invalid email for batch user write: {item.get('email', '')}")
+            all_valid = False
+            continue
+        by_email[normalized_email] = {**item, "email": normalized_email}
+    if not by_email:
+        return False
+
+    try:
+        results = _run_chunks(
+            _batch_write_chunk, _chunks(list(by_email.values()), BATCH_WRITE_LIMIT)
+        )
+    except ClientError as e:
+        logger.error(f"DynamoDB error batch writing {len(by_email)} users: {e}")
+        return False
+    except Exception as e:
+        logger.error(f"Unexpected error batch writing {len(by_email)} users: {e}")
+        return False
+    finally:
+        for email in by_email:
+            user_cache.invalidate(email)
+            user_filter.add(email)
+
+    unwritten = [email for chunk in results for email in chunk]
+    logger.info(f"Batch wrote {len(by_email) - len(unwritten)}/{len(by_email)} users")
+    return all_valid and not unwritten
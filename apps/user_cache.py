@@ -0,0 +1,233 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import g, has_app_context
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        logger.warning(f"Invalid integer for {name}; using default {default}")
+        return int(default)
+
+
+class UserCache:
+    """Tiered cache for user records keyed by normalized email.
+
+    Lookups go through three tiers, cheapest first:
+
+    1. A per-request dict stored on ``flask.g`` so repeated lookups within one
+       request never leave the process.
+    2. A process-wide LRU bounded by ``max_entries`` with a short ``ttl``.
+    3. An optional shared Redis tier so gunicorn workers see each other's
+       invalidations after at most one local TTL.
+
+    Writes through ``apps.store`` call ``invalidate`` so the next lookup is
+    served from DynamoDB.
+    """
+
+    def __init__(self, max_entries=1024, ttl=10, redis_client=None, redis_ttl=300):
+        self.max_entries = max(0, int(max_entries))
+        self.ttl = max(0, float(ttl))
+        self.redis_client = redis_client
+        self.redis_ttl = max(1, int(redis_ttl))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = dict.fromkeys(
+            (
+                "request_hits",
+                "local_hits",
+                "shared_hits",
+                "misses",
+                "evictions",
+                "invalidations",
+                "shared_errors",
+            ),
+            0,
+        )
+
+    @classmethod
+    def from_env(cls):
+        """Build a cache from ``USER_CACHE_*`` environment variables."""
+        redis_client = None
+        redis_url = os.getenv("USER_CACHE_REDIS_URL", "").strip()
+        if redis_url:
+            try:
+                import redis
+
+                redis_client = redis.Redis.from_url(
+                    redis_url, socket_timeout=0.2, socket_connect_timeout=0.2
+                )
+            except Exception as e:
+                logger.error(f"User cache Redis tier disabled: {e}")
+
+        return cls(
+            max_entries=_env_int("USER_CACHE_MAX_ENTRIES", "1024"),
+            ttl=_env_int("USER_CACHE_TTL_SECONDS", "10"),
+            redis_client=redis_client,
+            redis_ttl=_env_int("USER_CACHE_REDIS_TTL_SECONDS", "300"),
+        )
+
+    @property
+    def enabled(self):
+        return (self.max_entries > 0 and self.ttl > 0) or self.redis_client is not None
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _request_tier(self):
+        if not has_app_context():
+            return None
+        tier = g.get("_user_cache")
+        if tier is None:
+            tier = g._user_cache = {}
+        return tier
+
+    def _redis_key(self, email):
+        return f"user-cache:v2:{email}"
+
+    @staticmethod
+    def _covers(entry, fields):
+        cached_fields = entry["fields"]
+        return cached_fields is None or (fields is not None and set(fields) <= cached_fields)
+
+    @staticmethod
+    def _project(entry, fields):
+        item = entry["item"]
+        if fields is None:
+            return dict(item)
+        # Same shape as a projected DynamoDB read, which always includes the key.
+        return {name: item[name] for name in dict.fromkeys(("email", *fields)) if name in item}
+
+    def get(self, email, fields=None):
+        """Return a copy of the cached user record, or None on a miss.
+
+        Args:
+            email: Normalized email address.
+            fields: Attribute names the caller needs, or None for the full
+                item. An entry cached with a wider projection still hits.
+        """
+        request_tier = self._request_tier()
+        entry = request_tier.get(email) if request_tier is not None else None
+        if entry is not None and self._covers(entry, fields):
+            self._count("request_hits")
+            return self._project(entry, fields)
+
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(email)
+            if cached is not None:
+                expires_at, entry = cached
+                if expires_at <= now:
+                    del self._entries[email]
+                elif self._covers(entry, fields):
+                    self._entries.move_to_end(email)
+                    self._stats["local_hits"] += 1
+                    if request_tier is not None:
+                        request_tier[email] = entry
+                    return self._project(entry, fields)
+
+        if self.redis_client is not None:
+            try:
+                raw = self.redis_client.get(self._redis_key(email))
+            except Exception as e:
+                self._count("shared_errors")
+                logger.warning(f"User cache Redis read failed: {e}")
+                raw = None
+            if raw:
+                payload = json.loads(raw)
+                entry = {
+                    "fields": None if payload["fields"] is None else frozenset(payload["fields"]),
+                    "item": payload["item"],
+                }
+                if self._covers(entry, fields):
+                    self._count("shared_hits")
+                    self._store_local(email, entry, request_tier)
+                    return self._project(entry, fields)
+
+        self._count("misses")
+        return None
+
+    def set(self, email, item, fields=None):
+        """Cache a user record in every enabled tier.
+
+        Args:
+            email: Normalized email address.
+            item: The record as returned by DynamoDB.
+            fields: The projection ``item`` was fetched with, or None if full.
+        """
+        if not item:
+            return
+        entry = {"fields": None if fields is None else frozenset(fields), "item": dict(item)}
+        self._store_local(email, entry, self._request_tier())
+
+        if self.redis_client is not None:
+            payload = {
+                "fields": None if fields is None else sorted(entry["fields"]),
+                "item": entry["item"],
+            }
+            try:
+                self.redis_client.setex(
+                    self._redis_key(email), self.redis_ttl, json.dumps(payload, default=str)
+                )
+            except Exception as e:
+                self._count("shared_errors")
+                logger.warning(f"User cache Redis write failed: {e}")
+
+    def _store_local(self, email, entry, request_tier):
+        if request_tier is not None:
+            request_tier[email] = entry
+
+        if self.max_entries <= 0 or self.ttl <= 0:
+            return
+
+        with self._lock:
+            self._entries[email] = (time.monotonic() + self.ttl, entry)
+            self._entries.move_to_end(email)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, email):
+        """Drop a user record from every tier."""
+        request_tier = self._request_tier()
+        if request_tier is not None:
+            request_tier.pop(email, None)
+
+        with self._lock:
+            self._entries.pop(email, None)
+            self._stats["invalidations"] += 1
+
+        if self.redis_client is not None:
+            try:
+                self.redis_client.delete(self._redis_key(email))
+            except Exception as e:
+                self._count("shared_errors")
+                logger.warning(f"User cache Redis invalidation failed: {e}")
+
+    def clear(self):
+        """Drop all process-local entries (the shared tier is left untouched)."""
+        request_tier = self._request_tier()
+        if request_tier is not None:
+            request_tier.clear()
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return a snapshot of hit/miss counters and current size."""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["size"] = len(self._entries)
+        hits = snapshot["request_hits"] + snapshot["local_hits"] + snapshot["shared_hits"]
+        lookups = hits + snapshot["misses"]
+        snapshot["hits"] = hits
+        snapshot["hit_ratio"] = hits / lookups if lookups else 0.0
+        return snapshot
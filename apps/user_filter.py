@@ -0,0 +1,340 @@
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def _env_flag(name, default="false"):
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings.
+
+    Sized for ``capacity`` members at ``error_rate`` false positives. Bit ``i``
+    lives in byte ``i >> 3`` under mask ``0x80 >> (i & 7)``, the same layout
+    Redis uses for ``SETBIT``/``GETBIT``, so ``bits`` can be uploaded as-is.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = max(1, int(capacity))
+        self.error_rate = min(0.5, max(1e-9, float(error_rate)))
+        self.size = max(8, math.ceil(-self.capacity * math.log(self.error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, value):
+        """Bit positions for ``value`` (Kirsch-Mitzenmacher double hashing)."""
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, value):
+        for position in self.positions(value):
+            self.bits[position >> 3] |= 0x80 >> (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(
+            self.bits[position >> 3] & (0x80 >> (position & 7))
+            for position in self.positions(value)
+        )
+
+    def estimated_error_rate(self):
+        """False-positive rate expected at the current member count."""
+        return (1 - math.exp(-self.hash_count * self.count / self.size)) ** self.hash_count
+
+
+class UserExistenceFilter:
+    """Answers "definitely not a user" for an email without a DynamoDB read.
+
+    Two independent sources can rule an email out:
+
+    1. A negative cache of emails recently looked up and not found, kept for
+       ``negative_ttl`` seconds. With ``redis_client`` the entries live in
+       Redis, so a signup on any worker clears them for all; otherwise they
+       are process-local (bounded by ``negative_max_entries``) and only safe
+       with a single worker, so ``from_env`` leaves them off without Redis.
+    2. An optional Bloom filter of every known email, built by ``rebuild``
+       from a table scan and kept current by ``add``. When ``redis_client`` is
+       given, the filter bits live in Redis so every gunicorn worker sees
+       signups made by the others; otherwise they are process-local. Users
+       are never deleted, so a rebuild ORs into the shared bits rather than
+       replacing them and cannot drop a signup another worker made mid-scan.
+       A process-local filter never sees other workers' signups, so
+       ``check_workers`` refuses that setup with more than one worker.
+
+    Anything not ruled out "may exist" and must be confirmed with a read.
+    Until the first ``rebuild`` completes the Bloom filter has no opinion.
+    """
+
+    def __init__(
+        self,
+        negative_ttl=0,
+        negative_max_entries=10000,
+        bloom_enabled=False,
+        bloom_capacity=100000,
+        bloom_error_rate=0.01,
+        redis_client=None,
+    ):
+        self.negative_ttl = max(0, float(negative_ttl))
+        self.negative_max_entries = max(0, int(negative_max_entries))
+        self.bloom_enabled = bloom_enabled
+        self.bloom_capacity = max(1, int(bloom_capacity))
+        self.bloom_error_rate = bloom_error_rate
+        self.redis_client = redis_client
+        self._bloom = None
+        # Shared bits are written on every signup, even before this worker
+        # has attached, so no worker can miss another's addition.
+        self._shared_layout = None
+        if bloom_enabled and redis_client is not None:
+            self._shared_layout = BloomFilter(self.bloom_capacity, self.bloom_error_rate)
+        self._rebuild_pending = None
+        self._negative = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = dict.fromkeys(
+            ("negative_hits", "bloom_rejections", "passed", "rebuilds", "shared_errors"), 0
+        )
+
+    @classmethod
+    def from_env(cls, redis_client=None):
+        """Build a filter from ``USER_NEGATIVE_CACHE_*`` / ``USER_BLOOM_*`` variables."""
+        default_ttl = "30" if redis_client is not None else "0"
+        return cls(
+            negative_ttl=float(os.getenv("USER_NEGATIVE_CACHE_TTL_SECONDS", default_ttl)),
+            negative_max_entries=int(os.getenv("USER_NEGATIVE_CACHE_MAX_ENTRIES", "10000")),
+            bloom_enabled=_env_flag("USER_BLOOM_ENABLED"),
+            bloom_capacity=int(os.getenv("USER_BLOOM_CAPACITY", "100000")),
+            bloom_error_rate=float(os.getenv("USER_BLOOM_ERROR_RATE", "0.01")),
+            redis_client=redis_client,
+        )
+
+    @property
+    def redis_key(self):
+        # Sizing is part of the key so workers only share identically laid out bits.
+        return f"user-filter:v1:{self.bloom_capacity}:{self.bloom_error_rate}"
+
+    def _missing_key(self, email):
+        return f"user-filter:missing:v1:{email}"
+
+    @property
+    def negative_enabled(self):
+        return self.negative_ttl > 0 and (
+            self.redis_client is not None or self.negative_max_entries > 0
+        )
+
+    @property
+    def ready(self):
+        """True once a Bloom filter has been built and is answering lookups."""
+        return self._bloom is not None
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _bloom_contains(self, bloom, email):
+        if self.redis_client is None:
+            return email in bloom
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for position in bloom.positions(email):
+                pipe.getbit(self.redis_key, position)
+            return all(pipe.execute())
+        except Exception as e:
+            self._count("shared_errors")
+            logger.warning(f"User filter Redis read failed: {e}")
+            return True
+
+    def _bloom_add(self, bloom, email):
+        if self.redis_client is None:
+            bloom.add(email)
+            return
+        bloom.count += 1
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for position in bloom.positions(email):
+                pipe.setbit(self.redis_key, position, 1)
+            pipe.execute()
+        except Exception as e:
+            self._count("shared_errors")
+            logger.warning(f"User filter Redis write failed: {e}")
+
+    def _shared_missing(self, email):
+        try:
+            return bool(self.redis_client.exists(self._missing_key(email)))
+        except Exception as e:
+            self._count("shared_errors")
+            logger.warning(f"User filter Redis read failed: {e}")
+            return False
+
+    def may_exist(self, email):
+        """False only if ``email`` is certainly not a registered user."""
+        if self.negative_enabled and self.redis_client is not None:
+            if self._shared_missing(email):
+                self._count("negative_hits")
+                return False
+
+        now = time.monotonic()
+        with self._lock:
+            expires_at = self._negative.get(email)
+            if expires_at is not None:
+                if expires_at > now:
+                    self._stats["negative_hits"] += 1
+                    return False
+                del self._negative[email]
+            bloom = self._bloom
+
+        if bloom is not None and not self._bloom_contains(bloom, email):
+            self._count("bloom_rejections")
+            return False
+        self._count("passed")
+        return True
+
+    def record_missing(self, email):
+        """Remember that a read just found no user for ``email``."""
+        if not self.negative_enabled:
+            return
+        if self.redis_client is not None:
+            try:
+                self.redis_client.set(self._missing_key(email), 1, ex=math.ceil(self.negative_ttl))
+            except Exception as e:
+                self._count("shared_errors")
+                logger.warning(f"User filter Redis write failed: {e}")
+            return
+        with self._lock:
+            self._negative[email] = time.monotonic() + self.negative_ttl
+            self._negative.move_to_end(email)
+            while len(self._negative) > self.negative_max_entries:
+                self._negative.popitem(last=False)
+
+    def add(self, email):
+        """Record a newly created (or confirmed existing) user."""
+        with self._lock:
+            self._negative.pop(email, None)
+            bloom = self._bloom or self._shared_layout
+            if self._rebuild_pending is not None:
+                self._rebuild_pending.append(email)
+        if self.negative_enabled and self.redis_client is not None:
+            try:
+                self.redis_client.delete(self._missing_key(email))
+            except Exception as e:
+                self._count("shared_errors")
+                logger.warning(f"User filter Redis write failed: {e}")
+        if bloom is not None:
+            self._bloom_add(bloom, email)
+
+    def check_workers(self, workers):
+        """Refuse settings that go stale across ``workers`` processes.
+
+        Raises:
+            RuntimeError: The Bloom filter is enabled without a Redis tier and
+                more than one worker would each keep a private copy that
+                rejects accounts created on the others.
+        """
+        if workers <= 1 or self.redis_client is not None:
+            return
+        if self.bloom_enabled:
+            raise RuntimeError(
+                f"USER_BLOOM_ENABLED with {workers} workers requires USER_CACHE_REDIS_URL; "
+                "process-local filters reject accounts created on other workers"
+            )
+        if self.negative_enabled:
+            logger.warning(
+                f"USER_NEGATIVE_CACHE_TTL_SECONDS is set without USER_CACHE_REDIS_URL and "
+                f"{workers} workers; new accounts may read as missing on other workers "
+                f"for up to {self.negative_ttl}s"
+            )
+
+    def attach(self):
+        """Start answering from shared bits another worker already built.
+
+        Returns:
+            True if the shared filter exists, so no scan is needed.
+        """
+        if not self.bloom_enabled or self.redis_client is None:
+            return False
+        try:
+            exists = self.redis_client.exists(self.redis_key)
+        except Exception as e:
+            self._count("shared_errors")
+            logger.warning(f"User filter Redis lookup failed: {e}")
+            return False
+        if exists:
+            with self._lock:
+                self._bloom = self._shared_layout
+        return bool(exists)
+
+    def rebuild(self, emails):
+        """Build the Bloom filter from ``emails`` and start answering from it.
+
+        Process-local filters are sized for twice the scanned count (at least
+        ``bloom_capacity``) so the error rate holds while the table grows;
+        shared filters keep the configured capacity so every worker agrees on
+        the layout.
+
+        Args:
+            emails: Iterable of every normalized email in the users table.
+
+        Returns:
+            The number of emails loaded.
+        """
+        if not self.bloom_enabled:
+            return 0
+        with self._lock:
+            self._rebuild_pending = []
+
+        try:
+            emails = list(emails)
+            capacity = self.bloom_capacity
+            if self.redis_client is None:
+                capacity = max(capacity, 2 * len(emails))
+            bloom = BloomFilter(capacity, self.bloom_error_rate)
+            for email in emails:
+                bloom.add(email)
+
+            if self.redis_client is not None:
+                staging_key = f"{self.redis_key}:staging:{os.getpid()}"
+                pipe = self.redis_client.pipeline(transaction=True)
+                pipe.set(staging_key, bytes(bloom.bits))
+                pipe.bitop("OR", self.redis_key, self.redis_key, staging_key)
+                pipe.delete(staging_key)
+                pipe.execute()
+        except Exception:
+            with self._lock:
+                self._rebuild_pending = None
+            raise
+
+        with self._lock:
+            # Signups that landed during the scan may be missing from it.
+            for email in self._rebuild_pending:
+                bloom.add(email)
+            self._rebuild_pending = None
+            self._bloom = bloom
+            self._stats["rebuilds"] += 1
+        logger.info(
+            f"Rebuilt user filter with {bloom.count} emails "
+            f"({len(bloom.bits)} bytes, {bloom.hash_count} hashes)"
+        )
+        if bloom.count > bloom.capacity:
+            logger.warning("User filter is over capacity; false-positive rate is rising")
+        return bloom.count
+
+    def stats(self):
+        """Return rejection counters and Bloom filter sizing."""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["negative_size"] = len(self._negative)
+            bloom = self._bloom
+        snapshot["bloom_ready"] = bloom is not None
+        if bloom is not None:
+            snapshot["bloom_count"] = bloom.count
+            snapshot["bloom_bytes"] = len(bloom.bits)
+            snapshot["bloom_error_rate"] = bloom.estimated_error_rate()
+        return snapshot
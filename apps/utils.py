@@ -1,6 +1,9 @@
 import re
 from datetime import date, datetime
 
+from apps.password_blocklist import blocklist
+
+EMAIL_PATTERN = re.compile(r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$")
 NAME_PATTERN = re.compile(r"^[a-zA-Z\s\-']+$")
 PHONE_PATTERN = re.compile(r"^\+?[0-9\s().-]{7,20}$")
 COMMON_PASSWORDS = {
@@ -30,9 +33,7 @@ def validate_email(email):
     """
     if not email:
         return False
-    # Standard email regex pattern
-    pattern = r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$"
-    return bool(re.fullmatch(pattern, email))
+    return bool(EMAIL_PATTERN.fullmatch(email))
 
 
 def validate_name(name):
@@ -98,19 +99,33 @@ def get_password_validation_errors(password):
     if not password:
         return ["Password is required."]
 
+    # One pass over the characters instead of a regex search per class.
+    has_upper = has_lower = has_digit = has_symbol = False
+    for char in password:
+        if "A" <= char <= "Z":
+            has_upper = True
+        elif "a" <= char <= "z":
+            has_lower = True
+        elif "0" <= char <= "9":
+            has_digit = True
+        else:
+            has_symbol = True
+
     errors = []
     if len(password) < 12:
         errors.append("Use at least 12 characters.")
-    if not re.search(r"[A-Z]", password):
+    if not has_upper:
         errors.append("Include at least one uppercase letter.")
-    if not re.search(r"[a-z]", password):
+    if not has_lower:
         errors.append("Include at least one lowercase letter.")
-    if not re.search(r"\d", password):
+    if not has_digit:
         errors.append("Include at least one number.")
-    if not re.search(r"[^A-Za-z0-9]", password):
+    if not has_symbol:
         errors.append("Include at least one symbol (for example: ! @ # $).")
     if password.lower() in COMMON_PASSWORDS:
         errors.append("Choose a less common password.")
+    elif password in blocklist:
+        errors.append("This password has appeared in a data breach. Choose a different one.")
     return errors
 
 
@@ -0,0 +1,208 @@
+"""Declarative form validation shared by the auth and main blueprints.
+
+A ``Schema`` is a list of ``Field`` rules compiled once at import. Validating
+a submitted form is one pass over each field that collects every error, so a
+user sees all problems at once instead of fixing them one round trip at a
+time. Messages are de-duplicated in order, so paired fields (first / last
+name) report a shared message once.
+"""
+
+from apps.utils import (
+    EMAIL_PATTERN,
+    NAME_PATTERN,
+    PHONE_PATTERN,
+    get_password_validation_errors,
+    validate_date_of_birth,
+)
+
+DATE_OF_BIRTH_MESSAGE = (
+    "Enter a valid birth date in YYYY-MM-DD format (age must be between 13 and 120)."
+)
+NAME_MESSAGE = "Names may only contain letters, spaces, hyphens, and apostrophes."
+
+
+class Field:
+    """Rules for one form field.
+
+    Rules run cheapest first (length before regex) and, by default, stop at
+    the field's first failure; other fields are still checked.
+
+    Args:
+        name: Key of the field in the submitted data.
+        required: Message to report when the value is empty; None makes the
+            field optional, in which case an empty value skips later rules.
+        max_length: ``(limit, message)``.
+        pattern: ``(compiled_regex, message)``; the whole value must match.
+        check: ``(callable, message)``; the callable gets the value.
+        errors: Callable returning a list of messages for the value, for
+            policies that report several failures (e.g. passwords).
+        equals: ``(other_field, message)``; the values must be equal.
+        differs: ``(other_field, message)``; the values must differ.
+        stop_on_error: Skip this field's later rules after its first failure.
+    """
+
+    def __init__(
+        self,
+        name,
+        required=None,
+        max_length=None,
+        pattern=None,
+        check=None,
+        errors=None,
+        equals=None,
+        differs=None,
+        stop_on_error=True,
+    ):
+        self.name = name
+        self.required = required
+        self.equals = equals
+        self.stop_on_error = stop_on_error
+        self.rules = self._compile(max_length, pattern, check, errors, differs)
+
+    @staticmethod
+    def _compile(max_length, pattern, check, errors, differs):
+        # Each rule binds its settings as defaults so later rules cannot rebind them.
+        rules = []
+        if max_length is not None:
+            rules.append(
+                lambda value, data, rule=max_length: [] if len(value) <= rule[0] else [rule[1]]
+            )
+        if pattern is not None:
+            rules.append(
+                lambda value, data, rule=pattern: [] if rule[0].fullmatch(value) else [rule[1]]
+            )
+        if check is not None:
+            rules.append(lambda value, data, rule=check: [] if rule[0](value) else [rule[1]])
+        if errors is not None:
+            rules.append(lambda value, data, func=errors: func(value))
+        if differs is not None:
+            rules.append(
+                lambda value, data, rule=differs: (
+                    [rule[1]] if value == data.get(rule[0], "") else []
+                )
+            )
+        return tuple(rules)
+
+    def validate(self, value, data):
+        # Equality runs even on an empty value: a blank confirmation must not pass.
+        if self.equals is not None:
+            other, message = self.equals
+            if value != (data.get(other) or ""):
+                return [message]
+        if not value:
+            return [self.required] if self.required else []
+        found = []
+        for rule in self.rules:
+            failures = rule(value, data)
+            if failures:
+                found.extend(failures)
+                if self.stop_on_error:
+                    break
+        return found
+
+
+class Schema:
+    """An ordered set of ``Field`` rules."""
+
+    def __init__(self, *fields):
+        self.fields = fields
+
+    def validate(self, data):
+        """Return every error message for ``data``, in field order, de-duplicated.
+
+        Args:
+            data: Mapping of field name to submitted (already stripped) string.
+
+        Returns:
+            A list of user-facing messages; empty when the data is valid.
+        """
+        found = []
+        for field in self.fields:
+            found.extend(field.validate(data.get(field.name) or "", data))
+        return list(dict.fromkeys(found))
+
+
+def _name_field(name, required):
+    return Field(
+        name,
+        required=required,
+        max_length=(100, "First and last names must be 100 characters or fewer."),
+        pattern=(NAME_PATTERN, NAME_MESSAGE),
+    )
+
+
+SIGNUP_SCHEMA = Schema(
+    Field(
+        "email",
+        required="Please enter a valid email address.",
+        pattern=(EMAIL_PATTERN, "Please enter a valid email address."),
+    ),
+    _name_field("first_name", "Please enter your first and last name."),
+    _name_field("last_name", "Please enter your first and last name."),
+    Field(
+        "password",
+        required="Password is required.",
+        errors=get_password_validation_errors,
+    ),
+    Field("confirm_password", equals=("password", "Passwords do not match.")),
+    Field(
+        "date_of_birth",
+        required="Please enter your date of birth.",
+        check=(validate_date_of_birth, DATE_OF_BIRTH_MESSAGE),
+    ),
+)
+
+PROFILE_SCHEMA = Schema(
+    _name_field("first_name", "First and last name are required."),
+    _name_field("last_name", "First and last name are required."),
+    Field(
+        "date_of_birth",
+        required=DATE_OF_BIRTH_MESSAGE,
+        check=(validate_date_of_birth, DATE_OF_BIRTH_MESSAGE),
+    ),
+    Field(
+        "phone",
+        max_length=(20, "Phone number must be 20 characters or fewer."),
+        pattern=(PHONE_PATTERN, "Please enter a valid phone number."),
+    ),
+)
+
+PASSWORD_CHANGE_SCHEMA = Schema(
+    Field(
+        "new_password",
+        required="Password is required.",
+        errors=get_password_validation_errors,
+    ),
+    Field("confirm_new_password", equals=("new_password", "New passwords do not match.")),
+    Field(
+        "new_password",
+        differs=(
+            "current_password",
+            "New password must be different from your current password.",
+        ),
+    ),
+)
+
+CONTACT_SCHEMA = Schema(
+    Field(
+        "name",
+        required="Please fill in all required fields.",
+        pattern=(NAME_PATTERN, "Name may only contain letters, spaces, hyphens, and apostrophes."),
+        max_length=(100, "Name is too long."),
+    ),
+    Field(
+        "email",
+        required="Please fill in all required fields.",
+        pattern=(EMAIL_PATTERN, "Please enter a valid email address."),
+    ),
+    Field(
+        "phone",
+        max_length=(20, "Phone number is too long."),
+        pattern=(PHONE_PATTERN, "Please enter a valid phone number."),
+    ),
+    Field(
+        "message",
+        required="Please fill in all required fields.",
+        max_length=(3000, "Message is too long (maximum 3000 characters)."),
+    ),
+)
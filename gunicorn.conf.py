@@ -0,0 +1,30 @@
+# Loaded automatically by gunicorn from the working directory (see Procfile).
+
+
+def post_worker_init(worker):
+    """Open DynamoDB connections, start the user filter load and email outbox, compile templates."""
+    from apps import precompile_templates
+    from apps.database import warm_up_dynamodb
+    from apps.extensions import email_outbox
+    from apps.store import start_user_filter_rebuild, user_filter
+
+    # Raising before the worker has booted makes gunicorn halt instead of respawning.
+    user_filter.check_workers(worker.cfg.workers)
+    warm_up_dynamodb()
+    start_user_filter_rebuild()
+    # Retry mail spooled by workers that died without waiting for a request to send one.
+    email_outbox.start()
+    app = worker.wsgi
+    if app.config.get("JINJA_PRECOMPILE", False):
+        loaded = precompile_templates(app)
+        app.logger.info(f"Precompiled {loaded} templates")
+
+
+def worker_exit(server, worker):
+    """Give queued email a moment to go out; the spool keeps whatever is left."""
+    from apps.email_service import resend_transport
+    from apps.extensions import email_outbox
+
+    email_outbox.flush(timeout=5)
+    email_outbox.close()
+    resend_transport.close()
@@ -6,7 +6,11 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 
 import pytest
 
+import apps.store as store
 from apps import create_app
+from apps.database import FakeDynamoDB, MockTable
+from apps.mock_storage import InMemoryStorage
+from apps.user_filter import UserExistenceFilter
 
 
 class TestConfig:
@@ -18,6 +22,25 @@ class TestConfig:
     RATELIMIT_ENABLED = False
 
 
+@pytest.fixture(autouse=True)
+def fresh_user_filter(monkeypatch):
+    # Negative lookups recorded by one test must not leak into the next.
+    monkeypatch.setattr(store, "user_filter", UserExistenceFilter())
+
+
+@pytest.fixture
+def fake_db(monkeypatch, tmp_path):
+    """Point ``apps.store`` at an in-memory users table."""
+    db = FakeDynamoDB()
+    table = MockTable(
+        "users", storage=InMemoryStorage(str(tmp_path / "users.json"), flush_interval=0)
+    )
+    db._tables["users"] = table
+    monkeypatch.setattr(store, "db", db)
+    monkeypatch.setattr(store, "users_table", table)
+    return db
+
+
 @pytest.fixture
 def app():
     app = create_app(config_class=TestConfig)
@@ -0,0 +1,233 @@
+import gzip
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from flask import url_for
+
+from apps.assets import (
+    StaticAssets,
+    accepted_encodings,
+    build_assets,
+    collect_used_classes,
+    purge_css,
+)
+
+CSS = """@charset "UTF-8";
+/*! Keep this license */
+/* a regular comment */
+:root { --brand: #123; }
+body { margin: 0; font-family: system-ui, "Segoe UI"; }
+.btn, .unused-a { color: red !important; }
+.card .unused-b { color: blue; }
+.input-group:not(.has-validation) > .btn { border-radius: 0; }
+.alert-success { color: green; }
+a[href$=".pdf"] { content: "a, b"; }
+@media (min-width: 768px) {
+  .btn { padding: 1rem; }
+  .unused-c { padding: 2rem; }
+}
+@media print { .unused-d { display: none; } }
+@keyframes spin { from { transform: rotate(0deg); } to { transform: rotate(360deg); } }
+"""
+
+
+def test_collect_used_classes_reads_templates_jinja_and_scripts(tmp_path):
+    template = tmp_path / "page.html"
+    template.write_text(
+        '<div class="card   btn">'
+        "<p class=\"alert-{{ category }} {{ 'is-open' if open else '' }}\">x</p></div>"
+    )
+    script = tmp_path / "app.js"
+    script.write_text("el.classList.add('js-toggled');")
+
+    classes, prefixes = collect_used_classes([str(template), str(script)])
+
+    assert {"card", "btn", "is-open", "js-toggled", "show"} <= classes
+    assert prefixes == {"alert-"}
+
+
+def test_purge_css_keeps_used_rules_and_minifies():
+    out = purge_css(CSS, {"btn", "card", "input-group"}, {"alert-"})
+
+    assert out.startswith('@charset "UTF-8";\n/*! Keep this license */\n')
+    assert "regular comment" not in out
+    assert ":root{--brand:#123}" in out
+    # Values with strings keep their spacing so quoted text is never altered.
+    assert 'body{margin:0;font-family:system-ui, "Segoe UI"}' in out
+    assert ".btn{color:red!important}" in out
+    assert ".input-group:not(.has-validation)>.btn{border-radius:0}" in out
+    assert ".alert-success{color:green}" in out
+    assert 'content:"a, b"' in out
+    assert "@media (min-width: 768px){.btn{padding:1rem}}" in out
+    assert "@keyframes spin{from{transform:rotate(0deg)}to{transform:rotate(360deg)}}" in out
+    for unused in ("unused-a", "unused-b", "unused-c", "unused-d", "@media print"):
+        assert unused not in out
+
+
+def test_build_assets_writes_purged_and_precompressed_mirror(tmp_path):
+    static = tmp_path / "static"
+    (static / "css").mkdir(parents=True)
+    (static / "images").mkdir()
+    (static / "css" / "site.css").write_text(CSS * 20)
+    (static / "images" / "logo.png").write_bytes(b"\x89PNG")
+    templates = tmp_path / "templates"
+    templates.mkdir()
+    (templates / "base.html").write_text('<a class="btn">x</a>')
+
+    report = build_assets(str(static), str(templates))
+
+    dist = static / "dist"
+    built = (dist / "css" / "site.css").read_text()
+    assert "unused-a" not in built and ".btn{" in built
+    assert gzip.decompress((dist / "css" / "site.css.gz").read_bytes()).decode() == built
+    assert (dist / "images" / "logo.png").read_bytes() == b"\x89PNG"
+    assert not (dist / "images" / "logo.png.gz").exists()
+    [(relative, original, size, gz, _)] = report
+    assert relative == "css/site.css"
+    assert size < original and gz < size
+
+    # Rebuilding replaces the previous output instead of nesting inside it.
+    build_assets(str(static), str(templates))
+    assert not (dist / "dist").exists()
+
+
+def test_deploy_build_does_not_create_the_app(tmp_path):
+    static = tmp_path / "static"
+    (static / "css").mkdir(parents=True)
+    (static / "css" / "site.css").write_text(CSS)
+    templates = tmp_path / "templates"
+    templates.mkdir()
+    (templates / "base.html").write_text('<a class="btn">x</a>')
+    shm = tmp_path / "ratelimit"
+    env = dict(os.environ, FLASK_ENV="production", RATELIMIT_SHM_PATH=str(shm))
+
+    result = subprocess.run(
+        [sys.executable, "-m", "apps", "build-assets"]
+        + ["--static", str(static), "--templates", str(templates)],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert "css/site.css" in result.stdout
+    assert (static / "dist" / "manifest.json").exists()
+    # create_app() would have opened the shared-memory rate-limit table as this user.
+    assert not list(tmp_path.glob("ratelimit*"))
+
+
+def test_accepted_encodings_honours_quality_values():
+    assert accepted_encodings("gzip, deflate, br;q=0") == {"gzip", "deflate"}
+    assert accepted_encodings("br;q=0.5, *") == {"br", "*"}
+    assert accepted_encodings(None) == set()
+
+
+@pytest.fixture
+def built_static(app, tmp_path):
+    static = tmp_path / "static"
+    (static / "css").mkdir(parents=True)
+    (static / "css" / "site.css").write_text(CSS * 20)
+    (static / "css" / "raw.css").write_text("body{margin:0}")
+    templates = tmp_path / "templates"
+    templates.mkdir()
+    (templates / "base.html").write_text('<a class="btn">x</a>')
+    build_assets(str(static), str(templates))
+    (static / "dist" / "css" / "site.css.br").write_bytes(b"brotli-bytes")
+    (static / "dist" / "css" / "raw.css").unlink()
+
+    assets = StaticAssets()
+    assets.static_folder = str(static)
+    app.view_functions["static"] = assets.send_static_file
+    return static / "dist"
+
+
+def test_static_handler_serves_matching_precompressed_variant(client, built_static):
+    response = client.get("/static/css/site.css", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["Content-Encoding"] == "br"
+    assert response.data == b"brotli-bytes"
+    assert response.mimetype == "text/css"
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+    response = client.get("/static/css/site.css", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.data == (built_static / "css" / "site.css.gz").read_bytes()
+
+    response = client.get("/static/css/site.css")
+    assert "Content-Encoding" not in response.headers
+    assert response.data == (built_static / "css" / "site.css").read_bytes()
+
+
+def test_static_handler_falls_back_to_source_files(client, built_static):
+    response = client.get("/static/css/raw.css", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.data == b"body{margin:0}"
+    assert client.get("/static/css/missing.css").status_code == 404
+    assert client.get("/static/../apps/config.py").status_code == 404
+
+
+def test_build_assets_writes_hashed_copies_and_manifest(tmp_path):
+    static = tmp_path / "static"
+    (static / "css").mkdir(parents=True)
+    (static / "css" / "site.css").write_text(CSS * 20)
+    (static / "LICENSE").write_text("MIT")
+    templates = tmp_path / "templates"
+    templates.mkdir()
+    (templates / "base.html").write_text('<a class="btn">x</a>')
+
+    build_assets(str(static), str(templates))
+
+    dist = static / "dist"
+    manifest = json.loads((dist / "manifest.json").read_text())
+    hashed = manifest["css/site.css"]
+    assert hashed.startswith("css/site.") and hashed.endswith(".css")
+    assert (dist / hashed).read_bytes() == (dist / "css" / "site.css").read_bytes()
+    assert (dist / f"{hashed}.gz").exists()
+    assert (dist / manifest["LICENSE"]).read_text() == "MIT"
+
+    # Same content, same name; changed content, new name.
+    build_assets(str(static), str(templates))
+    assert json.loads((dist / "manifest.json").read_text())["css/site.css"] == hashed
+    (templates / "base.html").write_text('<a class="btn unused-a">x</a>')
+    build_assets(str(static), str(templates))
+    assert json.loads((dist / "manifest.json").read_text())["css/site.css"] != hashed
+
+
+def test_url_for_emits_hashed_names_served_as_immutable(app, client, built_static):
+    assets = StaticAssets()
+    assets.static_folder = str(built_static.parent)
+    assets.load_manifest()
+    app.view_functions["static"] = assets.send_static_file
+    app.url_default_functions[None].append(assets._hashed_url_defaults)
+
+    with app.test_request_context():
+        url = url_for("static", filename="css/site.css")
+        assert url_for("static", filename="css/new.css") == "/static/css/new.css"
+    assert url != "/static/css/site.css"
+
+    response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.cache_control.public and response.cache_control.immutable
+    assert response.cache_control.max_age == 31536000
+    etag, weak = response.get_etag()
+    assert not weak and etag.endswith("-gzip")
+
+    response = client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": f'"{etag}"'})
+    assert response.status_code == 304
+
+    response = client.get("/static/css/site.css")
+    assert not response.cache_control.immutable
+
+
+def test_static_responses_are_not_marked_no_store_for_logged_in_users(client):
+    with client.session_transaction() as session:
+        session["_user_id"] = "user@example.com"
+
+    response = client.get("/static/js/password-toggle.js")
+
+    assert response.status_code == 200
+    assert "no-store" not in response.headers.get("Cache-Control", "")
@@ -0,0 +1,239 @@
+import gzip
+import zlib
+
+import pytest
+from flask import Flask, Response, jsonify, request, stream_with_context, url_for
+
+import apps.compression as compression
+from apps.assets import StaticAssets, build_assets
+from apps.compression import CompressionMiddleware
+from apps.extensions import page_cache
+from tests.conftest import TestConfig
+
+PAGE = "<p>" + "miminions " * 200 + "</p>"
+
+
+@pytest.fixture
+def compressed_app():
+    app = Flask(__name__)
+
+    @app.route("/page")
+    def page():
+        response = Response(PAGE, mimetype="text/html")
+        response.set_etag("abc")
+        return response.make_conditional(request)
+
+    @app.route("/small")
+    def small():
+        return "tiny"
+
+    @app.route("/json")
+    def json_view():
+        return jsonify(items=["x" * 40] * 40)
+
+    @app.route("/stream")
+    def stream():
+        def generate():
+            for n in range(50):
+                yield f"<li>row {n} " + "-" * 20 + "</li>"
+
+        return Response(stream_with_context(generate()), mimetype="text/html")
+
+    @app.route("/encoded")
+    def encoded():
+        response = Response(gzip.compress(PAGE.encode()), mimetype="text/css")
+        response.headers["Content-Encoding"] = "gzip"
+        return response
+
+    @app.route("/precompressed")
+    def precompressed():
+        # Like StaticAssets: the app's own ETag for its gzip file ends in -gzip.
+        response = Response(gzip.compress(PAGE.encode()), mimetype="text/css")
+        response.headers["Content-Encoding"] = "gzip"
+        response.set_etag("digest-gzip")
+        return response.make_conditional(request)
+
+    @app.route("/image")
+    def image():
+        return Response(b"\x89PNG" * 500, mimetype="image/png")
+
+    app.wsgi_app = CompressionMiddleware(app.wsgi_app, min_size=500, level=6)
+    return app
+
+
+def test_gzip_compresses_html_and_suffixes_strong_etag(compressed_app):
+    response = compressed_app.test_client().get("/page", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.headers["ETag"] == '"abc-gzip"'
+    assert int(response.headers["Content-Length"]) == len(response.data)
+    assert gzip.decompress(response.data).decode() == PAGE
+    assert len(response.data) < len(PAGE) / 5
+
+
+def test_if_none_match_round_trips_through_the_suffix(compressed_app):
+    client = compressed_app.test_client()
+
+    response = client.get(
+        "/page", headers={"Accept-Encoding": "gzip", "If-None-Match": '"abc-gzip"'}
+    )
+    assert response.status_code == 304
+    assert response.headers["ETag"] == '"abc-gzip"'
+
+    # The identity representation keeps the app's ETag and its own 304.
+    response = client.get("/page", headers={"If-None-Match": '"abc"'})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == '"abc"'
+
+
+def test_app_etags_that_already_end_in_the_suffix_still_revalidate(compressed_app):
+    response = compressed_app.test_client().get(
+        "/precompressed", headers={"Accept-Encoding": "gzip", "If-None-Match": '"digest-gzip"'}
+    )
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == '"digest-gzip"'
+
+
+def test_hashed_static_files_revalidate_through_the_middleware(tmp_path):
+    class Config(TestConfig):
+        COMPRESSION_ENABLED = True
+
+    from apps import create_app
+
+    static = tmp_path / "static"
+    (static / "css").mkdir(parents=True)
+    (static / "css" / "site.css").write_text(".btn { color: red; }\n" * 100)
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "base.html").write_text('<a class="btn">x</a>')
+    build_assets(str(static), str(tmp_path / "templates"))
+
+    app = create_app(config_class=Config)
+    assets = StaticAssets()
+    assets.static_folder = str(static)
+    assets.load_manifest()
+    app.view_functions["static"] = assets.send_static_file
+    app.url_default_functions[None].append(assets._hashed_url_defaults)
+    with app.test_request_context():
+        url = url_for("static", filename="css/site.css")
+
+    client = app.test_client()
+    first = client.get(url, headers={"Accept-Encoding": "gzip"})
+    etag = first.headers["ETag"]
+    again = client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+
+    assert first.status_code == 200 and etag.endswith('-gzip"')
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
+    assert again.data == b""
+
+
+def test_head_negotiates_like_get_without_a_body(compressed_app):
+    client = compressed_app.test_client()
+    headers = {"Accept-Encoding": "gzip"}
+
+    head = client.head("/page", headers=headers)
+    assert head.status_code == 200 and head.data == b""
+    assert head.headers["Content-Encoding"] == "gzip"
+    assert head.headers["ETag"] == client.get("/page", headers=headers).headers["ETag"]
+    assert head.headers["Vary"] == "Accept-Encoding"
+    assert "Content-Length" not in head.headers
+
+    small = client.head("/small", headers=headers)
+    assert "Content-Encoding" not in small.headers
+    assert small.headers["Content-Length"] == "4"
+
+
+def test_small_encoded_and_binary_responses_pass_through(compressed_app):
+    client = compressed_app.test_client()
+    headers = {"Accept-Encoding": "gzip"}
+
+    small = client.get("/small", headers=headers)
+    assert "Content-Encoding" not in small.headers and small.data == b"tiny"
+    assert small.headers["Vary"] == "Accept-Encoding"
+
+    encoded = client.get("/encoded", headers=headers)
+    assert gzip.decompress(encoded.data).decode() == PAGE
+
+    image = client.get("/image", headers=headers)
+    assert "Content-Encoding" not in image.headers
+    assert "Vary" not in image.headers
+
+    plain = client.get("/page")
+    assert "Content-Encoding" not in plain.headers
+    assert plain.data.decode() == PAGE
+
+
+def test_json_is_compressed(compressed_app):
+    response = compressed_app.test_client().get("/json", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.data).startswith(b'{"items"')
+
+
+def test_streamed_response_is_compressed_incrementally(compressed_app):
+    response = compressed_app.test_client().get(
+        "/stream", headers={"Accept-Encoding": "gzip"}, buffered=False
+    )
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    pieces = [decompressor.decompress(chunk) for chunk in response.response]
+    response.close()
+
+    # Every chunk after the min_size buffer decodes on arrival (sync flush).
+    assert sum(1 for piece in pieces if piece) > 10
+    assert b"".join(pieces).decode().count("<li>") == 50
+
+
+class _FakeBrotli:
+    class Compressor:
+        def __init__(self, quality):
+            self.parts = []
+
+        def process(self, data):
+            self.parts.append(data)
+            return b""
+
+        def flush(self):
+            return b""
+
+        def finish(self):
+            return b"BR:" + b"".join(self.parts)
+
+
+def test_brotli_is_preferred_when_available(compressed_app, monkeypatch):
+    monkeypatch.setattr(compression, "brotli", _FakeBrotli)
+
+    response = compressed_app.test_client().get("/page", headers={"Accept-Encoding": "gzip, br"})
+
+    assert response.headers["Content-Encoding"] == "br"
+    assert response.headers["ETag"] == '"abc-br"'
+    assert response.data == b"BR:" + PAGE.encode()
+
+
+def test_cached_marketing_pages_are_compressed_and_revalidate():
+    class Config(TestConfig):
+        COMPRESSION_ENABLED = True
+        PAGE_CACHE_MAX_ENTRIES = 8
+
+    from apps import create_app
+
+    app = create_app(config_class=Config)
+    try:
+        client = app.test_client()
+        first = client.get("/use-cases", headers={"Accept-Encoding": "gzip"})
+        assert first.headers["Content-Encoding"] == "gzip"
+        assert b"<html" in gzip.decompress(first.data).lower()
+        etag = first.headers["ETag"]
+        assert etag.endswith('-gzip"')
+
+        again = client.get("/use-cases", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+        assert again.status_code == 304
+        assert again.headers["ETag"] == etag
+    finally:
+        page_cache.max_entries = 0
+        page_cache.clear()
+        page_cache._stats = dict.fromkeys(page_cache._stats, 0)
@@ -0,0 +1,207 @@
+import json
+import multiprocessing
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from botocore.exceptions import ClientError
+
+import apps.database as database
+from apps.database import MockTable
+from apps.mock_storage import (
+    CorruptStorageError,
+    InMemoryStorage,
+    JsonFileStorage,
+    LogStructuredStorage,
+    ShardedJsonFileStorage,
+)
+
+
+def _user(email, **extra):
+    return {"email": email, "first_name": "Test", "email_verified": False, **extra}
+
+
+def _signup_worker(file_path, shards, worker, count):
+    if shards:
+        storage = ShardedJsonFileStorage(file_path, shards=shards)
+    else:
+        storage = JsonFileStorage(file_path)
+    table = MockTable("users", storage=storage)
+    for n in range(count):
+        table.put_item(
+            Item=_user(f"w{worker}-{n}@example.com"),
+            ConditionExpression="attribute_not_exists(email)",
+        )
+
+
+@pytest.fixture(params=["file", "memory", "log", "sharded"])
+def table(request, tmp_path):
+    file_path = str(tmp_path / "users_local_db.json")
+    if request.param == "memory":
+        storage = InMemoryStorage(file_path, flush_interval=0)
+    elif request.param == "log":
+        storage = LogStructuredStorage(file_path)
+    elif request.param == "sharded":
+        storage = ShardedJsonFileStorage(file_path, shards=4)
+    else:
+        storage = JsonFileStorage(file_path)
+    yield MockTable("users", storage=storage)
+    storage.close()
+
+
+def test_mock_table_put_get_update_round_trip(table):
+    table.put_item(Item=_user("a@example.com"), ConditionExpression="attribute_not_exists(email)")
+
+    with pytest.raises(ClientError) as exc:
+        table.put_item(
+            Item=_user("a@example.com"), ConditionExpression="attribute_not_exists(email)"
+        )
+    assert exc.value.response["Error"]["Code"] == "ConditionalCheckFailedException"
+
+    response = table.update_item(
+        Key={"email": "a@example.com"},
+        UpdateExpression="SET #first_name = :first_name",
+        ExpressionAttributeNames={"#first_name": "first_name"},
+        ExpressionAttributeValues={":first_name": "Updated"},
+        ConditionExpression="attribute_exists(email)",
+        ReturnValues="ALL_NEW",
+    )
+
+    assert response["Attributes"]["first_name"] == "Updated"
+    assert table.get_item(Key={"email": "a@example.com"})["Item"]["first_name"] == "Updated"
+    assert table.get_item(Key={"email": "missing@example.com"}) == {}
+
+
+def test_in_memory_storage_loads_legacy_json_and_flushes_in_batches(tmp_path):
+    file_path = tmp_path / "users_local_db.json"
+    file_path.write_text(json.dumps({"old@example.com": _user("old@example.com")}, indent=2))
+
+    storage = InMemoryStorage(str(file_path), flush_interval=60, flush_batch=1000)
+    table = MockTable("users", storage=storage)
+    table.put_item(Item=_user("new@example.com"))
+
+    assert table.get_item(Key={"email": "old@example.com"})["Item"]["first_name"] == "Test"
+    assert "new@example.com" not in json.loads(file_path.read_text())
+
+    storage.close()
+
+    assert set(json.loads(file_path.read_text())) == {"old@example.com", "new@example.com"}
+
+
+def test_in_memory_storage_returns_private_copies(tmp_path):
+    storage = InMemoryStorage(str(tmp_path / "users_local_db.json"), flush_interval=0)
+    table = MockTable("users", storage=storage)
+    table.put_item(Item=_user("a@example.com"))
+
+    table.get_item(Key={"email": "a@example.com"})["Item"]["first_name"] = "Mutated"
+
+    assert table.get_item(Key={"email": "a@example.com"})["Item"]["first_name"] == "Test"
+    storage.close()
+
+
+def test_in_memory_storage_write_through_does_not_hold_lock_while_flushing(tmp_path):
+    storage = InMemoryStorage(str(tmp_path / "users_local_db.json"), flush_interval=0)
+    table = MockTable("users", storage=storage)
+
+    # Another thread is mid-flush (holds _flush_lock) while a commit writes through.
+    with storage._flush_lock:
+        writer = threading.Thread(target=table.put_item, kwargs={"Item": _user("a@example.com")})
+        writer.start()
+        time.sleep(0.1)
+        # flush() takes _lock next; the committing thread must not be holding it.
+        acquired = storage._lock.acquire(timeout=2)
+        assert acquired
+        storage._lock.release()
+    writer.join(timeout=5)
+
+    assert not writer.is_alive()
+    assert "a@example.com" in json.loads((tmp_path / "users_local_db.json").read_text())
+    storage.close()
+
+
+def test_log_structured_storage_recovers_from_log_and_torn_tail(tmp_path):
+    file_path = str(tmp_path / "users_local_db.json")
+    storage = LogStructuredStorage(file_path, compact_every=3)
+    table = MockTable("users", storage=storage)
+    for n in range(4):
+        table.put_item(Item=_user(f"u{n}@example.com"))
+    storage.close()
+
+    # Three writes were compacted into the snapshot, the fourth is still logged.
+    with open(storage.log_path, "ab") as f:
+        f.write(b'{"op": "put", "k": "torn@exa')
+
+    recovered = LogStructuredStorage(file_path, compact_every=3)
+
+    assert recovered.get("u3@example.com")["email"] == "u3@example.com"
+    assert recovered.get("u0@example.com") is not None
+    assert recovered.get("torn@example.com") is None
+    assert open(recovered.log_path, "rb").read().endswith(b"}\n")
+    recovered.close()
+
+
+@pytest.mark.parametrize("shards", [0, 4])
+def test_file_storage_does_not_lose_concurrent_writes(tmp_path, shards):
+    file_path = str(tmp_path / "users_local_db.json")
+    ctx = multiprocessing.get_context("fork")
+    workers = [
+        ctx.Process(target=_signup_worker, args=(file_path, shards, worker, 25))
+        for worker in range(4)
+    ]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    if shards:
+        storage = ShardedJsonFileStorage(file_path, shards=shards)
+    else:
+        storage = JsonFileStorage(file_path)
+    for worker in range(4):
+        for n in range(25):
+            assert storage.get(f"w{worker}-{n}@example.com") is not None
+
+
+def test_sharded_storage_splits_legacy_file(tmp_path):
+    file_path = tmp_path / "users_local_db.json"
+    legacy = {f"u{n}@example.com": _user(f"u{n}@example.com") for n in range(10)}
+    file_path.write_text(json.dumps(legacy))
+
+    storage = ShardedJsonFileStorage(str(file_path), shards=4)
+
+    assert all(storage.get(key) == item for key, item in legacy.items())
+    assert sum(len(shard._read_db()) for shard in storage.shards) == 10
+
+
+def test_file_storage_refuses_corrupt_document(tmp_path):
+    file_path = tmp_path / "users_local_db.json"
+    file_path.write_text('{"a@example.com": {"email": "a@exa')
+    table = MockTable("users", storage=JsonFileStorage(str(file_path)))
+
+    with pytest.raises(CorruptStorageError):
+        table.put_item(Item=_user("b@example.com"))
+
+    assert file_path.read_text() == '{"a@example.com": {"email": "a@exa'
+
+
+def test_warm_up_dynamodb_opens_concurrent_connections(monkeypatch):
+    described = []
+
+    class _Client:
+        def describe_table(self, TableName):
+            described.append(TableName)
+            return {"Table": {"TableName": TableName}}
+
+    fake_resource = SimpleNamespace(meta=SimpleNamespace(client=_Client()))
+    monkeypatch.setattr(database, "db", fake_resource)
+
+    assert database.warm_up_dynamodb(connections=3) == 3
+    assert described == ["users", "users", "users"]
+
+
+def test_warm_up_dynamodb_skips_fake_backend(monkeypatch):
+    monkeypatch.setattr(database, "db", database.FakeDynamoDB())
+
+    assert database.warm_up_dynamodb(connections=3) == 0
@@ -0,0 +1,125 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from apps.email_service import EmailDeliveryError, ResendTransport
+from apps.outbox import EmailOutbox, PermanentDeliveryError
+
+
+class FakeResend:
+    """Local stand-in for the Resend API that records every request."""
+
+    def __init__(self):
+        self.requests = []
+        self.client_ports = set()
+        self.latency = 0.0
+        self.statuses = []
+        self.lock = threading.Lock()
+
+
+def _handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            with fake.lock:
+                fake.requests.append((self.path, dict(self.headers), body))
+                fake.client_ports.add(self.client_address[1])
+                status = fake.statuses.pop(0) if fake.statuses else 200
+            time.sleep(fake.latency)
+            if status != 200:
+                reply = {"statusCode": status, "message": "simulated failure"}
+            elif self.path == "/emails/batch":
+                reply = {"data": [{"id": f"email-{n}"} for n in range(len(body))]}
+            else:
+                reply = {"id": "email-0"}
+            data = json.dumps(reply).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+@pytest.fixture
+def fake_resend():
+    fake = FakeResend()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _handler(fake))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    fake.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield fake
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def transport(app, fake_resend):
+    app.config.update(RESEND_API_KEY="re_test", RESEND_API_URL=fake_resend.url)
+    transport = ResendTransport()
+    transport.init_app(app)
+    yield transport
+    transport.close()
+
+
+def test_sends_reuse_one_keep_alive_connection(transport, fake_resend):
+    for n in range(5):
+        transport.send({"to": [f"user{n}@example.com"]}, idempotency_key=f"key-{n}")
+
+    assert len(fake_resend.requests) == 5
+    assert len(fake_resend.client_ports) == 1
+    path, headers, body = fake_resend.requests[0]
+    assert path == "/emails"
+    assert headers["Authorization"] == "Bearer re_test"
+    assert headers["Idempotency-Key"] == "key-0"
+    assert body == {"to": ["user0@example.com"]}
+
+
+def test_batch_posts_all_payloads_in_one_request(transport, fake_resend):
+    payloads = [{"to": [f"user{n}@example.com"]} for n in range(3)]
+
+    reply = transport.send_batch(payloads, idempotency_key="batch-1")
+
+    assert len(reply["data"]) == 3
+    assert [(path, body) for path, _, body in fake_resend.requests] == [("/emails/batch", payloads)]
+    with pytest.raises(ValueError):
+        transport.send_batch([{}] * 101)
+
+
+def test_errors_are_split_into_permanent_and_retryable(transport, fake_resend):
+    fake_resend.statuses = [422, 429, 503]
+
+    with pytest.raises(PermanentDeliveryError):
+        transport.send({})
+    with pytest.raises(EmailDeliveryError):
+        transport.send({})
+    with pytest.raises(EmailDeliveryError):
+        transport.send({})
+
+
+def test_outbox_batches_a_signup_burst_over_the_pooled_transport(app, transport, fake_resend):
+    fake_resend.latency = 0.05
+    outbox = EmailOutbox(sender=transport.send, batch_sender=transport.send_batch)
+    app.config.update(EMAIL_OUTBOX_WORKERS=2, EMAIL_OUTBOX_BATCH_SIZE=50)
+    outbox.init_app(app)
+
+    for n in range(40):
+        outbox.enqueue({"to": [f"user{n}@example.com"]})
+
+    assert outbox.flush(timeout=10)
+    delivered = sum(
+        len(body) if path == "/emails/batch" else 1 for path, _, body in fake_resend.requests
+    )
+    assert delivered == 40
+    assert len(fake_resend.requests) < 40
+    assert len(fake_resend.client_ports) <= 2
+    outbox.close()
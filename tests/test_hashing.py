@@ -0,0 +1,98 @@
+import threading
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+import apps.auth.routes as auth_routes
+import apps.hashing as hashing
+from apps.extensions import password_hasher
+from apps.hashing import PasswordHasher, calibrate
+
+
+def test_login_returns_503_with_retry_after_when_pool_is_saturated(client, monkeypatch):
+    user = {"email": "user@example.com", "password": generate_password_hash("StrongPass123!")}
+    monkeypatch.setattr(auth_routes.store, "get_user", lambda email: user)
+    monkeypatch.setattr(password_hasher, "_slots", threading.BoundedSemaphore(1))
+    password_hasher._slots.acquire()
+
+    response = client.post(
+        "/login",
+        data={"email": "user@example.com", "password": "StrongPass123!"},
+    )
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(password_hasher.retry_after)
+    assert password_hasher.stats()["rejected"] >= 1
+
+
+def test_process_pool_hashes_and_records_timings(app):
+    hasher = PasswordHasher()
+    app.config["PASSWORD_HASH_WORKERS"] = 1
+    hasher.init_app(app)
+
+    pwhash = hasher.hash("StrongPass123!", method="pbkdf2:sha256:1000")
+
+    assert hasher.verify(pwhash, "StrongPass123!")
+    assert not hasher.verify(pwhash, "wrong")
+    stats = hasher.stats()
+    assert stats["jobs"] == 3
+    assert stats["hash_max"] > 0
+    hasher._executor.shutdown()
+
+
+def test_calibrate_picks_strongest_candidate_within_target():
+    candidates = ["pbkdf2:sha256:1000", "pbkdf2:sha256:2000", "pbkdf2:sha256:5000000"]
+
+    method, results = calibrate(200, samples=3, candidates=candidates)
+
+    assert method == "pbkdf2:sha256:2000"
+    assert [candidate for candidate, _ in results] == candidates
+
+
+def test_needs_rehash_compares_against_configured_method(app):
+    hasher = PasswordHasher()
+    app.config["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256:2000"
+    hasher.init_app(app)
+
+    assert hasher.needs_rehash(generate_password_hash("x", method="pbkdf2:sha256:1000"))
+    assert not hasher.needs_rehash(hasher.hash("x"))
+
+
+@pytest.mark.parametrize(
+    "method", [None, "scrypt", "scrypt:16384:8:1", "pbkdf2", "pbkdf2:sha512", "pbkdf2:sha256:2000"]
+)
+def test_needs_rehash_matches_werkzeug_without_hashing(app, monkeypatch, method):
+    stored = generate_password_hash("x", method=method) if method else generate_password_hash("x")
+    hasher = PasswordHasher()
+    app.config["PASSWORD_HASH_METHOD"] = method
+    hasher.init_app(app)
+
+    def no_hashing(*args):
+        raise AssertionError("needs_rehash must not hash on the request thread")
+
+    monkeypatch.setattr(hashing, "_timed_generate", no_hashing)
+
+    assert not hasher.needs_rehash(stored)
+    assert hasher.needs_rehash(generate_password_hash("x", method="pbkdf2:sha256:1000"))
+
+
+def test_login_upgrades_outdated_hash(client, monkeypatch):
+    user = {
+        "email": "user@example.com",
+        "password": generate_password_hash("StrongPass123!", method="pbkdf2:sha256:1000"),
+        "is_active": True,
+        "email_verified": True,
+    }
+    updates = {}
+    monkeypatch.setattr(auth_routes.store, "get_user", lambda email: user)
+    monkeypatch.setattr(
+        auth_routes.store, "update_user", lambda email, changes: updates.update(changes) or user
+    )
+
+    response = client.post(
+        "/login", data={"email": "user@example.com", "password": "StrongPass123!"}
+    )
+
+    assert response.status_code == 302
+    assert updates["password"].startswith("scrypt:")
+    assert password_hasher.verify(updates["password"], "StrongPass123!")
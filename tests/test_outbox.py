@@ -0,0 +1,345 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import apps.email_service as email_service
+from apps.outbox import EmailOutbox, PermanentDeliveryError
+
+
+def _outbox(app, sender, **config):
+    app.config.update(
+        {
+            "EMAIL_OUTBOX_WORKERS": 1,
+            "EMAIL_OUTBOX_RETRY_BASE_DELAY": 0.01,
+            **config,
+        }
+    )
+    outbox = EmailOutbox(sender=sender)
+    outbox.init_app(app)
+    return outbox
+
+
+def test_enqueue_returns_before_delivery(app):
+    release = threading.Event()
+    sent = []
+
+    def sender(payload, key):
+        release.wait(5)
+        sent.append((payload, key))
+
+    outbox = _outbox(app, sender)
+    assert outbox.enqueue({"to": ["a@example.com"]}, idempotency_key="k1")
+    assert sent == []
+
+    release.set()
+    assert outbox.flush(timeout=5)
+    assert sent == [({"to": ["a@example.com"]}, "k1")]
+    stats = outbox.stats()
+    assert stats["sent"] == 1
+    assert stats["queue_depth"] == 0
+    assert stats["latency_max"] > 0
+    outbox.close()
+
+
+def test_transient_failures_are_retried_until_delivered(app):
+    calls = []
+
+    def sender(payload, key):
+        calls.append(key)
+        if len(calls) < 3:
+            raise ConnectionError("reset by peer")
+
+    outbox = _outbox(app, sender)
+    outbox.enqueue({"to": ["a@example.com"]}, idempotency_key="k1")
+
+    assert outbox.flush(timeout=5)
+    assert calls == ["k1", "k1", "k1"]
+    assert outbox.stats()["retries"] == 2
+    assert outbox.stats()["sent"] == 1
+    outbox.close()
+
+
+def test_permanent_failure_and_attempt_limit_stop_retries(app, tmp_path):
+    calls = []
+
+    def sender(payload, key):
+        calls.append(key)
+        if key == "bad":
+            raise PermanentDeliveryError("422 invalid recipient")
+        raise TimeoutError("provider timeout")
+
+    outbox = _outbox(app, sender, EMAIL_OUTBOX_MAX_ATTEMPTS=3, EMAIL_OUTBOX_SPOOL_DIR=tmp_path)
+    outbox.enqueue({}, idempotency_key="bad")
+    outbox.enqueue({}, idempotency_key="flaky")
+
+    assert outbox.flush(timeout=5)
+    assert calls.count("bad") == 1
+    assert calls.count("flaky") == 3
+    assert outbox.stats()["failed"] == 2
+    assert len(os.listdir(tmp_path / "dead")) == 2
+    assert os.listdir(tmp_path / str(os.getpid())) == []
+    outbox.close()
+
+
+def test_delivered_idempotency_key_is_not_sent_again(app):
+    sent = []
+    outbox = _outbox(app, lambda payload, key: sent.append(key))
+
+    outbox.enqueue({}, idempotency_key="same")
+    outbox.flush(timeout=5)
+    outbox.enqueue({}, idempotency_key="same")
+    outbox.flush(timeout=5)
+
+    assert sent == ["same"]
+    assert outbox.stats()["duplicates"] == 1
+    outbox.close()
+
+
+def test_full_queue_rejects_new_messages(app):
+    release = threading.Event()
+    outbox = _outbox(app, lambda payload, key: release.wait(5), EMAIL_OUTBOX_MAX_QUEUE=1)
+
+    outbox.enqueue({}, idempotency_key="first")
+    outbox.flush(timeout=0.2)  # the first message is now in flight, blocking the sender
+    assert outbox.enqueue({}, idempotency_key="second")
+    assert not outbox.enqueue({}, idempotency_key="third")
+    assert outbox.stats()["rejected"] == 1
+
+    release.set()
+    outbox.flush(timeout=5)
+    outbox.close()
+
+
+def test_spooled_messages_of_a_stopped_process_are_adopted(app, tmp_path):
+    # A process that exited has left one undelivered message behind.
+    dead = subprocess.run(
+        [sys.executable, "-c", "import os; print(os.getpid())"],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    orphan_dir = tmp_path / dead.stdout.strip()
+    orphan_dir.mkdir()
+    message = {
+        "id": "abc",
+        "idempotency_key": "left-behind",
+        "payload": {"to": ["a@example.com"]},
+        "attempts": 1,
+        "enqueued_at": 0,
+    }
+    (orphan_dir / "abc.json").write_text(json.dumps(message))
+
+    sent = []
+    outbox = _outbox(app, lambda payload, key: sent.append(key), EMAIL_OUTBOX_SPOOL_DIR=tmp_path)
+    outbox.start()  # worker boot, before any request sends mail
+
+    assert outbox.flush(timeout=5)
+    assert sent == ["left-behind"]
+
+    outbox.enqueue({}, idempotency_key="new")
+    assert outbox.flush(timeout=5)
+    assert sent == ["left-behind", "new"]
+    assert not orphan_dir.exists()
+    assert os.listdir(tmp_path / str(os.getpid())) == []
+    outbox.close()
+
+
+def test_due_messages_are_grouped_into_batches(app):
+    release = threading.Event()
+    singles, batches = [], []
+
+    def sender(payload, key):
+        release.wait(5)
+        singles.append(key)
+
+    outbox = EmailOutbox(sender=sender, batch_sender=lambda payloads, key: batches.append(payloads))
+    app.config.update(EMAIL_OUTBOX_WORKERS=1, EMAIL_OUTBOX_BATCH_SIZE=10)
+    outbox.init_app(app)
+
+    outbox.enqueue({"n": 0}, idempotency_key="first")
+    outbox.flush(timeout=0.2)  # the worker is blocked sending "first" alone
+    for n in range(1, 4):
+        outbox.enqueue({"n": n})
+    release.set()
+
+    assert outbox.flush(timeout=5)
+    assert singles == ["first"]
+    assert batches == [[{"n": 1}, {"n": 2}, {"n": 3}]]
+    assert outbox.stats()["sent"] == 4
+    assert outbox.stats()["batches"] == 1
+    outbox.close()
+
+
+def test_failed_batch_falls_back_to_single_sends(app):
+    singles = []
+
+    def batch_sender(payloads, key):
+        raise PermanentDeliveryError("422 one address is invalid")
+
+    def sender(payload, key):
+        if payload["to"] == "bad":
+            raise PermanentDeliveryError("422 invalid recipient")
+        singles.append(payload["to"])
+
+    outbox = EmailOutbox(sender=sender, batch_sender=batch_sender)
+    outbox._attempt_batch(
+        [
+            {
+                "id": to,
+                "idempotency_key": to,
+                "payload": {"to": to},
+                "attempts": 0,
+                "enqueued_at": 0,
+            }
+            for to in ("a", "bad", "b")
+        ]
+    )
+
+    assert singles == ["a", "b"]
+    assert outbox.stats()["sent"] == 2
+    assert outbox.stats()["failed"] == 1
+
+
+def test_retryable_batch_failure_resends_the_batch_under_the_same_key(app):
+    batch_keys, singles = [], []
+
+    def batch_sender(payloads, key):
+        batch_keys.append(key)
+        if len(batch_keys) == 1:
+            raise email_service.EmailDeliveryError("read timeout")
+
+    outbox = _outbox(app, lambda payload, key: singles.append(key), EMAIL_OUTBOX_BATCH_SIZE=10)
+    outbox.batch_sender = batch_sender
+    outbox._attempt_batch(
+        [
+            {
+                "id": to,
+                "idempotency_key": to,
+                "payload": {"to": to},
+                "attempts": 0,
+                "enqueued_at": 0,
+            }
+            for to in ("a", "b")
+        ]
+    )
+    outbox.start()
+
+    assert outbox.flush(timeout=5)
+    assert singles == []
+    assert len(batch_keys) == 2 and batch_keys[0] == batch_keys[1]
+    stats = outbox.stats()
+    assert stats["retries"] == 1 and stats["sent"] == 2 and stats["batches"] == 1
+    outbox.close()
+
+
+def test_batch_retry_survives_a_restart_under_the_same_key(app, tmp_path):
+    def timeout(payloads, key):
+        raise email_service.EmailDeliveryError("read timeout")
+
+    # The first worker sends a batch, times out and dies before the retry.
+    before = _outbox(app, None, EMAIL_OUTBOX_SPOOL_DIR=tmp_path)
+    before.batch_sender = timeout
+    (tmp_path / str(os.getpid())).mkdir()
+    messages = [
+        {"id": to, "idempotency_key": to, "payload": {"to": to}, "attempts": 0, "enqueued_at": 0}
+        for to in ("a", "b", "c")
+    ]
+    for message in messages:
+        before._spool_write(message)
+    before._attempt_batch(messages)
+    first_key = messages[0]["batch_key"]
+    dead = subprocess.run(
+        [sys.executable, "-c", "import os; print(os.getpid())"],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    os.rename(tmp_path / str(os.getpid()), tmp_path / dead.stdout.strip())
+
+    singles, batches = [], []
+    after = _outbox(app, lambda payload, key: singles.append(key), EMAIL_OUTBOX_SPOOL_DIR=tmp_path)
+    after.batch_sender = lambda payloads, key: batches.append((key, payloads))
+    after.start()
+
+    assert after.flush(timeout=5)
+    assert singles == []
+    assert batches == [(first_key, [{"to": "a"}, {"to": "b"}, {"to": "c"}])]
+    assert os.listdir(tmp_path / str(os.getpid())) == []
+    after.close()
+
+
+def test_adopter_that_died_mid_adoption_hands_its_claim_on_intact(app, tmp_path):
+    def dead_pid():
+        return subprocess.run(
+            [sys.executable, "-c", "import os; print(os.getpid())"],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+
+    # A worker claimed a stopped worker's spool, then died before queueing it.
+    claim = tmp_path / f"{dead_pid()}-{dead_pid()}"
+    claim.mkdir()
+    for to in ("a", "b"):
+        message = {
+            "id": to,
+            "idempotency_key": to,
+            "payload": {"to": to},
+            "attempts": 0,
+            "enqueued_at": 0,
+            "batch_key": "batch-sent-before",
+            "batch_ids": ["a", "b"],
+            "batch_attempts": 1,
+        }
+        (claim / f"{to}.json").write_text(json.dumps(message))
+
+    batches = []
+    outbox = _outbox(app, None, EMAIL_OUTBOX_SPOOL_DIR=tmp_path)
+    outbox.batch_sender = lambda payloads, key: batches.append((key, payloads))
+    outbox.start()
+
+    assert outbox.flush(timeout=5)
+    assert batches == [("batch-sent-before", [{"to": "a"}, {"to": "b"}])]
+    assert sorted(os.listdir(tmp_path)) == [str(os.getpid())]
+    outbox.close()
+
+
+def test_contact_email_is_handed_to_the_outbox(app, monkeypatch):
+    queued = []
+    app.config.update(MAIL_FROM="info@example.com", CONTACT_EMAIL="team@example.com")
+    monkeypatch.setattr(email_service.resend_transport, "api_key", "re_test")
+    monkeypatch.setattr(
+        email_service.email_outbox,
+        "enqueue",
+        lambda payload, idempotency_key=None: queued.append(payload) or True,
+    )
+
+    with app.test_request_context():
+        assert email_service.send_contact_email("Ann", "ann@example.com", "", "Hi <b>there</b>")
+
+    assert queued[0]["reply_to"] == "ann@example.com"
+    assert "Hi &lt;b&gt;there&lt;/b&gt;" in queued[0]["html"]
+
+
+def test_resubmitted_messages_reuse_their_idempotency_key(app, monkeypatch):
+    keys = []
+    app.config.update(MAIL_FROM="info@example.com", CONTACT_EMAIL="team@example.com")
+    monkeypatch.setattr(email_service.resend_transport, "api_key", "re_test")
+    monkeypatch.setattr(
+        email_service.email_outbox,
+        "enqueue",
+        lambda payload, idempotency_key=None: keys.append(idempotency_key) or True,
+    )
+    monkeypatch.setattr(email_service, "generate_verification_token", lambda email: "token-1")
+
+    with app.test_request_context():
+        for _ in range(2):
+            email_service.send_contact_email("Ann", "ann@example.com", "", "Hi")
+            email_service.send_verification_email("ann@example.com")
+        email_service.send_contact_email("Ann", "ann@example.com", "", "Hi again")
+
+    assert keys[0] == keys[2] and keys[1] == keys[3]
+    assert keys[0].startswith("contact-") and keys[1].startswith("verify-")
+    assert len(set(keys)) == 3
@@ -0,0 +1,108 @@
+import os
+
+import pytest
+
+import apps.main.routes as main_routes
+from apps.extensions import page_cache
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+
+@pytest.fixture
+def cached_app(app, monkeypatch):
+    app.config["PAGE_CACHE_MAX_ENTRIES"] = 8
+    page_cache.init_app(app)
+    renders = []
+    original = main_routes.render_template
+
+    def counting_render(name, **context):
+        renders.append(name)
+        return original(name, **context)
+
+    monkeypatch.setattr(main_routes, "render_template", counting_render)
+    yield app, renders
+    page_cache.max_entries = 0
+    page_cache.redis_client = None
+    page_cache.clear()
+
+
+def test_anonymous_pages_render_once_and_revalidate_with_304(cached_app):
+    app, renders = cached_app
+    client = app.test_client()
+
+    first = client.get("/about")
+    second = client.get("/about")
+
+    assert first.status_code == second.status_code == 200
+    assert first.data == second.data
+    assert renders == ["about.html"]
+    etag, weak = first.get_etag()
+    assert etag and not weak
+    assert first.cache_control.no_cache
+    assert first.headers["X-Request-ID"]
+
+    not_modified = client.get("/about", headers={"If-None-Match": f'"{etag}"'})
+    assert not_modified.status_code == 304
+    assert not_modified.data == b""
+    assert page_cache.stats()["not_modified"] == 1
+
+    client.get("/faqs")
+    assert renders == ["about.html", "faqs.html"]
+
+
+def test_logged_in_visitors_and_pending_flashes_bypass_the_cache(cached_app):
+    app, renders = cached_app
+    client = app.test_client()
+    client.get("/documentation")
+
+    with client.session_transaction() as session:
+        session["_flashes"] = [("success", "Message sent")]
+    response = client.get("/documentation")
+    assert b"Message sent" in response.data
+
+    with client.session_transaction() as session:
+        session["_user_id"] = "user@example.com"
+    client.get("/documentation")
+
+    assert renders == ["documentation.html"] * 3
+    assert page_cache.stats()["bypassed"] == 2
+
+
+def test_template_edit_invalidates_cached_page(cached_app):
+    app, renders = cached_app
+    client = app.test_client()
+    client.get("/use-cases")
+
+    template = os.path.join(page_cache.template_folder, "use-cases.html")
+    stat = os.stat(template)
+    os.utime(template, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    try:
+        page_cache.clear()  # drop the memoised template version
+        client.get("/use-cases")
+    finally:
+        os.utime(template, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert renders == ["use-cases.html", "use-cases.html"]
+
+
+def test_shared_tier_serves_pages_rendered_by_other_workers(cached_app):
+    app, renders = cached_app
+    page_cache.redis_client = FakeRedis()
+    client = app.test_client()
+    body = client.get("/").data
+
+    page_cache._entries.clear()  # another worker: empty local tier, same Redis
+    response = client.get("/")
+
+    assert response.data == body
+    assert renders == ["landing.html"]
+    assert page_cache.stats()["shared_hits"] == 1
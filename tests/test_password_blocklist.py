@@ -0,0 +1,52 @@
+import apps.utils as utils
+from apps.password_blocklist import PasswordBlocklist, build_index
+
+
+def test_build_index_and_lookup(tmp_path):
+    source = tmp_path / "breached.txt"
+    source.write_text(
+        "\n".join(["Tr0ub4dor&3", "hunter2", "HUNTER2", ""] + [f"pw{n}" for n in range(5000)])
+    )
+    index = tmp_path / "breached.idx"
+
+    assert build_index(str(source), str(index)) == 5002
+
+    blocklist = PasswordBlocklist(str(index))
+    assert len(blocklist) == 5002
+    assert "tr0ub4dor&3" in blocklist
+    assert "pw4999" in blocklist
+    assert "CorrectHorseBatteryStaple1!" not in blocklist
+
+
+def test_missing_index_disables_the_check(tmp_path):
+    blocklist = PasswordBlocklist(str(tmp_path / "missing.idx"))
+
+    assert "hunter2" not in blocklist
+    assert len(blocklist) == 0
+
+
+def test_password_policy_rejects_breached_password(tmp_path, monkeypatch):
+    source = tmp_path / "breached.txt"
+    source.write_text("StrongPass123!\n")
+    index = tmp_path / "breached.idx"
+    build_index(str(source), str(index))
+    monkeypatch.setattr(utils, "blocklist", PasswordBlocklist(str(index)))
+
+    assert utils.get_password_validation_errors("StrongPass123!") == [
+        "This password has appeared in a data breach. Choose a different one."
+    ]
+    assert utils.validate_password("OtherStrongPass456!")
+
+
+def test_build_command_writes_index(app, tmp_path):
+    source = tmp_path / "breached.txt"
+    source.write_text("a\nb\n")
+    index = tmp_path / "breached.idx"
+
+    result = app.test_cli_runner().invoke(
+        args=["build-password-blocklist", str(source), str(index)]
+    )
+
+    assert result.exit_code == 0
+    assert "Wrote 2 entries" in result.output
+    assert len(PasswordBlocklist(str(index))) == 2
@@ -0,0 +1,193 @@
+import multiprocessing
+import time
+
+from limits import parse
+from limits.storage import RedisStorage
+from limits.strategies import FixedWindowRateLimiter
+
+import apps.rate_limit as rate_limit
+from apps.rate_limit import SharedMemoryStorage, TieredRedisStorage
+
+
+class FakeRedisRemote:
+    """Stands in for limits' RedisStorage: counters plus a pipelining client."""
+
+    def __init__(self):
+        self.counts = {}
+        self.expires = {}
+        self.round_trips = 0
+
+    def prefixed_key(self, key):
+        return f"LIMITS:{key}"
+
+    def get_connection(self):
+        return self
+
+    def pipeline(self, transaction=False):
+        return FakePipeline(self)
+
+    def lua_incr_expire(self, keys, args, client):
+        client.ops.append(("incr", keys[0], args))
+
+    def get_expiry(self, key):
+        return self.expires.get(self.prefixed_key(key), time.time())
+
+    def clear(self, key):
+        self.counts.pop(self.prefixed_key(key), None)
+
+
+class FakePipeline:
+    def __init__(self, remote):
+        self.remote = remote
+        self.ops = []
+
+    def get(self, key):
+        self.ops.append(("get", key, None))
+
+    def pttl(self, key):
+        self.ops.append(("pttl", key, None))
+
+    def execute(self):
+        self.remote.round_trips += 1
+        results = []
+        for op, key, args in self.ops:
+            if op == "incr":
+                expiry, amount = args
+                self.remote.counts[key] = self.remote.counts.get(key, 0) + amount
+                self.remote.expires.setdefault(key, time.time() + expiry)
+                results.append(self.remote.counts[key])
+            elif op == "get":
+                results.append(self.remote.counts.get(key))
+            else:
+                expires_at = self.remote.expires.get(key)
+                results.append(int((expires_at - time.time()) * 1000) if expires_at else -2)
+        return results
+
+
+def _storage(remote, **kwargs):
+    return TieredRedisStorage("tiered+redis://localhost:6379", remote=remote, **kwargs)
+
+
+def test_limits_redis_storage_still_has_the_internals_sync_uses():
+    # FakeRedisRemote mirrors these; fail loudly if a limits upgrade drops them.
+    remote = RedisStorage("redis://localhost:6379")
+    pipe = remote.get_connection().pipeline(transaction=False)
+    key = remote.prefixed_key("login/1/minute")
+
+    remote.lua_incr_expire([key], [60, 1], client=pipe)
+    pipe.pttl(key)
+
+    assert [command[0][0] for command in pipe.command_stack] == ["EVALSHA", "PTTL"]
+    assert key.endswith("login/1/minute")
+
+
+def test_local_tier_absorbs_hits_well_under_the_limit():
+    remote = FakeRedisRemote()
+    limiter = FixedWindowRateLimiter(_storage(remote, sync_interval=60, local_fraction=0.1))
+    limit = parse("1000 per minute")
+
+    allowed = sum(limiter.hit(limit, "1.2.3.4") for _ in range(200))
+
+    assert allowed == 200
+    assert remote.round_trips < 30
+    assert sum(remote.counts.values()) <= 200
+
+
+def test_limit_is_enforced_exactly_for_a_single_worker():
+    remote = FakeRedisRemote()
+    limiter = FixedWindowRateLimiter(_storage(remote, sync_interval=60, local_fraction=0.5))
+    limit = parse("60 per minute")
+
+    allowed = sum(limiter.hit(limit, "1.2.3.4") for _ in range(100))
+
+    assert allowed == 60
+    assert not limiter.test(limit, "1.2.3.4")
+
+
+def test_workers_share_counts_through_redis():
+    remote = FakeRedisRemote()
+    workers = [_storage(remote, sync_interval=0) for _ in range(3)]
+    limit = parse("12 per 15 minute")
+
+    allowed = sum(FixedWindowRateLimiter(workers[n % 3]).hit(limit, "1.2.3.4") for n in range(30))
+
+    assert allowed == 12
+
+
+def test_one_round_trip_flushes_every_pending_counter():
+    remote = FakeRedisRemote()
+    storage = _storage(remote, sync_interval=60, local_fraction=1.0)
+    limits = [parse("100 per minute"), parse("100 per hour")]
+    limiter = FixedWindowRateLimiter(storage)
+    for limit in limits:
+        limiter.hit(limit, "1.2.3.4")
+    for limit in limits:
+        limiter.hit(limit, "1.2.3.4")
+    trips = remote.round_trips
+
+    storage._counters[limits[0].key_for("1.2.3.4")].synced_at -= 120
+    limiter.hit(limits[0], "1.2.3.4")
+
+    assert remote.round_trips == trips + 1
+    assert sorted(remote.counts.values()) == [2, 3]
+
+
+def _hit_shared_limit(path, attempts, results):
+    limiter = FixedWindowRateLimiter(SharedMemoryStorage(f"shm://{path}", buckets=64))
+    limit = parse("50 per minute")
+    results.put(sum(limiter.hit(limit, "login", "1.2.3.4") for _ in range(attempts)))
+
+
+def test_shared_memory_limit_holds_across_processes(tmp_path):
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    workers = [
+        context.Process(target=_hit_shared_limit, args=(tmp_path / "rl", 40, results))
+        for _ in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=30)
+
+    assert sum(results.get(timeout=5) for _ in workers) == 50
+
+
+def test_shared_memory_reuses_expired_slots(tmp_path, monkeypatch):
+    storage = SharedMemoryStorage(f"shm://{tmp_path / 'rl'}", buckets=1)
+    for n in range(SharedMemoryStorage.BUCKET_SLOTS):
+        storage.incr(f"key-{n}", 1)
+
+    real_time = time.time
+    monkeypatch.setattr(rate_limit.time, "time", lambda: real_time() + 5)
+
+    assert storage.get("key-0") == 0
+    assert storage.incr("fresh", 60) == 1
+    assert storage.incr("fresh", 60) == 2
+    storage.reset()
+    assert storage.get("fresh") == 0
+
+
+def test_full_bucket_fails_closed_instead_of_resetting_a_live_window(tmp_path):
+    storage = SharedMemoryStorage(f"shm://{tmp_path / 'rl'}", buckets=1)
+    limiter = FixedWindowRateLimiter(storage)
+    limit = parse("5 per minute")
+    for _ in range(3):
+        assert limiter.hit(limit, "login", "victim@example.com")
+    for n in range(SharedMemoryStorage.BUCKET_SLOTS - 1):
+        assert limiter.hit(limit, "login", f"attacker{n}@example.com")
+
+    # No slot is free: the newcomer is refused and the victim's count survives.
+    assert not limiter.test(limit, "login", "attacker-extra@example.com")
+    assert not limiter.hit(limit, "login", "attacker-extra@example.com")
+    assert storage.get(limit.key_for("login", "victim@example.com")) == 3
+
+
+def test_bucket_placement_is_salted_per_table(tmp_path):
+    first = SharedMemoryStorage(f"shm://{tmp_path / 'a'}", buckets=1024)
+    second = SharedMemoryStorage(f"shm://{tmp_path / 'b'}", buckets=1024)
+    reopened = SharedMemoryStorage(f"shm://{tmp_path / 'a'}", buckets=1024)
+    keys = [f"user{n}@example.com" for n in range(20)]
+
+    assert [first._locate(k) for k in keys] == [reopened._locate(k) for k in keys]
+    assert [first._locate(k) for k in keys] != [second._locate(k) for k in keys]
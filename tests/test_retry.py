@@ -0,0 +1,122 @@
+import pytest
+from botocore.exceptions import ClientError, EndpointConnectionError
+
+from apps.database import retry_dynamodb_operation
+from apps.retry import CircuitBreaker, CircuitOpenError, RetryBudget, RetryPolicy
+
+
+def _client_error(code):
+    return ClientError({"Error": {"Code": code, "Message": code}}, "GetItem")
+
+
+def _failing(error, calls):
+    def _operation():
+        calls.append(1)
+        raise error
+
+    return _operation
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr("apps.database.time.sleep", lambda delay: None)
+
+
+def test_backoff_uses_full_jitter_capped_at_max_delay():
+    policy = RetryPolicy(base_delay=1.0, max_delay=3.0)
+
+    delays = [policy.backoff(attempt) for attempt in range(6) for _ in range(50)]
+
+    assert all(0 <= delay <= 3.0 for delay in delays)
+    assert len(set(delays)) > 1
+
+
+def test_user_errors_are_not_retried():
+    calls = []
+    policy = RetryPolicy(max_retries=5)
+
+    with pytest.raises(ClientError):
+        retry_dynamodb_operation(
+            _failing(_client_error("ValidationException"), calls), policy=policy
+        )
+
+    assert len(calls) == 1
+    assert policy.stats()["retries"] == 0
+
+
+def test_exhausted_budget_stops_retrying():
+    calls = []
+    policy = RetryPolicy(max_retries=5, budget=RetryBudget(capacity=10, retry_cost=5))
+
+    with pytest.raises(ClientError):
+        retry_dynamodb_operation(
+            _failing(_client_error("ProvisionedThroughputExceededException"), calls),
+            policy=policy,
+        )
+
+    assert len(calls) == 3
+    stats = policy.stats()
+    assert stats["retries"] == 2
+    assert stats["budget_exhausted"] == 1
+    assert stats["budget_tokens"] == 0
+
+
+def test_breaker_trips_short_circuits_and_recovers_after_cooldown():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=30, clock=lambda: now[0])
+    policy = RetryPolicy(max_retries=1, breaker=breaker)
+    calls = []
+    down = _failing(EndpointConnectionError(endpoint_url="https://dynamodb"), calls)
+
+    for _ in range(2):
+        with pytest.raises(EndpointConnectionError):
+            retry_dynamodb_operation(down, policy=policy)
+    with pytest.raises(CircuitOpenError):
+        retry_dynamodb_operation(down, policy=policy)
+
+    assert len(calls) == 2
+    assert policy.stats()["breaker_trips"] == 1
+    assert policy.stats()["short_circuits"] == 1
+
+    now[0] = 31.0
+    assert retry_dynamodb_operation(lambda: {"Item": {}}, policy=policy) == {"Item": {}}
+    assert not breaker.is_open
+
+
+def test_unexpected_error_during_probe_does_not_wedge_the_breaker():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=30, clock=lambda: now[0])
+    policy = RetryPolicy(max_retries=1, breaker=breaker)
+
+    with pytest.raises(EndpointConnectionError):
+        retry_dynamodb_operation(
+            _failing(EndpointConnectionError(endpoint_url="https://dynamodb"), []), policy=policy
+        )
+    now[0] = 31.0
+    with pytest.raises(KeyError):
+        retry_dynamodb_operation(_failing(KeyError("Item"), []), policy=policy)
+
+    # The probe was released: the next call goes through and closes the breaker.
+    assert retry_dynamodb_operation(lambda: {"Item": {}}, policy=policy) == {"Item": {}}
+    assert not breaker.is_open
+
+
+def test_throttled_probe_does_not_close_the_breaker():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=30, clock=lambda: now[0])
+    policy = RetryPolicy(max_retries=1, breaker=breaker)
+
+    with pytest.raises(EndpointConnectionError):
+        retry_dynamodb_operation(
+            _failing(EndpointConnectionError(endpoint_url="https://dynamodb"), []), policy=policy
+        )
+    now[0] = 31.0
+    with pytest.raises(ClientError):
+        retry_dynamodb_operation(
+            _failing(_client_error("ProvisionedThroughputExceededException"), []), policy=policy
+        )
+
+    # Still open, but the next call may probe again.
+    assert breaker.is_open
+    assert retry_dynamodb_operation(lambda: {"Item": {}}, policy=policy) == {"Item": {}}
+    assert not breaker.is_open
@@ -1,3 +1,4 @@
+import pytest
 from werkzeug.security import generate_password_hash
 
 import apps.auth.routes as auth_routes
@@ -97,3 +98,60 @@ def test_health_does_not_leak_internal_error(client, monkeypatch):
     assert response.status_code == 503
     payload = response.get_json()
     assert payload["error"] == "database unavailable"
+
+
+def test_health_with_session_cookie_does_not_load_user(client, monkeypatch):
+    lookups = []
+    monkeypatch.setattr(auth_routes.store, "get_user", lambda *a, **kw: lookups.append(a))
+    monkeypatch.setattr(main_routes.users_table, "get_item", lambda **kwargs: {})
+
+    with client.session_transaction() as session:
+        session["_user_id"] = "user@example.com"
+
+    response = client.get("/health")
+
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "no-store"
+    assert lookups == []
+
+
+def test_anonymous_page_is_cacheable(client):
+    response = client.get("/about")
+
+    assert response.status_code == 200
+    assert "Cache-Control" not in response.headers
+
+
+def test_signup_existing_account_uses_conditional_put(client, monkeypatch):
+    def _exists(data):
+        raise auth_routes.store.UserExistsError(data.email)
+
+    monkeypatch.setattr(auth_routes.store, "get_user", lambda *a, **kw: pytest.fail("read"))
+    monkeypatch.setattr(auth_routes.store, "add_user", _exists)
+
+    response = client.post(
+        "/signup",
+        data={
+            "first_name": "Jane",
+            "last_name": "Doe",
+            "date_of_birth": "2000-01-01",
+            "email": "jane@example.com",
+            "password": "StrongPass123!",
+            "confirm_password": "StrongPass123!",
+        },
+    )
+
+    assert b"An account with this email already exists." in response.data
+
+
+def test_verify_email_reports_already_verified(client, monkeypatch):
+    monkeypatch.setattr(auth_routes, "verify_token", lambda token: "user@example.com")
+    monkeypatch.setattr(
+        auth_routes.store,
+        "verify_user_email",
+        lambda email: auth_routes.store.EMAIL_ALREADY_VERIFIED,
+    )
+
+    response = client.get("/verify-email/token", follow_redirects=True)
+
+    assert b"Your email is already verified." in response.data
@@ -0,0 +1,123 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from botocore.exceptions import ClientError
+
+import apps.database as database
+import apps.store as store
+from apps.models import load_user
+from apps.retry import RetryPolicy
+from apps.user_cache import UserCache
+
+
+def test_put_users_and_get_users_chunk_through_batch_api(fake_db):
+    items = [{"email": f"User{n}@Example.com", "first_name": f"U{n}"} for n in range(130)]
+
+    assert store.put_users(items)
+
+    emails = [f"user{n}@example.com" for n in range(130)] + ["missing@example.com"]
+    users = store.get_users(emails + emails[:5])
+
+    assert len(users) == 130
+    assert users["user42@example.com"]["first_name"] == "U42"
+
+
+def test_get_users_retries_unprocessed_keys(fake_db, monkeypatch):
+    store.put_users([{"email": "a@example.com"}, {"email": "b@example.com"}])
+    monkeypatch.setattr(store, "BATCH_RETRY_BASE_DELAY", 0)
+
+    real_batch_get = fake_db.batch_get_item
+    calls = []
+
+    def _throttled_batch_get(RequestItems):
+        calls.append(RequestItems)
+        if len(calls) == 1:
+            keys = RequestItems["users"]["Keys"]
+            response = real_batch_get({"users": {"Keys": keys[:1]}})
+            response["UnprocessedKeys"] = {"users": {"Keys": keys[1:]}}
+            return response
+        return real_batch_get(RequestItems)
+
+    monkeypatch.setattr(fake_db, "batch_get_item", _throttled_batch_get)
+
+    users = store.get_users(["a@example.com", "b@example.com"])
+
+    assert set(users) == {"a@example.com", "b@example.com"}
+    assert len(calls) == 2
+
+
+def test_async_store_round_trip(fake_db):
+    new_user = SimpleNamespace(id="u-1", email="Async@Example.com", password="hash")
+
+    async def _flow():
+        created = await store.aadd_user(new_user)
+        with pytest.raises(store.UserExistsError):
+            await store.aadd_user(new_user)
+        updated = await store.aupdate_user("async@example.com", {"first_name": "Ada"})
+        fetched = await store.aget_user("async@example.com")
+        return created, updated, fetched
+
+    created, updated, fetched = asyncio.run(_flow())
+
+    assert created is True
+    assert updated["first_name"] == "Ada"
+    assert fetched["first_name"] == "Ada"
+
+
+def test_async_retry_backs_off_with_asyncio_sleep(monkeypatch):
+    sleeps = []
+
+    async def _fake_sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr(database.asyncio, "sleep", _fake_sleep)
+    monkeypatch.setattr(database.time, "sleep", lambda delay: pytest.fail("blocking sleep"))
+    attempts = []
+
+    def _flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ClientError({"Error": {"Code": "InternalServerError"}}, "GetItem")
+        return {"Item": {"email": "a@example.com"}}
+
+    policy = RetryPolicy(max_retries=3, base_delay=0.1)
+    result = asyncio.run(database.async_retry_dynamodb_operation(_flaky, policy=policy))
+
+    assert result == {"Item": {"email": "a@example.com"}}
+    assert len(sleeps) == 2
+    assert 0 <= sleeps[0] <= 0.1 and 0 <= sleeps[1] <= 0.2
+
+
+def test_get_user_projects_requested_fields(fake_db, monkeypatch):
+    monkeypatch.setattr(store, "user_cache", UserCache(max_entries=8, ttl=60))
+    store.put_users([{"email": "a@example.com", "password": "hash", "first_name": "Ada"}])
+
+    projected = store.get_user("a@example.com", fields=("first_name",), cached=True)
+    full = store.get_user("a@example.com", cached=True)
+
+    assert projected == {"email": "a@example.com", "first_name": "Ada"}
+    assert full["password"] == "hash"
+    assert store.user_cache.stats()["misses"] == 2
+
+
+def test_load_user_keeps_password_hash_out_of_session_user(fake_db, monkeypatch):
+    monkeypatch.setattr(store, "user_cache", UserCache(max_entries=8, ttl=60))
+    store.put_users([{"email": "a@example.com", "id": "u-1", "password": "hash"}])
+
+    user = load_user("a@example.com")
+
+    assert user.user_id == "u-1"
+    assert not hasattr(user, "password")
+
+
+def test_verify_user_email_is_a_single_conditional_update(fake_db):
+    store.add_user(SimpleNamespace(id="u-1", email="a@example.com", password="hash"))
+
+    with pytest.raises(store.UserExistsError):
+        store.add_user(SimpleNamespace(id="u-2", email="a@example.com", password="hash"))
+
+    assert store.verify_user_email("a@example.com") == store.EMAIL_VERIFIED
+    assert store.verify_user_email("a@example.com") == store.EMAIL_ALREADY_VERIFIED
+    assert store.verify_user_email("missing@example.com") == store.USER_NOT_FOUND
+    assert store.get_user("a@example.com")["email_verified"] is True
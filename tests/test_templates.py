@@ -0,0 +1,56 @@
+import os
+
+from jinja2 import FileSystemBytecodeCache
+
+from apps import configure_templates, create_app, precompile_templates
+from tests.conftest import TestConfig
+
+
+class CachedTemplatesConfig(TestConfig):
+    JINJA_BYTECODE_CACHE = True
+
+
+def _app_with_cache(directory):
+    config = type("Config", (CachedTemplatesConfig,), {"JINJA_BYTECODE_CACHE_DIR": str(directory)})
+    return create_app(config_class=config)
+
+
+def test_bytecode_cache_is_shared_between_app_instances(tmp_path):
+    first = _app_with_cache(tmp_path)
+    assert isinstance(first.jinja_env.bytecode_cache, FileSystemBytecodeCache)
+
+    loaded = precompile_templates(first)
+
+    templates = [name for name in os.listdir("templates") if name.endswith(".html")]
+    assert loaded == len(templates)
+    cached = [name for name in os.listdir(tmp_path) if name.endswith(".cache")]
+    assert len(cached) == loaded
+
+    # A second worker loads the bytecode instead of compiling the source again.
+    second = _app_with_cache(tmp_path)
+    compiled = []
+    original = second.jinja_env.compile
+    second.jinja_env.compile = lambda *args, **kwargs: compiled.append(args) or original(
+        *args, **kwargs
+    )
+    precompile_templates(second)
+    assert compiled == []
+    assert second.test_client().get("/about").status_code == 200
+
+
+def test_unusable_cache_directory_does_not_break_rendering(tmp_path):
+    cache_dir = tmp_path / "cache"
+    app = _app_with_cache(cache_dir)
+    # Replace the directory with a file so every cache read and write fails.
+    cache_dir.rmdir()
+    cache_dir.write_text("not a directory")
+
+    response = app.test_client().get("/faqs")
+
+    assert response.status_code == 200
+
+
+def test_bytecode_cache_is_off_unless_configured(app):
+    assert app.jinja_env.bytecode_cache is None
+    configure_templates(app)
+    assert app.jinja_env.bytecode_cache is None
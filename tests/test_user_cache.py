@@ -0,0 +1,73 @@
+import apps.store as store
+from apps.user_cache import UserCache
+
+
+class CountingTable:
+    def __init__(self, items):
+        self.items = items
+        self.get_calls = 0
+
+    def get_item(self, Key):
+        self.get_calls += 1
+        item = self.items.get(Key["email"])
+        return {"Item": dict(item)} if item else {}
+
+    def update_item(self, Key, ExpressionAttributeValues=None, **kwargs):
+        item = self.items[Key["email"]]
+        for ref, value in (ExpressionAttributeValues or {}).items():
+            item[ref.lstrip(":")] = value
+        return {"Attributes": dict(item)}
+
+
+class ProjectingTable(CountingTable):
+    def get_item(self, Key, ProjectionExpression=None, ExpressionAttributeNames=None):
+        response = super().get_item(Key)
+        if ProjectionExpression and "Item" in response:
+            names = {
+                ExpressionAttributeNames[ref.strip()] for ref in ProjectionExpression.split(",")
+            }
+            response["Item"] = {k: v for k, v in response["Item"].items() if k in names}
+        return response
+
+
+def test_user_cache_lru_evicts_oldest_entry():
+    cache = UserCache(max_entries=2, ttl=60)
+    cache.set("a@example.com", {"email": "a@example.com"})
+    cache.set("b@example.com", {"email": "b@example.com"})
+    cache.get("a@example.com")
+    cache.set("c@example.com", {"email": "c@example.com"})
+
+    assert cache.get("b@example.com") is None
+    assert cache.get("a@example.com") == {"email": "a@example.com"}
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["local_hits"] == 2
+    assert stats["misses"] == 1
+
+
+def test_cached_get_user_skips_table_until_update_invalidates(monkeypatch):
+    table = CountingTable({"user@example.com": {"email": "user@example.com", "first_name": "A"}})
+    monkeypatch.setattr(store, "users_table", table)
+    monkeypatch.setattr(store, "user_cache", UserCache(max_entries=8, ttl=60))
+
+    assert store.get_user("user@example.com", cached=True)["first_name"] == "A"
+    assert store.get_user("User@Example.com", cached=True)["first_name"] == "A"
+    assert table.get_calls == 1
+
+    store.update_user("user@example.com", {"first_name": "B"})
+
+    assert store.get_user("user@example.com", cached=True)["first_name"] == "B"
+    assert table.get_calls == 2
+
+
+def test_projected_get_user_has_the_same_shape_on_hit_and_miss(monkeypatch):
+    user = {"email": "user@example.com", "first_name": "A", "email_verified": True}
+    table = ProjectingTable({"user@example.com": user})
+    monkeypatch.setattr(store, "users_table", table)
+    monkeypatch.setattr(store, "user_cache", UserCache(max_entries=8, ttl=60))
+
+    miss = store.get_user("user@example.com", fields=["first_name"], cached=True)
+    hit = store.get_user("user@example.com", fields=["first_name"], cached=True)
+
+    assert table.get_calls == 1
+    assert hit == miss == {"email": "user@example.com", "first_name": "A"}
@@ -0,0 +1,154 @@
+import pytest
+
+import apps.store as store
+from apps.user_filter import BloomFilter, UserExistenceFilter
+
+
+class CountingTable:
+    def __init__(self, table):
+        self.table = table
+        self.reads = 0
+
+    def get_item(self, **kwargs):
+        self.reads += 1
+        return self.table.get_item(**kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.table, name)
+
+
+class FakeRedis:
+    """Just enough of redis-py for the shared Bloom filter."""
+
+    def __init__(self):
+        self.values = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def exists(self, key):
+        return int(key in self.values)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.ops.append((name, args))
+
+    def execute(self):
+        values = self.redis.values
+        results = []
+        for name, args in self.ops:
+            if name in ("getbit", "setbit"):
+                bits = values.setdefault(args[0], bytearray())
+                byte, mask = args[1] >> 3, 0x80 >> (args[1] & 7)
+                if len(bits) <= byte:
+                    bits.extend(bytes(byte + 1 - len(bits)))
+                results.append(int(bool(bits[byte] & mask)))
+                if name == "setbit":
+                    bits[byte] |= mask
+            elif name == "set":
+                values[args[0]] = bytearray(args[1])
+            elif name == "bitop":
+                dest, sources = args[1], [values.get(key, bytearray()) for key in args[2:]]
+                merged = bytearray(max(len(source) for source in sources))
+                for source in sources:
+                    for i, byte in enumerate(source):
+                        merged[i] |= byte
+                values[dest] = merged
+            elif name == "delete":
+                values.pop(args[0], None)
+        return results
+
+
+def test_bloom_filter_has_no_false_negatives_and_bounded_false_positives():
+    bloom = BloomFilter(1000, error_rate=0.01)
+    for n in range(1000):
+        bloom.add(f"user{n}@example.com")
+
+    assert all(f"user{n}@example.com" in bloom for n in range(1000))
+    false_positives = sum(f"other{n}@example.com" in bloom for n in range(10000))
+    assert false_positives < 300
+    assert bloom.estimated_error_rate() < 0.02
+
+
+def test_login_for_unknown_email_skips_dynamodb_after_filter_rebuild(client, fake_db, monkeypatch):
+    store.put_users([{"email": "known@example.com", "password": "hash"}])
+    table = CountingTable(store.users_table)
+    monkeypatch.setattr(store, "users_table", table)
+    monkeypatch.setattr(store, "user_filter", UserExistenceFilter(bloom_enabled=True))
+
+    assert store.rebuild_user_filter() == 1
+    response = client.post("/login", data={"email": "ghost@example.com", "password": "x"})
+
+    assert response.status_code == 401
+    assert table.reads == 0
+    assert store.user_filter.stats()["bloom_rejections"] == 1
+    assert store.user_may_exist("known@example.com")
+
+
+def test_negative_cache_is_cleared_by_signup(fake_db, monkeypatch):
+    monkeypatch.setattr(store, "user_filter", UserExistenceFilter(negative_ttl=30))
+
+    assert store.get_user("new@example.com") is None
+    assert not store.user_may_exist("new@example.com")
+
+    store.put_users([{"email": "new@example.com", "password": "hash"}])
+
+    assert store.user_may_exist("new@example.com")
+
+
+def test_shared_filter_sees_other_workers_signups_and_survives_rebuild():
+    redis = FakeRedis()
+    first = UserExistenceFilter(bloom_enabled=True, bloom_capacity=100, redis_client=redis)
+    second = UserExistenceFilter(bloom_enabled=True, bloom_capacity=100, redis_client=redis)
+
+    first.rebuild(["a@example.com"])
+    assert second.attach()
+    second.add("b@example.com")
+    first.rebuild(["a@example.com"])
+
+    assert first.may_exist("b@example.com")
+    assert not second.may_exist("ghost@example.com")
+
+
+def test_negative_cache_defaults_off_without_redis_and_is_shared_with_it(monkeypatch):
+    monkeypatch.delenv("USER_NEGATIVE_CACHE_TTL_SECONDS", raising=False)
+    assert not UserExistenceFilter.from_env().negative_enabled
+
+    redis = FakeRedis()
+    first = UserExistenceFilter.from_env(redis_client=redis)
+    second = UserExistenceFilter.from_env(redis_client=redis)
+    second.record_missing("new@example.com")
+    assert not second.may_exist("new@example.com")
+
+    first.add("new@example.com")  # signup handled by another worker
+
+    assert second.may_exist("new@example.com")
+
+
+def test_process_local_bloom_filter_refuses_several_workers():
+    UserExistenceFilter(bloom_enabled=True).check_workers(1)
+    UserExistenceFilter(bloom_enabled=True, redis_client=FakeRedis()).check_workers(4)
+
+    with pytest.raises(RuntimeError, match="USER_CACHE_REDIS_URL"):
+        UserExistenceFilter(bloom_enabled=True).check_workers(4)
+
+
+def test_filter_rebuild_runs_off_the_boot_path(fake_db, monkeypatch):
+    store.put_users([{"email": "known@example.com", "password": "hash"}])
+    monkeypatch.setattr(store, "user_filter", UserExistenceFilter(bloom_enabled=True))
+
+    store.start_user_filter_rebuild().join(timeout=5)
+
+    assert store.user_filter.ready
+    assert not store.user_may_exist("ghost@example.com")
@@ -0,0 +1,68 @@
+from apps.validation import CONTACT_SCHEMA, PASSWORD_CHANGE_SCHEMA, SIGNUP_SCHEMA
+
+VALID_SIGNUP = {
+    "email": "user@example.com",
+    "first_name": "Ada",
+    "last_name": "Lovelace",
+    "password": "StrongPass123!",
+    "confirm_password": "StrongPass123!",
+    "date_of_birth": "1990-01-01",
+}
+
+
+def test_signup_schema_accepts_valid_data():
+    assert SIGNUP_SCHEMA.validate(VALID_SIGNUP) == []
+
+
+def test_signup_schema_collects_every_error_once():
+    errors = SIGNUP_SCHEMA.validate(
+        {
+            **VALID_SIGNUP,
+            "first_name": "R2-D2",
+            "last_name": "C3PO",
+            "password": "short",
+            "confirm_password": "",
+            "date_of_birth": "",
+        }
+    )
+
+    assert errors == [
+        "Names may only contain letters, spaces, hyphens, and apostrophes.",
+        "Use at least 12 characters.",
+        "Include at least one uppercase letter.",
+        "Include at least one number.",
+        "Include at least one symbol (for example: ! @ # $).",
+        "Passwords do not match.",
+        "Please enter your date of birth.",
+    ]
+
+
+def test_password_change_schema_rejects_reused_password():
+    errors = PASSWORD_CHANGE_SCHEMA.validate(
+        {
+            "current_password": "StrongPass123!",
+            "new_password": "StrongPass123!",
+            "confirm_new_password": "StrongPass123!",
+        }
+    )
+
+    assert errors == ["New password must be different from your current password."]
+
+
+def test_contact_schema_checks_length_before_pattern():
+    errors = CONTACT_SCHEMA.validate(
+        {"name": "A" * 101, "email": "a@example.com", "phone": "", "message": "hi"}
+    )
+
+    assert errors == ["Name is too long."]
+
+
+def test_signup_route_flashes_all_errors(client):
+    response = client.post(
+        "/signup",
+        data={**VALID_SIGNUP, "email": "not-an-email", "confirm_password": "different"},
+    )
+
+    assert response.status_code == 400
+    assert b"Please enter a valid email address." in response.data
+    assert b"Passwords do not match." in response.data